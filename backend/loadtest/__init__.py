@@ -0,0 +1,7 @@
+from .runner import run
+from .compare import compare
+
+__all__ = [
+    "run",
+    "compare",
+]
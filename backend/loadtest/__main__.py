@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from .compare import compare
+from .runner import run
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Load test the Placa WebSocket fan-out path.")
+    commands = parser.add_subparsers(dest="command")
+
+    run_parser = commands.add_parser("run", help="run one load test and write its results as JSON")
+    run_parser.add_argument("--mode", choices=["subprocess", "inprocess"], default="subprocess",
+                            help="start uvicorn as a child process, or on a thread of this process")
+    run_parser.add_argument("--url", help="test an already running server instead (it needs --chats chats)")
+    run_parser.add_argument("--port", type=int, default=8200)
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn workers, joined by the unix bus")
+    run_parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory")
+    run_parser.add_argument("--clients", type=int, default=200, help="WebSocket clients")
+    run_parser.add_argument("--chats", type=int, default=20, help="chats the clients are spread over")
+    run_parser.add_argument("--chats-per-client", type=int, default=1)
+    run_parser.add_argument("--rate", type=float, default=200, help="messages per second, across all chats")
+    run_parser.add_argument("--duration", type=float, default=10, help="seconds of sending")
+    run_parser.add_argument("--ws-share", type=float, default=0.5, help="fraction of messages sent over WebSocket; the rest go through REST")
+    run_parser.add_argument("--rest-connections", type=int, default=8, help="keep-alive connections for REST sends")
+    run_parser.add_argument("--batch", action="store_true", help="connect clients with ?batch=true")
+    run_parser.add_argument("--padding", type=int, default=64, help="extra characters per message")
+    run_parser.add_argument("--drain-timeout", type=float, default=10, help="seconds to wait for deliveries after sending")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--output", help="results file (default loadtest-<time>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare the results of two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    return parser
+
+
+def main():
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in ("run", "compare", "-h", "--help"):
+        argv = ["run", *argv]  # "run" is the default command
+    args = build_parser().parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline) as baseline, open(args.candidate) as candidate:
+            print(compare(json.load(baseline), json.load(candidate)))
+        return
+
+    report = asyncio.run(run(args))
+    output = args.output or f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    results = report["results"]
+    latency = results["latencyMs"]
+    print(f"delivered {results['delivered']}/{results['expectedDeliveries']}, "
+          f"{results['throughput']['deliveriesPerSecond']:g} deliveries/s")
+    if latency["count"]:
+        print(f"latency ms p50 {latency['p50']} p95 {latency['p95']} p99 {latency['p99']} max {latency['max']}")
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import time
+from typing import Callable, List, Optional
+
+import websockets
+
+# Load messages carry their own send time: "lt <run id> <message number> <perf_counter_ns>"
+MARKER = "lt"
+
+
+def make_text(run_id: str, number: int, sent_ns: int, padding: int) -> str:
+    return f"{MARKER} {run_id} {number} {sent_ns} " + "x" * padding
+
+
+def parse_text(text: str, run_id: str) -> Optional[int]:
+    parts = text.split(" ", 4)
+    if len(parts) < 4 or parts[0] != MARKER or parts[1] != run_id:
+        return None
+    return int(parts[3])
+
+
+class LoadClient:
+
+    def __init__(self, ws_url: str, user_id: str, chat_ids: List[str], batch: bool, on_delivery: Callable):
+        self.url = f"{ws_url}/api/ws?userId={user_id}" + ("&batch=true" if batch else "")
+        self.user_id = user_id
+        self.chat_ids = chat_ids
+        self.on_delivery = on_delivery
+        self.ws = None
+        self.errors = 0
+        self.acks = 0
+        self._reader: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, max_size=None, ping_interval=None)
+        self._reader = asyncio.create_task(self._read())
+        await self.ws.send(json.dumps({"action": "subscribe_many", "chatIds": self.chat_ids}))
+        await self._subscribed.wait()
+
+    async def send_message(self, chat_id: str, text: str, number: int):
+        await self.ws.send(json.dumps({
+            "type": "send_message",
+            "chatId": chat_id,
+            "text": text,
+            "clientMsgId": str(number)
+        }))
+
+    async def _read(self):
+        try:
+            async for frame in self.ws:
+                received_ns = time.perf_counter_ns()
+                events = json.loads(frame)
+                for event in events if isinstance(events, list) else [events]:
+                    self._handle(event, received_ns)
+        except websockets.ConnectionClosed:
+            pass
+
+    def _handle(self, event: dict, received_ns: int):
+        kind = event.get("type")
+        if kind == "new_message":
+            self.on_delivery(event["message"]["text"], received_ns)
+        elif kind == "message_ack":
+            self.acks += 1
+            if not event.get("success"):
+                self.errors += 1
+        elif kind == "subscription_confirmed":
+            self._subscribed.set()
+        elif kind == "ping":
+            # Idle listeners are pinged by the server's heartbeat and reaped if they stay silent
+            asyncio.create_task(self.ws.send('{"type": "pong"}'))
+        elif kind == "error":
+            self.errors += 1
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            await self._reader
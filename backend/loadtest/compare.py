@@ -0,0 +1,63 @@
+from typing import List, Tuple
+
+# (label, path into results, True when higher is better)
+METRICS: List[Tuple[str, Tuple[str, ...], bool]] = [
+    ("latency p50 ms", ("latencyMs", "p50"), False),
+    ("latency p95 ms", ("latencyMs", "p95"), False),
+    ("latency p99 ms", ("latencyMs", "p99"), False),
+    ("latency max ms", ("latencyMs", "max"), False),
+    ("REST response p99 ms", ("restResponseMs", "p99"), False),
+    ("messages/s", ("throughput", "messagesPerSecond"), True),
+    ("deliveries/s", ("throughput", "deliveriesPerSecond"), True),
+    ("lost deliveries", ("lost",), False),
+    ("send errors", ("sendErrors",), False),
+    ("client loop lag p99 ms", ("eventLoopLagMs", "client", "p99"), False),
+    ("server loop lag p99 ms", ("eventLoopLagMs", "server", "p99"), False),
+    ("server peak RSS MiB", ("memory", "server", "peakRssBytes"), False),
+    ("process peak RSS MiB", ("memory", "process", "peakRssBytes"), False),
+]
+
+
+def _lookup(results: dict, path: Tuple[str, ...]):
+    value = results
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    if path[-1] == "peakRssBytes":
+        value = round(value / 2 ** 20, 1)
+    return value
+
+
+def compare(baseline: dict, candidate: dict) -> str:
+    lines = [
+        f"baseline  {baseline['runId']} ({baseline['environment'].get('gitCommit') or '?'}, {baseline['startedAt']})",
+        f"candidate {candidate['runId']} ({candidate['environment'].get('gitCommit') or '?'}, {candidate['startedAt']})",
+        ""
+    ]
+    changed = sorted(
+        key for key in set(baseline["config"]) | set(candidate["config"])
+        if baseline["config"].get(key) != candidate["config"].get(key)
+    )
+    if changed:
+        lines.append("config differs in: " + ", ".join(changed))
+        lines.append("")
+
+    lines.append(f"{'metric':<26}{'baseline':>12}{'candidate':>12}  change")
+    for label, path, higher_is_better in METRICS:
+        old, new = _lookup(baseline["results"], path), _lookup(candidate["results"], path)
+        if old is None and new is None:
+            continue
+        change = ""
+        if old and new is not None:
+            delta = (new - old) / old * 100
+            better = delta > 0 if higher_is_better else delta < 0
+            change = f"{delta:+.1f}%"
+            if abs(delta) >= 5:  # smaller moves are usually run-to-run noise
+                change += " better" if better else " worse"
+        lines.append(f"{label:<26}{_fmt(old):>12}{_fmt(new):>12}  {change}")
+    return "\n".join(lines)
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:g}"
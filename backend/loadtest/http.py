@@ -0,0 +1,70 @@
+import asyncio
+import json
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class HttpConnection:
+    # Minimal keep-alive HTTP/1.1 client for JSON POSTs, so the REST path is measured without
+    # connection setup in every request (and without an extra dependency)
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def post_json(self, path: str, payload: dict) -> Tuple[int, bytes]:
+        body = json.dumps(payload).encode()
+        head = (
+            f"POST {self.prefix}{path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode()
+
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                await self._connect()
+            try:
+                return await self._exchange(head + body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Server closed an idle keep-alive connection; retry once on a fresh one
+                await self._connect()
+                return await self._exchange(head + body)
+
+    async def _exchange(self, request: bytes) -> Tuple[int, bytes]:
+        self._writer.write(request)
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+
+        body = await self._reader.readexactly(length)
+        if close:
+            await self.close()
+        return status, body
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import resource
+import time
+from typing import Dict, List, Optional
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    # Nearest rank on an already sorted list
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "min": round(samples[0], 3),
+        "p50": round(percentile(samples, 0.50), 3),
+        "p95": round(percentile(samples, 0.95), 3),
+        "p99": round(percentile(samples, 0.99), 3),
+        "max": round(samples[-1], 3),
+        "mean": round(sum(samples) / len(samples), 3)
+    }
+
+
+def rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    # Current resident set size from /proc; peak RSS of this process where /proc is missing
+    try:
+        with open(f"/proc/{pid or os.getpid()}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid in (None, os.getpid()):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+
+def tree_rss_bytes(pid: int) -> Optional[int]:
+    # A process plus all of its descendants, e.g. a uvicorn supervisor and its workers
+    total = rss_bytes(pid)
+    if total is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            child_pids = [int(child) for child in children.read().split()]
+    except OSError:
+        child_pids = []
+    return total + sum(tree_rss_bytes(child) or 0 for child in child_pids)
+
+
+class LoopLagProbe:
+    # Sleeps for a fixed interval and records how late the loop woke it up
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []  # ms
+        self._running = False
+
+    async def run(self):
+        self._running = True
+        while self._running:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, (time.perf_counter() - started - self.interval) * 1000))
+
+    def stop(self):
+        self._running = False
+
+
+class MemorySampler:
+    # Polls RSS of the given processes; keeps the peak and the last reading of each
+
+    def __init__(self, pids: Dict[str, int], interval: float = 0.5):
+        self.pids = pids
+        self.interval = interval
+        self.peak: Dict[str, int] = {}
+        self.last: Dict[str, int] = {}
+
+    def sample(self):
+        for name, pid in self.pids.items():
+            rss = tree_rss_bytes(pid)
+            if rss is None:
+                continue
+            self.last[name] = rss
+            self.peak[name] = max(self.peak.get(name, 0), rss)
+
+    async def run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        return {name: {"rssBytes": self.last[name], "peakRssBytes": self.peak[name]} for name in self.last}
@@ -0,0 +1,232 @@
+import asyncio
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List
+from .clients import LoadClient, make_text, parse_text
+from .http import HttpConnection
+from .metrics import LoopLagProbe, MemorySampler, summarize
+from .server import BACKEND_DIR, InProcessTarget, SubprocessTarget, Target
+
+SEED_CHATS = 3  # chat_1..chat_3 always exist; the rest come from PLACA_SEED_EXTRA_CHATS
+CONNECT_CONCURRENCY = 100
+
+
+class Collector:
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.latencies: List[float] = []  # ms, one per delivery
+        self.rest_latencies: List[float] = []  # ms, POST until its response
+        self.sent = {"rest": 0, "ws": 0}
+        self.send_errors = 0
+        self.expected = 0
+        self.last_delivery_ns = 0
+        self.all_delivered = asyncio.Event()
+
+    def on_delivery(self, text: str, received_ns: int):
+        sent_ns = parse_text(text, self.run_id)
+        if sent_ns is None:
+            return
+        self.latencies.append((received_ns - sent_ns) / 1e6)
+        self.last_delivery_ns = received_ns
+        if self.expected and len(self.latencies) >= self.expected:
+            self.all_delivered.set()
+
+
+def start_target(args, tmp: str) -> Target:
+    if args.url:
+        return Target(args.url.rstrip("/"))
+
+    env = {
+        "PLACA_SEED_EXTRA_CHATS": str(max(0, args.chats - SEED_CHATS)),
+        "PLACA_STORAGE_BACKEND": args.storage,
+        "PLACA_SQLITE_PATH": os.path.join(tmp, "loadtest.db"),
+        # The run measures delivery, so nothing may be refused by rate limits or shed under load
+        "PLACA_RATE_LIMIT": "false",
+        "PLACA_ADMISSION_MAX_INFLIGHT": "0",
+        "PLACA_ADMISSION_MAX_LOOP_LAG_MS": "0"
+    }
+    if args.workers > 1:
+        env["PLACA_BUS_BACKEND"] = "unix"
+        env["PLACA_BUS_SOCKET_PATH"] = os.path.join(tmp, "bus.sock")
+
+    if args.mode == "inprocess":
+        return InProcessTarget(args.port, env)
+    return SubprocessTarget(args.port, env, workers=args.workers)
+
+
+def plan_subscriptions(args, chat_ids: List[str]) -> List[List[str]]:
+    per_client = min(args.chats_per_client, len(chat_ids))
+    return [
+        [chat_ids[(index * per_client + offset) % len(chat_ids)] for offset in range(per_client)]
+        for index in range(args.clients)
+    ]
+
+
+async def connect_all(clients: List[LoadClient]):
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def connect(client: LoadClient):
+        async with semaphore:
+            await client.connect()
+
+    await asyncio.gather(*(connect(client) for client in clients))
+
+
+async def drive(
+    args,
+    collector: Collector,
+    clients: List[LoadClient],
+    subscribers: Dict[str, List[LoadClient]],
+    chat_ids: List[str],
+    target: Target
+):
+    rest_pool = [HttpConnection(target.base_url) for _ in range(args.rest_connections)]
+    rng = random.Random(args.seed)
+    total = int(args.rate * args.duration)
+    interval_ns = int(1e9 / args.rate)
+    in_flight = set()
+
+    async def post(connection: HttpConnection, chat_id: str, text: str):
+        started = time.perf_counter_ns()
+        try:
+            status, _ = await connection.post_json(f"/api/chats/{chat_id}/messages", {"text": text, "senderId": "load_rest"})
+        except OSError:
+            status = 0
+        collector.rest_latencies.append((time.perf_counter_ns() - started) / 1e6)
+        if status != 200:
+            collector.send_errors += 1
+
+    # Open loop: each message has a fixed send time and its latency is measured from that time,
+    # so a server that falls behind shows up as latency instead of a silently lower rate
+    started_ns = time.perf_counter_ns()
+    for number in range(total):
+        scheduled_ns = started_ns + number * interval_ns
+        delay = (scheduled_ns - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        chat_id = chat_ids[number % len(chat_ids)]
+        text = make_text(collector.run_id, number, scheduled_ns, args.padding)
+        chat_subscribers = subscribers[chat_id]
+
+        if rng.random() < args.ws_share:
+            sender = rng.choice(chat_subscribers or clients)
+            collector.expected += len(chat_subscribers) - (sender in chat_subscribers)  # no echo to the sender
+            collector.sent["ws"] += 1
+            await sender.send_message(chat_id, text, number)
+        else:
+            collector.expected += len(chat_subscribers)
+            collector.sent["rest"] += 1
+            task = asyncio.create_task(post(rest_pool[number % len(rest_pool)], chat_id, text))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    send_seconds = (time.perf_counter_ns() - started_ns) / 1e9
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+    if len(collector.latencies) >= collector.expected:
+        collector.all_delivered.set()
+    try:
+        await asyncio.wait_for(collector.all_delivered.wait(), args.drain_timeout)
+    except asyncio.TimeoutError:
+        pass
+
+    for connection in rest_pool:
+        await connection.close()
+    return started_ns, send_seconds
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def run(args) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    collector = Collector(run_id)
+    chat_ids = [f"chat_{number}" for number in range(1, args.chats + 1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = start_target(args, tmp)
+        try:
+            pids = {"client": os.getpid()}
+            if target.pid == os.getpid():
+                pids = {"process": os.getpid()}  # in-process: server and clients share one RSS
+            elif target.pid is not None:
+                pids["server"] = target.pid
+            memory = MemorySampler(pids)
+            client_lag = LoopLagProbe()
+            background = [asyncio.create_task(memory.run()), asyncio.create_task(client_lag.run())]
+
+            plan = plan_subscriptions(args, chat_ids)
+            clients = [
+                LoadClient(target.ws_url, f"load_{index}", chats, args.batch, collector.on_delivery)
+                for index, chats in enumerate(plan)
+            ]
+            subscribers: Dict[str, List[LoadClient]] = {chat_id: [] for chat_id in chat_ids}
+            for client in clients:
+                for chat_id in client.chat_ids:
+                    subscribers[chat_id].append(client)
+
+            connect_started = time.perf_counter()
+            await connect_all(clients)
+            connect_seconds = time.perf_counter() - connect_started
+            print(f"{len(clients)} clients connected in {connect_seconds:.1f}s, sending {args.rate:g} msg/s for {args.duration:g}s")
+
+            started_ns, send_seconds = await drive(args, collector, clients, subscribers, chat_ids, target)
+            memory.sample()
+
+            client_lag.stop()
+            for task in background:
+                task.cancel()
+            for client in clients:
+                await client.close()
+        finally:
+            target.stop()
+
+    delivered = len(collector.latencies)
+    delivery_seconds = max((collector.last_delivery_ns - started_ns) / 1e9, 1e-9) if delivered else 0
+    sent = collector.sent["rest"] + collector.sent["ws"]
+    return {
+        "runId": run_id,
+        "startedAt": datetime.now().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("command", "output")},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "gitCommit": git_commit()
+        },
+        "results": {
+            "connectSeconds": round(connect_seconds, 3),
+            "sent": dict(collector.sent),
+            "sendErrors": collector.send_errors + sum(client.errors for client in clients),
+            "expectedDeliveries": collector.expected,
+            "delivered": delivered,
+            "lost": max(0, collector.expected - delivered),
+            "latencyMs": summarize(collector.latencies),
+            "restResponseMs": summarize(collector.rest_latencies),
+            "throughput": {
+                "targetMessagesPerSecond": args.rate,
+                "messagesPerSecond": round(sent / send_seconds, 1) if send_seconds else 0,
+                "deliveriesPerSecond": round(delivered / delivery_seconds, 1) if delivered else 0
+            },
+            "memory": memory.report(),
+            "eventLoopLagMs": {
+                "client": summarize(client_lag.samples),
+                "server": summarize(target.lag.samples) if target.lag else None
+            }
+        }
+    }
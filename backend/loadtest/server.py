@@ -0,0 +1,90 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, Optional
+from .metrics import LoopLagProbe
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_ready(base_url: str, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"{base_url}/openapi.json", timeout=1) as response:
+                response.read()
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server at {base_url} did not come up within {timeout:.0f}s")
+            time.sleep(0.1)
+
+
+class Target:
+    # The server under test. `pid` is set when its memory can be sampled, `lag` when its
+    # event loop can be probed (in-process only)
+
+    def __init__(self, base_url: str, pid: Optional[int] = None, lag: Optional[LoopLagProbe] = None):
+        self.base_url = base_url
+        self.pid = pid
+        self.lag = lag
+
+    @property
+    def ws_url(self) -> str:
+        return "ws" + self.base_url[len("http"):]
+
+    def stop(self):
+        pass
+
+
+class SubprocessTarget(Target):
+
+    def __init__(self, port: int, env: Dict[str, str], workers: int = 1):
+        command = [sys.executable, "-m", "uvicorn", "placa.main:placa", "--port", str(port), "--log-level", "warning"]
+        if workers > 1:
+            command += ["--workers", str(workers)]
+        self.process = subprocess.Popen(
+            command,
+            cwd=BACKEND_DIR,
+            env=dict(os.environ, **env),
+            stdout=subprocess.DEVNULL
+        )
+        super().__init__(f"http://127.0.0.1:{port}", pid=self.process.pid)
+        try:
+            wait_until_ready(self.base_url)
+        except RuntimeError:
+            self.stop()
+            raise
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+class InProcessTarget(Target):
+    # Runs uvicorn on its own event loop in a thread of this process. Client and server then
+    # share the GIL, so latencies read higher than against a separate process; in exchange the
+    # server's event loop lag can be measured directly.
+
+    def __init__(self, port: int, env: Dict[str, str]):
+        os.environ.update(env)  # settings are read at import time
+        import uvicorn
+        from placa.main import placa
+
+        self.server = uvicorn.Server(uvicorn.Config(placa, port=port, log_level="warning"))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.server.serve(),), daemon=True)
+        self.thread.start()
+
+        super().__init__(f"http://127.0.0.1:{port}", pid=os.getpid(), lag=LoopLagProbe())
+        wait_until_ready(self.base_url)
+        asyncio.run_coroutine_threadsafe(self.lag.run(), self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.lag.stop)
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
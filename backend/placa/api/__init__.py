@@ -1,11 +1,19 @@
 from .auth_controller import router as auth_router
 from .chats_controller import router as chats_router
+from .history_controller import router as history_router
 from .messages_controller import router as messages_router
+from .metrics_controller import router as metrics_router
+from .presence_controller import router as presence_router
+from .search_controller import router as search_router
 from .ws_controller import router as websocket_router
 
 __all__ = [
     "auth_router",
     "chats_router",
+    "history_router",
     "messages_router",
+    "metrics_router",
+    "presence_router",
+    "search_router",
     "websocket_router",
 ]
\ No newline at end of file
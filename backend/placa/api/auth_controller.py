@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 import uuid
 from ..model.user import LoginRequest, LoginResponse
-from ..storage import users_db
+from ..storage import chat_index, store
 
 router = APIRouter()
 
@@ -16,7 +16,8 @@ async def login(request: LoginRequest):
 
     # Generate userId or retrieve existing one
     user_id = f"user_{uuid.uuid4().hex[:8]}"
-    users_db[user_id] = request.username
+    await store.add_user(user_id, request.username)
+    await chat_index.join(user_id)
 
     return LoginResponse(
         success=True,
@@ -1,19 +1,21 @@
-from fastapi import APIRouter, HTTPException
-from ..model.chat import Chat, ChatsResponse
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from ..model.chat import Chat, ChatsResponse, MarkReadRequest, MarkReadResponse
 from ..model.message import ChatDetailsResponse, Message
-from ..storage import chats_db, messages_db
+from ..service.chat_service import ensure_member, mark_chat_read
+from ..storage import chat_index, store
+from ..config.settings import HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX
 
 router = APIRouter()
 
 
 @router.get("/chats", response_model=ChatsResponse)
-async def get_chats(userId: str):
+async def get_chats(userId: str, limit: Optional[int] = Query(None, ge=1)):
     if not userId:
         raise HTTPException(status_code=400, detail="userId is required")
 
-    # In a real app, filter chats by user
-    # For now, return all chats
-    chats = [Chat(**chat_data) for chat_data in chats_db.values()]
+    await ensure_member(userId)
+    chats = [Chat(**chat_data) for chat_data in chat_index.top_chats(userId, limit)]
 
     return ChatsResponse(
         success=True,
@@ -22,21 +24,54 @@ async def get_chats(userId: str):
 
 
 @router.get("/chats/{chatId}", response_model=ChatDetailsResponse)
-async def get_chat_details(chatId: str, userId: str = None):
-    if chatId not in chats_db:
+async def get_chat_details(
+    chatId: str,
+    userId: str = None,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_MAX)
+):
+    chat_data = await store.get_chat(chatId)
+    if chat_data is None:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    chat = Chat(**chats_db[chatId])
-    messages = messages_db.get(chatId, [])
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
+    chat = Chat(**chat_data)
+    if userId and chat_index.is_member(userId, chatId):
+        chat.unreadCount = chat_index.unread_count(userId, chatId)
+
+    try:
+        page = await store.get_message_page(chatId, limit, before=before, after=after)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
     message_objects = []
-    for msg in messages:
+    for msg in page.messages:
         msg_copy = msg.copy()
-        msg_copy["isOwnMessage"] = userId and msg.get("senderId") == userId
+        msg_copy["isOwnMessage"] = bool(userId) and msg.get("senderId") == userId
         message_objects.append(Message(**msg_copy))
 
+    # An empty page past either end still has messages on the anchor's side; its cursor is the anchor
+    oldest = page.messages[0]["id"] if page.messages else after
+    newest = page.messages[-1]["id"] if page.messages else before
+
     return ChatDetailsResponse(
         success=True,
         chat=chat,
-        messages=message_objects
-    )
\ No newline at end of file
+        messages=message_objects,
+        prevCursor=oldest if page.has_older else None,
+        nextCursor=newest if page.has_newer else None
+    )
+
+
+@router.post("/chats/{chatId}/read", response_model=MarkReadResponse)
+async def mark_read(chatId: str, request: MarkReadRequest):
+    unread_count = await mark_chat_read(chatId, request.userId, request.seq)
+
+    return MarkReadResponse(
+        success=True,
+        chatId=chatId,
+        unreadCount=unread_count
+    )
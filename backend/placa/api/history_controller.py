@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from ..model.history import ImportResponse
+from ..service.history_service import ImportNotify, export_messages, import_messages
+from ..storage import store
+
+router = APIRouter()
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_history(request: Request, chatId: Optional[str] = None, notify: str = ImportNotify.SUMMARY):
+    if notify not in ImportNotify.ALL:
+        raise HTTPException(status_code=400, detail=f"notify must be one of: {', '.join(ImportNotify.ALL)}")
+
+    if chatId and await store.get_chat(chatId) is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    # The body is read as it arrives, so an import of any size holds one batch in memory
+    return await import_messages(request.stream(), default_chat_id=chatId, notify=notify)
+
+
+@router.get("/chats/{chatId}/export")
+async def export_history(chatId: str):
+    if await store.get_chat(chatId) is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    return StreamingResponse(
+        export_messages(chatId),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{chatId}.ndjson"'}
+    )
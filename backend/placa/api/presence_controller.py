@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Query
+from typing import List
+from ..config.real_time.ws_manager import manager
+from ..model.presence import PresenceResponse, PresenceUser
+
+router = APIRouter()
+
+
+@router.get("/presence", response_model=PresenceResponse)
+async def get_presence(userIds: List[str] = Query(..., min_length=1, max_length=500)):
+    users = [PresenceUser(**status) for status in manager.presence.lookup(list(dict.fromkeys(userIds)))]
+    return PresenceResponse(success=True, users=users)
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from ..model.message import Message
+from ..model.search import SearchHit, SearchResponse
+from ..storage import search_index, store
+from ..config.settings import SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX
+
+router = APIRouter()
+
+
+async def _search(
+    q: str,
+    chat_id: Optional[str],
+    user_id: Optional[str],
+    limit: int,
+    offset: int
+) -> SearchResponse:
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q is required")
+
+    total, matches = search_index.search(q, chat_id=chat_id, limit=limit, offset=offset)
+
+    hits = []
+    for match in matches:
+        msg = await store.get_message(match.chat_id, match.message_id)
+        if msg is None:
+            continue
+        msg_copy = msg.copy()
+        msg_copy["isOwnMessage"] = bool(user_id) and msg.get("senderId") == user_id
+        hits.append(SearchHit(chatId=match.chat_id, message=Message(**msg_copy), score=match.score))
+
+    return SearchResponse(
+        success=True,
+        query=q,
+        total=total - (len(matches) - len(hits)),  # matches the store no longer resolves are not counted
+        offset=offset,
+        limit=limit,
+        hits=hits
+    )
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_messages(
+    q: str,
+    userId: str = None,
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0)
+):
+    return await _search(q, None, userId, limit, offset)
+
+
+@router.get("/search/stats")
+async def search_stats():
+    return {"success": True, **search_index.stats()}
+
+
+@router.get("/chats/{chatId}/search", response_model=SearchResponse)
+async def search_chat(
+    chatId: str,
+    q: str,
+    userId: str = None,
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0)
+):
+    if await store.get_chat(chatId) is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    return await _search(q, chatId, userId, limit, offset)
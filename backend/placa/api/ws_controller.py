@@ -1,26 +1,36 @@
+import logging
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from typing import Optional
-import json
+from ..config.rate_limit import RateLimitExceeded, admission, connection_limits, shed
+from ..config.real_time.codec import FrameCodec, select_codec
 from ..config.real_time.ws_manager import manager
 from ..service.ws_service import (
     send_connection_acknowledgment,
     send_error,
-    process_client_message
+    handle_client_message
 )
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+_shed_connections = shed.labels("ws_connect")
 
 
-async def handle_message_loop(websocket: WebSocket, user_id: str):
+async def handle_message_loop(websocket: WebSocket, user_id: str, codec: FrameCodec):
+    limits = connection_limits()
     while True:
-        data = await websocket.receive_text()
-
         try:
-            message_data = json.loads(data)
-            await process_client_message(websocket, user_id, message_data)
+            message_data = await codec.receive(websocket)
+        except ValueError:
+            try:
+                limits.check("frame")
+            except RateLimitExceeded:
+                continue  # a flood of garbage gets no replies past the frame limit
+            await send_error(websocket, f"Invalid {codec.label}", f"Could not parse message as {codec.label}")
+            continue
 
-        except json.JSONDecodeError:
-            await send_error(websocket, "Invalid JSON", "Could not parse message as JSON")
+        manager.touch(websocket, user_id)
+        try:
+            await handle_client_message(websocket, user_id, message_data, limits)
 
         except Exception as e:
             await send_error(websocket, "Processing error", str(e))
@@ -29,23 +39,37 @@ async def handle_message_loop(websocket: WebSocket, user_id: str):
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
-    user_id: Optional[str] = Query(None, alias="userId")
+    user_id: Optional[str] = Query(None, alias="userId"),
+    batch: bool = Query(False),
+    codec_name: Optional[str] = Query(None, alias="codec")
 ):
     if not user_id:
         await websocket.close(code=1008, reason="userId query parameter is required")
         return
 
-    await manager.connect(websocket, user_id)
+    offered = websocket.scope.get("subprotocols", [])
+    codec = select_codec(codec_name, offered)
+    if codec is None:
+        await websocket.close(code=1003, reason=f"Unsupported codec: {codec_name}")
+        return
+
+    if admission.saturated():
+        _shed_connections.inc()
+        await websocket.close(code=1013, reason="Server busy")  # "Try Again Later"
+        return
+
+    subprotocol = codec.name if codec.name in offered else None
+    await manager.connect(websocket, user_id, batch=batch, codec=codec, subprotocol=subprotocol)
 
     await send_connection_acknowledgment(websocket, user_id)
 
     try:
-        await handle_message_loop(websocket, user_id)
+        await handle_message_loop(websocket, user_id, codec)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket, user_id)
-        print(f"Client {user_id} disconnected")
+        logger.debug("Client disconnected", extra={"userId": user_id})
 
-    except Exception as e:
-        print(f"Error in WebSocket connection for user {user_id}: {e}")
+    except Exception:
+        logger.exception("Error in WebSocket connection", extra={"userId": user_id})
         manager.disconnect(websocket, user_id)
\ No newline at end of file
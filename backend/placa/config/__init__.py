@@ -1,3 +1,5 @@
 from .cors import setup_cors
+from .metrics import setup_metrics
+from .rate_limit import setup_admission
 
-__all__ = ["setup_cors"]
\ No newline at end of file
+__all__ = ["setup_admission", "setup_cors", "setup_metrics"]
\ No newline at end of file
@@ -0,0 +1,53 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=`
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record)
+        }
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        time = datetime.fromtimestamp(record.created).isoformat(sep=" ", timespec="milliseconds")
+        fields = "".join(f" {key}={value}" for key, value in _fields(record).items())
+        return f"{time} {record.levelname:<7} {record.name}: {record.getMessage()}{fields}"
+
+
+def setup_logging(level: str, log_format: str) -> logging.handlers.QueueListener:
+    # The event loop only puts records on a queue; a listener thread formats and writes them,
+    # so a slow or blocked stderr never stalls request handling or fan-out
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger("placa")
+    logger.handlers[:] = [logging.handlers.QueueHandler(records)]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    return listener
@@ -0,0 +1,262 @@
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from fastapi import FastAPI
+
+# Seconds, from sub-millisecond fan-out up to slow HTTP requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # One bisect and three increments; buckets are made cumulative only when scraped
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+Child = Union[Counter, Gauge, Histogram]
+
+
+class MetricFamily:
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Sequence[str], factory: Callable[[], Child]):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.children: Dict[LabelValues, Child] = {}
+        self._factory = factory
+        self._default = None if self.label_names else self.labels()
+
+    def labels(self, *values: str) -> Child:
+        # Hot paths should keep the returned child rather than look it up per event
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._factory()
+        return child
+
+    # Shortcuts for families without labels
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default.dec(amount)
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def samples(self) -> List[Tuple[LabelValues, Child]]:
+        return list(self.children.items())
+
+
+class CallbackGauge:
+    # Computed at scrape time from state the app keeps anyway, so the hot path pays nothing
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], callback: Callable):
+        self.name = name
+        self.help = help_text
+        self.kind = "gauge"
+        self.label_names = tuple(label_names)
+        self.callback = callback
+
+    def samples(self) -> List[Tuple[LabelValues, Gauge]]:
+        values = self.callback()
+        if not self.label_names:
+            values = {(): values}
+
+        samples = []
+        for label_values, value in values.items():
+            gauge = Gauge()
+            gauge.set(value)
+            samples.append((label_values, gauge))
+        return samples
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.families: Dict[str, Union[MetricFamily, CallbackGauge]] = {}
+
+    def _register(self, family):
+        if family.name in self.families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, help_text, "counter", labels, Counter))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, help_text, "gauge", labels, Gauge))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> MetricFamily:
+        bounds = tuple(sorted(buckets))
+        return self._register(MetricFamily(name, help_text, "histogram", labels, lambda: Histogram(bounds)))
+
+    def gauge_callback(self, name: str, help_text: str, callback: Callable, labels: Sequence[str] = ()) -> CallbackGauge:
+        return self._register(CallbackGauge(name, help_text, labels, callback))
+
+    def render(self) -> str:
+        # Prometheus text exposition format 0.0.4
+        lines = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for label_values, child in family.samples():
+                if isinstance(child, Histogram):
+                    cumulative = 0
+                    for bound, count in zip((*child.bounds, math.inf), child.counts):
+                        cumulative += count
+                        le = f'le="{_format_value(float(bound))}"'
+                        lines.append(f"{family.name}_bucket{_format_labels(family.label_names, label_values, le)} {cumulative}")
+                    labels = _format_labels(family.label_names, label_values)
+                    lines.append(f"{family.name}_sum{labels} {_format_value(child.sum)}")
+                    lines.append(f"{family.name}_count{labels} {child.count}")
+                else:
+                    lines.append(f"{family.name}{_format_labels(family.label_names, label_values)} {_format_value(child.value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "placa_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    labels=("method", "route", "status")
+)
+event_loop_lag = registry.histogram(
+    "placa_event_loop_lag_seconds",
+    "How late the event loop ran a timer that was due"
+)
+
+
+class MetricsMiddleware:
+    # Plain ASGI rather than BaseHTTPMiddleware, which would add a task and a stream per request
+
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[Tuple[str, str, str], Histogram] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router writes the matched route into scope; labelling by its template keeps
+            # /chats/chat_1 and /chats/chat_2 in one series
+            route = scope.get("route")
+            key = (scope["method"], route.path if route is not None else "unmatched", str(status[0]))
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = http_request_duration.labels(*key)
+            child.observe(time.perf_counter() - started)
+
+
+class LoopLagMonitor:
+
+    def __init__(self, interval: float, on_sample: Optional[Callable[[float], None]] = None):
+        self.interval = interval
+        self._on_sample = on_sample
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - due)
+            event_loop_lag.observe(lag)
+            if self._on_sample is not None:
+                self._on_sample(lag)
+
+
+def setup_metrics(app: FastAPI):
+    app.add_middleware(MetricsMiddleware)
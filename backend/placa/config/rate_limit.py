@@ -0,0 +1,214 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+from fastapi import FastAPI, HTTPException
+from .metrics import registry
+from .settings import (
+    ADMISSION_MAX_INFLIGHT,
+    ADMISSION_MAX_LOOP_LAG_MS,
+    ADMISSION_RETRY_AFTER,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_FRAMES_CONNECTION,
+    RATE_LIMIT_MAX_USERS,
+    RATE_LIMIT_MESSAGES_CONNECTION,
+    RATE_LIMIT_MESSAGES_USER,
+    RATE_LIMIT_SUBSCRIBE_CONNECTION,
+    RATE_LIMIT_SUBSCRIBE_USER,
+    RATE_LIMIT_TYPING_CONNECTION,
+    RATE_LIMIT_TYPING_USER
+)
+
+throttled = registry.counter(
+    "placa_rate_limited_total",
+    "Requests and WebSocket actions refused by a rate limit",
+    labels=("action", "scope")
+)
+shed = registry.counter(
+    "placa_load_shed_total",
+    "Requests, connections and WebSocket actions refused while the server was saturated",
+    labels=("kind",)
+)
+_shed_http = shed.labels("http")
+
+
+class RateLimitExceeded(HTTPException):
+
+    def __init__(self, detail: str, retry_after: float, status_code: int = 429):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+        self.retry_after = round(retry_after, 3)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        # Refilled from the elapsed time on use, so idle buckets cost nothing; returns seconds to wait, 0 if allowed
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if tokens >= 1:
+            self.tokens = tokens - 1
+            return 0.0
+        self.tokens = tokens
+        return (1 - tokens) / self.rate
+
+
+class KeyedLimiter:
+    # One bucket per key. Keys are kept in use order, so the least recently used bucket is dropped once
+    # there are `max_keys`; by then it has usually refilled completely and dropping it loses nothing
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket.take(time.monotonic())
+
+
+class RateLimits:
+    # Per-user buckets for each limited action, shared by all of a user's sockets and HTTP requests
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], max_keys: int, enabled: bool = True):
+        self.enabled = enabled
+        self.users = {action: KeyedLimiter(rate, burst, max_keys) for action, (rate, burst) in limits.items()}
+        self._throttled = {action: throttled.labels(action, "user") for action in limits}
+
+    def check(self, action: str, user_id: str):
+        if not self.enabled:
+            return
+
+        retry_after = self.users[action].take(user_id)
+        if retry_after:
+            self._throttled[action].inc()
+            raise RateLimitExceeded(f"Rate limit exceeded for {action}", retry_after)
+
+
+class ConnectionLimits:
+    # One socket's own buckets; owned by its receive loop, so they go away with it
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], enabled: bool = True):
+        self.enabled = enabled
+        self.buckets = {action: TokenBucket(rate, burst) for action, (rate, burst) in limits.items() if rate > 0}
+        self._throttled = {action: throttled.labels(action, "connection") for action in limits}
+        self.notified_until = 0.0  # monotonic time until which further throttled frames are dropped silently
+
+    def check(self, action: str):
+        bucket = self.buckets.get(action) if self.enabled else None
+        if bucket is None:
+            return
+
+        retry_after = bucket.take(time.monotonic())
+        if retry_after:
+            self._throttled[action].inc()
+            raise RateLimitExceeded(f"Rate limit exceeded for {action}", retry_after)
+
+    def should_notify(self, retry_after: float) -> bool:
+        # One throttled reply per retry window; answering every flooded frame would just amplify the flood
+        now = time.monotonic()
+        if now < self.notified_until:
+            return False
+        self.notified_until = now + retry_after
+        return True
+
+
+class AdmissionController:
+    # Global load shedding: refuse new work while too much is in progress or the event loop is running late
+
+    def __init__(self, max_inflight: int, max_loop_lag: float):
+        self.max_inflight = max_inflight
+        self.max_loop_lag = max_loop_lag  # seconds; 0 disables the lag check
+        self.inflight = 0
+        self.loop_lag = 0.0  # latest sample from the loop lag monitor
+
+    def record_loop_lag(self, lag: float):
+        self.loop_lag = lag
+
+    def saturated(self) -> bool:
+        return (
+            (self.max_inflight > 0 and self.inflight >= self.max_inflight)
+            or (self.max_loop_lag > 0 and self.loop_lag > self.max_loop_lag)
+        )
+
+    def enter(self) -> bool:
+        if self.saturated():
+            return False
+        self.inflight += 1
+        return True
+
+    def leave(self):
+        self.inflight -= 1
+
+
+class AdmissionMiddleware:
+    # Plain ASGI like MetricsMiddleware; only API requests are shed, never /metrics or the SPA
+
+    def __init__(self, app, admission: AdmissionController, retry_after: float):
+        self.app = app
+        self.admission = admission
+        self.retry_after = str(max(1, math.ceil(retry_after)))
+        self._body = json.dumps({"detail": "Server busy, retry later"}).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.admission.enter():
+            _shed_http.inc()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(self._body)).encode()),
+                    (b"retry-after", self.retry_after.encode())
+                ]
+            })
+            await send({"type": "http.response.body", "body": self._body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.leave()
+
+
+rate_limits = RateLimits(
+    {"message": RATE_LIMIT_MESSAGES_USER, "typing": RATE_LIMIT_TYPING_USER, "subscribe": RATE_LIMIT_SUBSCRIBE_USER},
+    RATE_LIMIT_MAX_USERS,
+    enabled=RATE_LIMIT_ENABLED
+)
+CONNECTION_LIMITS = {
+    "frame": RATE_LIMIT_FRAMES_CONNECTION,
+    "message": RATE_LIMIT_MESSAGES_CONNECTION,
+    "typing": RATE_LIMIT_TYPING_CONNECTION,
+    "subscribe": RATE_LIMIT_SUBSCRIBE_CONNECTION
+}
+admission = AdmissionController(ADMISSION_MAX_INFLIGHT, ADMISSION_MAX_LOOP_LAG_MS / 1000)
+
+
+def connection_limits() -> ConnectionLimits:
+    return ConnectionLimits(CONNECTION_LIMITS, enabled=RATE_LIMIT_ENABLED)
+
+
+def setup_admission(app: FastAPI):
+    app.add_middleware(AdmissionMiddleware, admission=admission, retry_after=ADMISSION_RETRY_AFTER)
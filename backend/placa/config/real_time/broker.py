@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import struct
+from typing import Optional, Set, Tuple
+from .outbound import OutboundFrame
+
+logger = logging.getLogger(__name__)
+
+# Record: u32 body length, then body = u8 scope + u64 frame seq (0 = none) + five length-prefixed
+# UTF-8 fields (key, exclude_user, frame type, frame chat id, frame data). The broker relays records opaquely.
+_LENGTH = struct.Struct("!I")
+_FIELDS = struct.Struct("!BQHHHHI")
+_MAX_PEER_BUFFER = 16 * 1024 * 1024  # a worker this far behind is disconnected and will reconnect
+
+
+def pack_record(scope: str, key: str, exclude_user: Optional[str], frame: OutboundFrame) -> bytes:
+    fields = [
+        (key or "").encode(),
+        (exclude_user or "").encode(),
+        (frame.type or "").encode(),
+        (frame.chat_id or "").encode(),
+        frame.data.encode()
+    ]
+    body = _FIELDS.pack(ord(scope), frame.seq or 0, *(len(field) for field in fields)) + b"".join(fields)
+    return _LENGTH.pack(len(body)) + body
+
+
+def unpack_record(body: bytes) -> Tuple[str, str, Optional[str], OutboundFrame]:
+    scope, seq, *lengths = _FIELDS.unpack_from(body)
+    offset = _FIELDS.size
+    values = []
+    for length in lengths:
+        values.append(body[offset:offset + length].decode())
+        offset += length
+
+    key, exclude_user, frame_type, frame_chat_id, data = values
+    frame = OutboundFrame(type=frame_type or None, chat_id=frame_chat_id or None, data=data, seq=seq or None)
+    return chr(scope), key, exclude_user or None, frame
+
+
+async def read_record(reader: asyncio.StreamReader) -> bytes:
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return await reader.readexactly(length)
+
+
+class BusBroker:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.peers: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket left by a crashed broker; we hold the election lock
+        self._server = await asyncio.start_unix_server(self._handle_peer, path=self.path)
+        logger.info("Bus broker listening", extra={"path": self.path})
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for peer in list(self.peers):
+                peer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.peers.add(writer)
+        try:
+            while True:
+                body = await read_record(reader)
+                record = _LENGTH.pack(len(body)) + body
+                # Publishers already delivered to their own sockets, so relay to everyone else
+                for peer in list(self.peers):
+                    if peer is writer:
+                        continue
+                    if peer.transport.get_write_buffer_size() > _MAX_PEER_BUFFER:
+                        self.peers.discard(peer)
+                        peer.close()
+                        continue
+                    peer.write(record)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.peers.discard(writer)
+            writer.close()
@@ -0,0 +1,131 @@
+import asyncio
+import fcntl
+import logging
+import os
+from typing import Callable, Optional
+from .broker import BusBroker, pack_record, read_record, unpack_record
+from .fanout import FanoutResult
+from .outbound import OutboundFrame
+
+logger = logging.getLogger(__name__)
+
+class BusScope:
+    CHAT = "c"  # key is a chat id
+    USER = "u"  # key is a user id
+    ALL = "a"   # every connected user
+
+
+DeliverCallback = Callable[[str, str, Optional[str], OutboundFrame], FanoutResult]
+
+
+class MessageBus:
+
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    def publish(self, scope: str, key: str, exclude_user: Optional[str], frame: OutboundFrame) -> FanoutResult:
+        # Every implementation delivers to this process's sockets synchronously and returns that result
+        return self._deliver(scope, key, exclude_user, frame)
+
+
+class LocalBus(MessageBus):
+    pass
+
+
+class UnixSocketBus(MessageBus):
+
+    def __init__(self, path: str, reconnect_delay: float = 0.5):
+        super().__init__()
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._broker: Optional[BusBroker] = None
+        self._lock_fd: Optional[int] = None
+
+    async def start(self, deliver: DeliverCallback):
+        await super().start(deliver)
+        self._runner = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning("Bus not connected yet, retrying in background", extra={"path": self.path})
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+        if self._broker:
+            await self._broker.stop()
+            self._broker = None
+
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def publish(self, scope: str, key: str, exclude_user: Optional[str], frame: OutboundFrame) -> FanoutResult:
+        if self._writer is not None:
+            self._writer.write(pack_record(scope, key, exclude_user, frame))
+        else:
+            logger.warning("Bus disconnected, event reached local subscribers only", extra={"eventType": frame.type})
+        return super().publish(scope, key, exclude_user, frame)
+
+    async def _elect_broker(self):
+        # The worker holding the lock file hosts the broker; the lock dies with the process
+        if self._broker is not None:
+            return
+
+        fd = os.open(f"{self.path}.lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return
+
+        self._lock_fd = fd
+        self._broker = BusBroker(self.path)
+        await self._broker.start()
+
+    async def _run(self):
+        while True:
+            await self._elect_broker()
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self._writer = writer
+            self._connected.set()
+            try:
+                while True:
+                    self._deliver(*unpack_record(await read_record(reader)))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("Bus connection lost, reconnecting", extra={"path": self.path})
+            finally:
+                self._writer = None
+                self._connected.clear()
+                writer.close()
+
+            await asyncio.sleep(self.reconnect_delay)
+
+
+def create_bus(backend: str, path: str) -> MessageBus:
+    if backend == "local":
+        return LocalBus()
+    if backend == "unix":
+        return UnixSocketBus(path)
+    raise ValueError(f"Unknown bus backend: {backend}")
@@ -0,0 +1,91 @@
+import json
+import struct
+from typing import Any, List, Optional, Union
+from fastapi import WebSocket
+from .outbound import OutboundFrame
+
+try:
+    import msgpack
+except ImportError:  # optional; only needed by clients that ask for the msgpack codec
+    msgpack = None
+
+
+class FrameCodec:
+    name = ""
+    label = ""
+    binary = False
+
+    def encode(self, frame: OutboundFrame) -> Union[str, bytes]:
+        # Cached on the frame, so each event is encoded once per codec however many sockets get it
+        payload = frame.encoded.get(self.name)
+        if payload is None:
+            payload = frame.encoded[self.name] = self._encode(frame)
+        return payload
+
+    def _encode(self, frame: OutboundFrame) -> Union[str, bytes]:
+        raise NotImplementedError
+
+    def join(self, payloads: List[Union[str, bytes]]) -> Union[str, bytes]:
+        raise NotImplementedError
+
+    async def receive(self, websocket: WebSocket) -> Any:
+        raise NotImplementedError
+
+    async def send(self, websocket: WebSocket, payload: Union[str, bytes]):
+        if self.binary:
+            await websocket.send_bytes(payload)
+        else:
+            await websocket.send_text(payload)
+
+
+class JsonCodec(FrameCodec):
+    name = "json"
+    label = "JSON"
+
+    def _encode(self, frame: OutboundFrame) -> str:
+        return frame.data
+
+    def join(self, payloads: List[str]) -> str:
+        return "[" + ",".join(payloads) + "]"
+
+    async def receive(self, websocket: WebSocket) -> Any:
+        return json.loads(await websocket.receive_text())
+
+
+class MsgpackCodec(FrameCodec):
+    name = "msgpack"
+    label = "MessagePack"
+    binary = True
+
+    def _encode(self, frame: OutboundFrame) -> bytes:
+        return msgpack.packb(json.loads(frame.data))
+
+    def join(self, payloads: List[bytes]) -> bytes:
+        # Array header followed by the already packed elements
+        count = len(payloads)
+        if count < 16:
+            header = bytes([0x90 | count])
+        elif count < 0x10000:
+            header = b"\xdc" + struct.pack("!H", count)
+        else:
+            header = b"\xdd" + struct.pack("!I", count)
+        return header + b"".join(payloads)
+
+    async def receive(self, websocket: WebSocket) -> Any:
+        return msgpack.unpackb(await websocket.receive_bytes())
+
+
+JSON_CODEC = JsonCodec()
+CODECS = {JSON_CODEC.name: JSON_CODEC}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+
+
+def select_codec(requested: Optional[str], subprotocols: List[str]) -> Optional[FrameCodec]:
+    # An explicit ?codec= wins; otherwise the first offered subprotocol we know; otherwise JSON
+    if requested:
+        return CODECS.get(requested)
+    for subprotocol in subprotocols:
+        if subprotocol in CODECS:
+            return CODECS[subprotocol]
+    return JSON_CODEC
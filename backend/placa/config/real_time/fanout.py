@@ -0,0 +1,41 @@
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+from .outbound import OutboundFrame, OutboundQueue
+from ...model.serializers import Event, event_field, to_json
+
+
+@dataclass
+class FanoutResult:
+    targets: int = 0
+    delivered: int = 0
+    dropped: int = 0
+    duration_ms: float = 0.0
+
+
+def encode_frame(message: Event) -> OutboundFrame:
+    # Encoded once per event instead of once per socket
+    return OutboundFrame(
+        type=event_field(message, "type"),
+        chat_id=event_field(message, "chatId"),
+        data=to_json(message)
+    )
+
+
+class FanoutEngine:
+
+    def fan_out(self, frame: OutboundFrame, targets: List[Tuple[str, OutboundQueue]]) -> FanoutResult:
+        result = FanoutResult(targets=len(targets))
+        if not targets:
+            return result
+
+        started = time.perf_counter()
+        # Each socket has its own writer task, so fan-out only enqueues and never waits on the network
+        for _, queue in targets:
+            if queue.put(frame):
+                result.delivered += 1
+            else:
+                result.dropped += 1
+
+        result.duration_ms = (time.perf_counter() - started) * 1000
+        return result
@@ -0,0 +1,101 @@
+import asyncio
+import math
+import time
+from typing import Callable, Dict, List, Optional
+from fastapi import WebSocket
+
+
+class HeartbeatEntry:
+    __slots__ = ("websocket", "user_id", "last_seen", "pinged_at", "active")
+
+    def __init__(self, websocket: WebSocket, user_id: str, now: float):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.last_seen = now  # monotonic time of the last frame received on the socket
+        self.pinged_at: Optional[float] = None  # set while a ping is waiting for any reply
+        self.active = True
+
+
+class HeartbeatWheel:
+    # One task walks a ring of slots instead of running a timer per socket. Receiving a frame only
+    # stamps the entry; when the entry's slot comes round the wheel decides to ping, keep waiting or reap.
+
+    def __init__(
+        self,
+        interval: float,
+        timeout: float,
+        tick: float,
+        on_ping: Callable[[HeartbeatEntry], None],
+        on_dead: Callable[[HeartbeatEntry], None]
+    ):
+        self.interval = interval  # seconds of silence before a ping
+        self.timeout = timeout  # seconds to wait for anything after the ping
+        self.tick = tick
+        self.slots: List[List[HeartbeatEntry]] = [[] for _ in range(math.ceil(max(interval, timeout) / tick) + 1)]
+        self.cursor = 0
+        self.entries: Dict[WebSocket, HeartbeatEntry] = {}
+
+        self._on_ping = on_ping
+        self._on_dead = on_dead
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def track(self, websocket: WebSocket, user_id: str):
+        entry = self.entries[websocket] = HeartbeatEntry(websocket, user_id, time.monotonic())
+        self._schedule(entry, self.interval)
+
+    def touch(self, websocket: WebSocket):
+        entry = self.entries.get(websocket)
+        if entry is not None:
+            entry.last_seen = time.monotonic()
+
+    def forget(self, websocket: WebSocket):
+        # Removed entries stay in their slot and are skipped when it comes round
+        entry = self.entries.pop(websocket, None)
+        if entry is not None:
+            entry.active = False
+
+    def _schedule(self, entry: HeartbeatEntry, delay: float):
+        ticks = min(len(self.slots) - 1, max(1, math.ceil(delay / self.tick)))
+        self.slots[(self.cursor + ticks) % len(self.slots)].append(entry)
+
+    def _check(self, entry: HeartbeatEntry, now: float):
+        if entry.pinged_at is not None:
+            if entry.last_seen < entry.pinged_at:
+                waited = now - entry.pinged_at
+                if waited >= self.timeout:
+                    self.forget(entry.websocket)
+                    self._on_dead(entry)
+                else:
+                    self._schedule(entry, self.timeout - waited)
+                return
+            entry.pinged_at = None
+
+        idle = now - entry.last_seen
+        if idle >= self.interval:
+            # Only silent sockets are pinged; a client that is sending anything is known to be alive
+            entry.pinged_at = now
+            self._on_ping(entry)
+            self._schedule(entry, self.timeout)
+        else:
+            self._schedule(entry, self.interval - idle)
+
+    def advance(self):
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        due, self.slots[self.cursor] = self.slots[self.cursor], []
+        now = time.monotonic()
+        for entry in due:
+            if entry.active:
+                self._check(entry, now)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.advance()
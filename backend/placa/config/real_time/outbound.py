@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Optional
+from fastapi import WebSocket
+from ..metrics import SIZE_BUCKETS, registry
+
+if TYPE_CHECKING:
+    from .codec import FrameCodec
+
+logger = logging.getLogger(__name__)
+
+frames_sent = registry.counter("placa_ws_frames_sent_total", "WebSocket frames written, a batch counting once")
+frames_dropped = registry.counter(
+    "placa_outbound_frames_dropped_total",
+    "Queued frames discarded to make room for newer ones",
+    labels=("reason",)
+)
+send_failures = registry.counter(
+    "placa_ws_send_failures_total",
+    "Sockets dropped because a send failed, timed out or the queue overflowed",
+    labels=("reason",)
+)
+batch_size = registry.histogram(
+    "placa_outbound_batch_frames",
+    "Frames per write for sockets connected with ?batch=true",
+    buckets=SIZE_BUCKETS
+)
+_typing_dropped = frames_dropped.labels("typing")
+_update_coalesced = frames_dropped.labels("coalesced")
+_queue_full = send_failures.labels("queue_full")
+_send_failed = send_failures.labels("send_failed")
+
+
+class OverflowPolicy:
+    DROP_TYPING = "drop_typing"  # evict the oldest queued typing_users frame
+    COALESCE = "coalesce"        # drop chat_update and typing_users frames a newer frame for the chat supersedes
+    DISCONNECT = "disconnect"    # close the slow client straight away
+
+    ALL = (DROP_TYPING, COALESCE, DISCONNECT)
+
+
+@dataclass
+class OutboundFrame:
+    type: Optional[str]
+    chat_id: Optional[str]
+    data: str
+    seq: Optional[int] = None  # set on new_message frames so they can be replayed
+    encoded: Dict[str, Any] = field(default_factory=dict, repr=False)  # codec name -> payload
+
+
+def _has_unread_count(frame: OutboundFrame) -> bool:
+    return json.loads(frame.data).get("unreadCount") is not None
+
+
+class OutboundQueue:
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        on_evict: Callable[["OutboundQueue"], None],
+        maxsize: int,
+        policy: str,
+        send_timeout: float,
+        close_code: int,
+        codec: "FrameCodec",
+        batch_window: float = 0
+    ):
+        if policy not in OverflowPolicy.ALL:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+
+        self.websocket = websocket
+        self.user_id = user_id
+        self.maxsize = maxsize
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.close_code = close_code
+        self.codec = codec
+        self.batch_window = batch_window  # seconds; when set, frames within the window go out as one JSON array
+        self.closed = False
+
+        self._on_evict = on_evict
+        self._frames: Deque[OutboundFrame] = deque()
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._frames)
+
+    def start(self):
+        self._writer = asyncio.create_task(self._drain())
+
+    def stop(self):
+        self.closed = True
+        self._frames.clear()
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    def put(self, frame: OutboundFrame) -> bool:
+        if self.closed:
+            return False
+
+        if len(self._frames) >= self.maxsize and not self._make_room(frame):
+            _queue_full.inc()
+            self._evict("Slow consumer: outbound queue full")
+            return False
+
+        self._frames.append(frame)
+        self._ready.set()
+        return True
+
+    def _make_room(self, incoming: OutboundFrame) -> bool:
+        if self.policy == OverflowPolicy.DROP_TYPING:
+            for queued in self._frames:
+                if queued.type == "typing_users":
+                    self._frames.remove(queued)
+                    _typing_dropped.inc()
+                    return True
+
+        elif self.policy == OverflowPolicy.COALESCE:
+            # Newest first, remembering which chats already have newer state behind the frame looked at.
+            # A new_message carries the chat list fields too, but not an unread count
+            chat_lists, last_messages, typing = set(), set(), set()
+            frames = [incoming, *reversed(self._frames)]
+            for position, queued in enumerate(frames):
+                chat_id = queued.chat_id
+                if queued.type == "typing_users":
+                    superseded = chat_id in typing
+                    typing.add(chat_id)
+                elif queued.type == "chat_update":
+                    superseded = chat_id in chat_lists or (chat_id in last_messages and not _has_unread_count(queued))
+                    chat_lists.add(chat_id)
+                elif queued.type == "new_message":
+                    superseded = False
+                    last_messages.add(chat_id)
+                else:
+                    continue
+                if superseded:
+                    del self._frames[len(frames) - 1 - position]
+                    _update_coalesced.inc()
+                    return True
+
+        return False
+
+    def _evict(self, reason: str):
+        self._on_evict(self)
+        self.close(self.close_code, reason)
+
+    def close(self, code: int, reason: str):
+        self.stop()
+        self._closer = asyncio.create_task(self._close(code, reason))
+
+    async def _close(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    def _take_batch(self):
+        frames = list(self._frames)
+        self._frames.clear()
+        batch_size.observe(len(frames))
+        if len(frames) == 1:
+            return self.codec.encode(frames[0])
+        return self.codec.join([self.codec.encode(frame) for frame in frames])
+
+    async def _drain(self):
+        while not self.closed:
+            await self._ready.wait()
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)  # let the rest of the burst pile up behind the first frame
+            self._ready.clear()
+
+            while self._frames:
+                payload = self._take_batch() if self.batch_window else self.codec.encode(self._frames.popleft())
+                try:
+                    await asyncio.wait_for(self.codec.send(self.websocket, payload), timeout=self.send_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    _send_failed.inc()
+                    logger.info("Send to %s failed", self.user_id, extra={"userId": self.user_id, "error": repr(e)})
+                    self._evict("Send failed or timed out")
+                    return
+                frames_sent.inc()
@@ -0,0 +1,94 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Set
+
+
+class PresenceTracker:
+
+    def __init__(self):
+        self.online: Set[str] = set()  # users with a socket on this worker
+        self.last_seen: Dict[str, float] = {}  # userId -> epoch seconds of the last frame or disconnect
+        self.remote: Dict[str, Set[str]] = {}  # worker id -> users online there, from its presence signals
+        self._heard: Dict[str, float] = {}  # worker id -> monotonic time of its last presence signal
+        self._changed: Dict[str, bool] = {}  # userId -> whether it was online before the first unflushed change
+        self._local_changed: Set[str] = set()  # users whose status on this worker is not published yet
+
+    def is_online(self, user_id: str) -> bool:
+        return user_id in self.online or any(user_id in users for users in self.remote.values())
+
+    def connected(self, user_id: str):
+        self._changed.setdefault(user_id, self.is_online(user_id))
+        self._local_changed.add(user_id)
+        self.online.add(user_id)
+        self.last_seen[user_id] = time.time()
+
+    def disconnected(self, user_id: str):
+        self._changed.setdefault(user_id, self.is_online(user_id))
+        self._local_changed.add(user_id)
+        self.online.discard(user_id)
+        self.last_seen[user_id] = time.time()
+
+    def seen(self, user_id: str):
+        self.last_seen[user_id] = time.time()
+
+    def local_signal(self, full: bool) -> List[list]:
+        # [userId, online here, lastSeen] for users changed on this worker since the last signal,
+        # or for everyone online here when `full`, so peers can drop users they missed going offline
+        user_ids = self.online if full else self._local_changed
+        users = [[user_id, user_id in self.online, self.last_seen.get(user_id)] for user_id in user_ids]
+        self._local_changed = set()
+        return users
+
+    def apply_remote(self, worker: str, users: List[list], full: bool):
+        self._heard[worker] = time.monotonic()
+        online_there = self.remote.setdefault(worker, set())
+        updates = {user_id: online for user_id, online, _ in users}
+        if full:
+            updates.update((user_id, False) for user_id in online_there if user_id not in updates)
+
+        for user_id, _, last_seen in users:
+            if last_seen is not None and last_seen > self.last_seen.get(user_id, 0):
+                self.last_seen[user_id] = last_seen
+        for user_id, online in updates.items():
+            before = self.is_online(user_id)
+            if online:
+                online_there.add(user_id)
+            else:
+                online_there.discard(user_id)
+            if before != self.is_online(user_id):
+                self._changed.setdefault(user_id, before)
+
+    def forget_worker(self, worker: str):
+        self.apply_remote(worker, [], True)
+        del self.remote[worker]
+        del self._heard[worker]
+
+    def expire_remote(self, timeout: float):
+        # A worker that stopped signalling (crashed, or cut off from the bus) no longer keeps its users online
+        now = time.monotonic()
+        for worker in [worker for worker, heard in self._heard.items() if now - heard > timeout]:
+            self.forget_worker(worker)
+
+    def status(self, user_id: str) -> dict:
+        last_seen = self.last_seen.get(user_id)
+        return {
+            "userId": user_id,
+            "status": "online" if self.is_online(user_id) else "offline",
+            "lastSeen": datetime.fromtimestamp(last_seen) if last_seen is not None else None
+        }
+
+    def pending_users(self) -> List[str]:
+        return list(self._changed)
+
+    def take_changes(self) -> List[dict]:
+        # A reconnect inside one flush window cancels out and is not reported
+        changes = [
+            self.status(user_id)
+            for user_id, was_online in self._changed.items()
+            if was_online != self.is_online(user_id)
+        ]
+        self._changed.clear()
+        return changes
+
+    def lookup(self, user_ids: List[str]) -> List[dict]:
+        return [self.status(user_id) for user_id in user_ids]
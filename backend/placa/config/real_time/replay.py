@@ -0,0 +1,54 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from .outbound import OutboundFrame
+
+
+class ReplayLog:
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffers: Dict[str, Deque[Tuple[int, OutboundFrame]]] = {}
+
+    def record(self, chat_id: str, seq: int, frame: OutboundFrame):
+        buffer = self._buffers.get(chat_id)
+        if buffer is None:
+            buffer = self._buffers[chat_id] = deque(maxlen=self.capacity)
+        if not buffer or seq > buffer[-1][0]:
+            buffer.append((seq, frame))
+            return
+
+        # With several workers a peer's frame can arrive before this worker's own lower seq
+        if len(buffer) == buffer.maxlen:
+            if seq < buffer[0][0]:
+                return
+            buffer.popleft()
+        position = len(buffer)
+        while position > 0 and buffer[position - 1][0] > seq:
+            position -= 1
+        buffer.insert(position, (seq, frame))
+
+    def since(self, chat_id: str, since_seq: int, latest_seq: int) -> Optional[List[OutboundFrame]]:
+        # Frames since_seq+1 .. latest_seq, or None when the ring does not hold every one of them:
+        # it no longer reaches back that far, or some seqs were never recorded (e.g. a quiet import)
+        if since_seq >= latest_seq:
+            return []
+
+        buffer = self._buffers.get(chat_id)
+        if not buffer:
+            return None
+
+        missed = []
+        expected = latest_seq
+        for seq, frame in reversed(buffer):
+            if seq > latest_seq:
+                continue  # recorded from the bus before this worker's latest_seq caught up
+            if seq <= since_seq:
+                break
+            if seq != expected:
+                return None
+            missed.append(frame)
+            expected -= 1
+        if expected != since_seq:
+            return None
+        missed.reverse()
+        return missed
@@ -0,0 +1,63 @@
+import time
+from typing import Dict, List, Set, Tuple
+
+
+class TypingTracker:
+
+    def __init__(self, throttle_ms: float, ttl_ms: float):
+        self.throttle = throttle_ms / 1000
+        self.ttl = ttl_ms / 1000
+
+        self.typing: Dict[str, Dict[str, Tuple[str, float]]] = {}  # chatId -> userId -> (username, expires at)
+        self._last_published: Dict[Tuple[str, str], Tuple[bool, float]] = {}  # (userId, chatId) -> (isTyping, at)
+        self._changed: Set[str] = set()
+
+    def should_publish(self, chat_id: str, user_id: str, is_typing: bool) -> bool:
+        # Origin-side throttle: repeats of the same state inside the window are dropped before the bus
+        now = time.monotonic()
+        key = (user_id, chat_id)
+        last = self._last_published.get(key)
+        if last is not None and last[0] == is_typing and now - last[1] < self.throttle:
+            return False
+
+        if is_typing:
+            self._last_published[key] = (is_typing, now)
+        else:
+            self._last_published.pop(key, None)
+        return True
+
+    def apply(self, chat_id: str, user_id: str, username: str, is_typing: bool):
+        users = self.typing.setdefault(chat_id, {})
+        if is_typing:
+            if user_id not in users:
+                self._changed.add(chat_id)
+            users[user_id] = (username, time.monotonic() + self.ttl)
+        elif users.pop(user_id, None) is not None:
+            self._changed.add(chat_id)
+
+        if not users:
+            del self.typing[chat_id]
+
+    def expire(self):
+        now = time.monotonic()
+        for chat_id in list(self.typing):
+            users = self.typing[chat_id]
+            for user_id in [user_id for user_id, (_, expires_at) in users.items() if expires_at <= now]:
+                del users[user_id]
+                self._changed.add(chat_id)
+            if not users:
+                del self.typing[chat_id]
+
+        for key in [key for key, (_, at) in self._last_published.items() if now - at > self.ttl]:
+            del self._last_published[key]
+
+    def take_changes(self) -> List[Tuple[str, List[dict]]]:
+        changes = [
+            (chat_id, [
+                {"userId": user_id, "username": username}
+                for user_id, (username, _) in self.typing.get(chat_id, {}).items()
+            ])
+            for chat_id in self._changed
+        ]
+        self._changed.clear()
+        return changes
@@ -1,75 +1,375 @@
+import asyncio
+import heapq
+import json
+import logging
+import uuid
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
+from .bus import BusScope, MessageBus, create_bus
+from .codec import JSON_CODEC, FrameCodec
+from .fanout import FanoutEngine, FanoutResult, encode_frame
+from .heartbeat import HeartbeatEntry, HeartbeatWheel
+from .outbound import OutboundFrame, OutboundQueue
+from .presence import PresenceTracker
+from .replay import ReplayLog
+from .typing import TypingTracker
+from ...model.notification import TypingUsersNotification
+from ...model.serializers import Event
+from ..metrics import SIZE_BUCKETS, registry
+from ..settings import (
+    BUS_BACKEND,
+    BUS_SOCKET_PATH,
+    FANOUT_SEND_TIMEOUT,
+    HEARTBEAT_CLOSE_CODE,
+    HEARTBEAT_INTERVAL_MS,
+    HEARTBEAT_TICK_MS,
+    HEARTBEAT_TIMEOUT_MS,
+    METRICS_TOP_CHATS,
+    OUTBOUND_BATCH_MS,
+    OUTBOUND_QUEUE_SIZE,
+    OUTBOUND_OVERFLOW_POLICY,
+    REPLAY_BUFFER_SIZE,
+    SLOW_CONSUMER_CLOSE_CODE,
+    TYPING_FLUSH_INTERVAL_MS,
+    TYPING_THROTTLE_MS,
+    TYPING_TTL_MS
+)
+
+TYPING_SIGNAL = "typing_signal"  # bus-only frame that feeds every worker's TypingTracker; never sent to sockets
+READ_SIGNAL = "read_signal"  # bus-only frame that moves a user's read cursor in every worker
+PRESENCE_SIGNAL = "presence_signal"  # bus-only frame with one worker's online/offline changes
+PING_FRAME = encode_frame({"type": "ping"})  # shared by every ping; clients answer with {"type": "pong"}
+SCOPE_LABELS = {BusScope.CHAT: "chat", BusScope.USER: "user", BusScope.ALL: "all"}
+
+logger = logging.getLogger(__name__)
+
+connections_opened = registry.counter("placa_ws_connections_opened_total", "WebSocket connections accepted")
+connections_closed = registry.counter("placa_ws_connections_closed_total", "WebSocket connections removed")
+evictions = registry.counter("placa_ws_slow_consumer_evictions_total", "Sockets closed for falling behind")
+pings_sent = registry.counter("placa_ws_pings_sent_total", "Heartbeat pings sent to silent sockets")
+heartbeat_reaped = registry.counter("placa_ws_heartbeat_reaped_total", "Sockets closed for not answering a ping")
+fanout_recipients = registry.histogram(
+    "placa_fanout_recipients",
+    "Local sockets targeted per published event",
+    labels=("scope",),
+    buckets=SIZE_BUCKETS
+)
+fanout_duration = registry.histogram(
+    "placa_fanout_duration_seconds",
+    "Time to enqueue one event on every targeted local socket",
+    labels=("scope",)
+)
+fanout_dropped = registry.counter(
+    "placa_fanout_dropped_total",
+    "Fan-out deliveries refused by a closed or overflowing queue",
+    labels=("scope",)
+)
+_fanout_metrics = {
+    scope: (fanout_recipients.labels(label), fanout_duration.labels(label), fanout_dropped.labels(label))
+    for scope, label in SCOPE_LABELS.items()
+}
 
 class ConnectionManager:
 
-    def __init__(self):
+    def __init__(self, bus: MessageBus):
+        self.bus = bus
         self.active_connections: Dict[str, List[WebSocket]] = {}
         self.chat_subscriptions: Dict[str, set] = {}
+        self.user_subscriptions: Dict[str, set] = {}  # reverse index of chat_subscriptions
+        self.outbound_queues: Dict[WebSocket, OutboundQueue] = {}
+        self.fanout = FanoutEngine()
+        self.replay = ReplayLog(REPLAY_BUFFER_SIZE)
+        self.typing = TypingTracker(TYPING_THROTTLE_MS, TYPING_TTL_MS)
+        self.presence = PresenceTracker()
+        self.worker_id = uuid.uuid4().hex  # tells this worker's presence signals apart from its peers'
+        self.heartbeat: Optional[HeartbeatWheel] = None
+        if HEARTBEAT_INTERVAL_MS > 0:
+            self.heartbeat = HeartbeatWheel(
+                HEARTBEAT_INTERVAL_MS / 1000,
+                HEARTBEAT_TIMEOUT_MS / 1000,
+                HEARTBEAT_TICK_MS / 1000,
+                on_ping=self._ping,
+                on_dead=self._reap
+            )
+        # Set by the app: chat seqs and read cursors that arrive over the bus, from this worker or another
+        self.on_seq: Optional[Callable[[str, int], None]] = None
+        self.on_read: Optional[Callable[[str, str, int], None]] = None
+        self._typing_flusher: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.bus.start(self.deliver_local)
+        self._typing_flusher = asyncio.create_task(self._flush_typing())
+        if self.heartbeat:
+            self.heartbeat.start()
+
+    async def stop(self):
+        if self.heartbeat:
+            self.heartbeat.stop()
+        if self._typing_flusher:
+            self._typing_flusher.cancel()
+            self._typing_flusher = None
+        await self.bus.stop()
 
-    async def connect(self, websocket: WebSocket, user_id: str):
-        await websocket.accept()
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        batch: bool = False,
+        codec: FrameCodec = JSON_CODEC,
+        subprotocol: Optional[str] = None
+    ):
+        await websocket.accept(subprotocol=subprotocol)
 
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
+            self.presence.connected(user_id)
 
         self.active_connections[user_id].append(websocket)
-        print(f"User {user_id} connected. Total connections: {len(self.active_connections[user_id])}")
+
+        queue = OutboundQueue(
+            websocket,
+            user_id,
+            on_evict=self._evict_slow_consumer,
+            maxsize=OUTBOUND_QUEUE_SIZE,
+            policy=OUTBOUND_OVERFLOW_POLICY,
+            send_timeout=FANOUT_SEND_TIMEOUT,
+            close_code=SLOW_CONSUMER_CLOSE_CODE,
+            codec=codec,
+            batch_window=OUTBOUND_BATCH_MS / 1000 if batch else 0
+        )
+        self.outbound_queues[websocket] = queue
+        queue.start()
+        if self.heartbeat:
+            self.heartbeat.track(websocket, user_id)
+        connections_opened.inc()
+        logger.debug("User connected", extra={"userId": user_id, "connections": len(self.active_connections[user_id])})
 
     def disconnect(self, websocket: WebSocket, user_id: str):
+        queue = self.outbound_queues.pop(websocket, None)
+        if queue is not None:
+            queue.stop()
+            connections_closed.inc()
+        if self.heartbeat:
+            self.heartbeat.forget(websocket)
+
         if user_id in self.active_connections:
             if websocket in self.active_connections[user_id]:
                 self.active_connections[user_id].remove(websocket)
-                print(f"User {user_id} disconnected. Remaining connections: {len(self.active_connections[user_id])}")
+                logger.debug(
+                    "User disconnected",
+                    extra={"userId": user_id, "connections": len(self.active_connections[user_id])}
+                )
 
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
-                for chat_id in list(self.chat_subscriptions.keys()):
-                    if user_id in self.chat_subscriptions[chat_id]:
-                        self.chat_subscriptions[chat_id].remove(user_id)
-                    if not self.chat_subscriptions[chat_id]:
-                        del self.chat_subscriptions[chat_id]
+                self.presence.disconnected(user_id)
+                for chat_id in self.user_subscriptions.pop(user_id, ()):
+                    self._remove_subscriber(chat_id, user_id)
+
+    def _remove_subscriber(self, chat_id: str, user_id: str):
+        subscribers = self.chat_subscriptions.get(chat_id)
+        if subscribers is not None:
+            subscribers.discard(user_id)
+            if not subscribers:
+                del self.chat_subscriptions[chat_id]
 
     def subscribe_to_chat(self, user_id: str, chat_id: str):
-        if chat_id not in self.chat_subscriptions:
-            self.chat_subscriptions[chat_id] = set()
+        self.subscribe_to_chats(user_id, [chat_id])
+        logger.debug("User subscribed", extra={"userId": user_id, "chatId": chat_id})
 
-        self.chat_subscriptions[chat_id].add(user_id)
-        print(f"User {user_id} subscribed to chat {chat_id}")
+    def subscribe_to_chats(self, user_id: str, chat_ids: List[str]):
+        if not chat_ids:
+            return
+
+        user_chats = self.user_subscriptions.setdefault(user_id, set())
+        for chat_id in chat_ids:
+            self.chat_subscriptions.setdefault(chat_id, set()).add(user_id)
+            user_chats.add(chat_id)
 
     def unsubscribe_from_chat(self, user_id: str, chat_id: str):
+        user_chats = self.user_subscriptions.get(user_id)
+        if user_chats is not None:
+            user_chats.discard(chat_id)
+            if not user_chats:
+                del self.user_subscriptions[user_id]
+
         if chat_id in self.chat_subscriptions:
-            self.chat_subscriptions[chat_id].discard(user_id)
-            if not self.chat_subscriptions[chat_id]:
-                del self.chat_subscriptions[chat_id]
-            print(f"User {user_id} unsubscribed from chat {chat_id}")
+            self._remove_subscriber(chat_id, user_id)
+            logger.debug("User unsubscribed", extra={"userId": user_id, "chatId": chat_id})
 
-    async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error sending message to {user_id}: {e}")
-                    disconnected.append(connection)
-
-            for conn in disconnected:
-                self.disconnect(conn, user_id)
-
-    async def broadcast_to_chat(self, message: dict, chat_id: str, exclude_user: str = None):
-        if chat_id not in self.chat_subscriptions:
-            return
+    def _evict_slow_consumer(self, queue: OutboundQueue):
+        evictions.inc()
+        logger.warning("Evicting slow consumer", extra={"userId": queue.user_id, "pendingFrames": len(queue)})
+        self.disconnect(queue.websocket, queue.user_id)
+
+    def touch(self, websocket: WebSocket, user_id: str):
+        # Any frame from the client counts as a heartbeat, so busy sockets are never pinged
+        if self.heartbeat:
+            self.heartbeat.touch(websocket)
+        self.presence.seen(user_id)
+
+    def _ping(self, entry: HeartbeatEntry):
+        queue = self.outbound_queues.get(entry.websocket)
+        if queue is not None and queue.put(PING_FRAME):
+            pings_sent.inc()
+
+    def _reap(self, entry: HeartbeatEntry):
+        # A half-open socket never raises on receive, so the wheel is what removes it
+        heartbeat_reaped.inc()
+        logger.info("Reaping unresponsive socket", extra={"userId": entry.user_id})
+        queue = self.outbound_queues.get(entry.websocket)
+        self.disconnect(entry.websocket, entry.user_id)
+        if queue is not None:
+            queue.close(HEARTBEAT_CLOSE_CODE, "Heartbeat timeout")
+
+    def _queues_of(self, user_ids) -> List[Tuple[str, OutboundQueue]]:
+        return [
+            (user_id, self.outbound_queues[connection])
+            for user_id in user_ids
+            for connection in self.active_connections.get(user_id, ())
+            if connection in self.outbound_queues
+        ]
+
+    def replay_to_socket(self, frames: List[OutboundFrame], websocket: WebSocket):
+        queue = self.outbound_queues.get(websocket)
+        if queue is not None:
+            for frame in frames:
+                queue.put(frame)
+
+    async def send_to_socket(self, message: Event, websocket: WebSocket):
+        frame = encode_frame(message)
+        queue = self.outbound_queues.get(websocket)
+        if queue is not None:
+            queue.put(frame)
+        else:
+            await websocket.send_text(frame.data)
+
+    def deliver_local(self, scope: str, key: str, exclude_user: Optional[str], frame: OutboundFrame) -> FanoutResult:
+        # Called by the bus once per published event, in every worker process
+        if frame.type == TYPING_SIGNAL:
+            signal = json.loads(frame.data)
+            self.typing.apply(key, signal["userId"], signal["username"], signal["isTyping"])
+            return FanoutResult()
+
+        if frame.type == PRESENCE_SIGNAL:
+            signal = json.loads(frame.data)
+            if signal["worker"] != self.worker_id:
+                self.presence.apply_remote(signal["worker"], signal["users"], signal["full"])
+            return FanoutResult()
+
+        if frame.type == READ_SIGNAL:
+            signal = json.loads(frame.data)
+            if self.on_read:
+                self.on_read(key, signal["chatId"], signal["seq"])
+            return FanoutResult()
+
+        if scope == BusScope.CHAT:
+            if frame.seq is not None:
+                self.replay.record(key, frame.seq, frame)
+                if self.on_seq:
+                    self.on_seq(key, frame.seq)
+            recipients = [
+                user_id for user_id in self.chat_subscriptions.get(key, ())
+                if not (exclude_user and user_id == exclude_user)
+            ]
+        elif scope == BusScope.USER:
+            recipients = [key]
+        else:
+            recipients = list(self.active_connections.keys())
+
+        result = self.fanout.fan_out(frame, self._queues_of(recipients))
+        recipients_histogram, duration_histogram, dropped_counter = _fanout_metrics[scope]
+        recipients_histogram.observe(result.targets)
+        duration_histogram.observe(result.duration_ms / 1000)
+        if result.dropped:
+            dropped_counter.inc(result.dropped)
+        return result
+
+    async def send_personal_message(self, message: Event, user_id: str) -> FanoutResult:
+        return self.bus.publish(BusScope.USER, user_id, None, encode_frame(message))
+
+    async def broadcast_to_chat(
+        self,
+        message: Event,
+        chat_id: str,
+        exclude_user: str = None,
+        seq: Optional[int] = None
+    ) -> FanoutResult:
+        frame = encode_frame(message)
+        frame.seq = seq
+        return self.bus.publish(BusScope.CHAT, chat_id, exclude_user, frame)
+
+    async def broadcast_to_all(self, message: Event) -> FanoutResult:
+        return self.bus.publish(BusScope.ALL, "", None, encode_frame(message))
+
+    def publish_typing(self, chat_id: str, user_id: str, username: str, is_typing: bool):
+        signal = {"type": TYPING_SIGNAL, "chatId": chat_id, "userId": user_id, "username": username, "isTyping": is_typing}
+        self.bus.publish(BusScope.CHAT, chat_id, user_id, encode_frame(signal))
+
+    def publish_presence(self, users: List[list], full: bool):
+        signal = {"type": PRESENCE_SIGNAL, "worker": self.worker_id, "users": users, "full": full}
+        self.bus.publish(BusScope.ALL, "", None, encode_frame(signal))
+
+    def publish_read(self, user_id: str, chat_id: str, seq: int):
+        signal = {"type": READ_SIGNAL, "chatId": chat_id, "seq": seq}
+        self.bus.publish(BusScope.USER, user_id, None, encode_frame(signal))
+
+    async def _flush_typing(self):
+        # Each worker coalesces typing state per chat into one frame per tick for its own sockets
+        while True:
+            await asyncio.sleep(TYPING_FLUSH_INTERVAL_MS / 1000)
+            self.typing.expire()
+            for chat_id, users in self.typing.take_changes():
+                notification = TypingUsersNotification(chatId=chat_id, users=users)
+                self.deliver_local(BusScope.CHAT, chat_id, None, encode_frame(notification))
 
-        for user_id in self.chat_subscriptions[chat_id]:
-            if exclude_user and user_id == exclude_user:
-                continue
 
-            await self.send_personal_message(message, user_id)
 
-    async def broadcast_to_all(self, message: dict):
-        for user_id in list(self.active_connections.keys()):
-            await self.send_personal_message(message, user_id)
+def register_gauges(manager: ConnectionManager):
+    # Read from the manager's own dicts at scrape time, so connects and subscribes pay nothing extra
+    registry.gauge_callback(
+        "placa_ws_connections",
+        "Open WebSocket connections",
+        lambda: len(manager.outbound_queues)
+    )
+    registry.gauge_callback(
+        "placa_ws_connected_users",
+        "Users with at least one open WebSocket connection",
+        lambda: len(manager.active_connections)
+    )
+    registry.gauge_callback(
+        "placa_ws_awaiting_pong",
+        "Sockets pinged by the heartbeat wheel and not heard from since",
+        lambda: sum(1 for entry in manager.heartbeat.entries.values() if entry.pinged_at is not None)
+        if manager.heartbeat else 0
+    )
+    registry.gauge_callback(
+        "placa_chat_subscriptions",
+        "User subscriptions across all chats",
+        lambda: sum(len(users) for users in manager.chat_subscriptions.values())
+    )
+    registry.gauge_callback(
+        "placa_chat_subscribers",
+        f"Subscribed users in each of the {METRICS_TOP_CHATS} most subscribed chats",
+        lambda: {
+            (chat_id,): len(users)
+            for chat_id, users in heapq.nlargest(
+                METRICS_TOP_CHATS, manager.chat_subscriptions.items(), key=lambda item: len(item[1])
+            )
+        },
+        labels=("chat",)
+    )
+    registry.gauge_callback(
+        "placa_outbound_queue_frames",
+        "Frames waiting in all outbound queues",
+        lambda: sum(len(queue) for queue in manager.outbound_queues.values())
+    )
+    registry.gauge_callback(
+        "placa_outbound_queue_max_frames",
+        "Frames waiting in the fullest outbound queue",
+        lambda: max((len(queue) for queue in manager.outbound_queues.values()), default=0)
+    )
 
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(create_bus(BUS_BACKEND, BUS_SOCKET_PATH))
+register_gauges(manager)
@@ -0,0 +1,112 @@
+import os
+from typing import Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _env_rate(name: str, default: str) -> Tuple[float, float]:
+    # "rate:burst" -- tokens refilled per second and bucket size; a rate of 0 disables the limit
+    rate, _, burst = os.getenv(name, default).partition(":")
+    return float(rate), float(burst or rate)
+
+
+# Real-time fan-out
+FANOUT_SEND_TIMEOUT = _env_float("PLACA_FANOUT_SEND_TIMEOUT", 5.0)  # seconds per socket send
+OUTBOUND_QUEUE_SIZE = _env_int("PLACA_OUTBOUND_QUEUE_SIZE", 256)  # frames buffered per socket
+OUTBOUND_OVERFLOW_POLICY = os.getenv("PLACA_OUTBOUND_OVERFLOW_POLICY", "drop_typing")  # drop_typing | coalesce | disconnect
+SLOW_CONSUMER_CLOSE_CODE = _env_int("PLACA_SLOW_CONSUMER_CLOSE_CODE", 1013)  # "Try Again Later"
+OUTBOUND_BATCH_MS = _env_float("PLACA_OUTBOUND_BATCH_MS", 10.0)  # window for clients that connect with ?batch=true
+REPLAY_BUFFER_SIZE = _env_int("PLACA_REPLAY_BUFFER_SIZE", 256)  # recent new_message frames kept per chat
+
+# Typing indicators
+TYPING_THROTTLE_MS = _env_float("PLACA_TYPING_THROTTLE_MS", 1000.0)  # min gap between typing updates per user and chat
+TYPING_TTL_MS = _env_float("PLACA_TYPING_TTL_MS", 5000.0)  # typing state expires without a fresh update
+TYPING_FLUSH_INTERVAL_MS = _env_float("PLACA_TYPING_FLUSH_INTERVAL_MS", 250.0)  # one typing_users frame per chat per tick
+
+# Heartbeats and presence
+HEARTBEAT_INTERVAL_MS = _env_float("PLACA_HEARTBEAT_INTERVAL_MS", 25000.0)  # silence before the server pings; 0 disables
+HEARTBEAT_TIMEOUT_MS = _env_float("PLACA_HEARTBEAT_TIMEOUT_MS", 10000.0)  # wait for any frame after a ping before reaping
+HEARTBEAT_TICK_MS = _env_float("PLACA_HEARTBEAT_TICK_MS", 1000.0)  # timer wheel resolution
+HEARTBEAT_CLOSE_CODE = _env_int("PLACA_HEARTBEAT_CLOSE_CODE", 4000)  # application-defined: heartbeat timeout
+PRESENCE_FLUSH_INTERVAL_MS = _env_float("PLACA_PRESENCE_FLUSH_INTERVAL_MS", 1000.0)  # one presence frame per chat per tick
+PRESENCE_SYNC_INTERVAL_MS = _env_float("PLACA_PRESENCE_SYNC_INTERVAL_MS", 10000.0)  # each worker's full online set, over the bus
+
+# Rate limits, as "rate:burst" token buckets per user (all sockets and HTTP) and per socket
+RATE_LIMIT_ENABLED = _env_bool("PLACA_RATE_LIMIT", True)
+RATE_LIMIT_MESSAGES_USER = _env_rate("PLACA_RATE_LIMIT_MESSAGES_USER", "10:30")
+RATE_LIMIT_MESSAGES_CONNECTION = _env_rate("PLACA_RATE_LIMIT_MESSAGES_CONNECTION", "5:20")
+RATE_LIMIT_TYPING_USER = _env_rate("PLACA_RATE_LIMIT_TYPING_USER", "10:20")
+RATE_LIMIT_TYPING_CONNECTION = _env_rate("PLACA_RATE_LIMIT_TYPING_CONNECTION", "5:10")
+RATE_LIMIT_SUBSCRIBE_USER = _env_rate("PLACA_RATE_LIMIT_SUBSCRIBE_USER", "20:100")
+RATE_LIMIT_SUBSCRIBE_CONNECTION = _env_rate("PLACA_RATE_LIMIT_SUBSCRIBE_CONNECTION", "10:50")
+RATE_LIMIT_FRAMES_CONNECTION = _env_rate("PLACA_RATE_LIMIT_FRAMES_CONNECTION", "50:100")  # any inbound frame
+RATE_LIMIT_MAX_USERS = _env_int("PLACA_RATE_LIMIT_MAX_USERS", 100_000)  # per-user buckets kept, least recently used dropped
+
+# Load shedding when the process is saturated
+ADMISSION_MAX_INFLIGHT = _env_int("PLACA_ADMISSION_MAX_INFLIGHT", 1000)  # API requests and socket actions; 0 is unlimited
+ADMISSION_MAX_LOOP_LAG_MS = _env_float("PLACA_ADMISSION_MAX_LOOP_LAG_MS", 250.0)  # shed while the loop runs this late; 0 disables
+ADMISSION_RETRY_AFTER = _env_float("PLACA_ADMISSION_RETRY_AFTER", 1.0)  # seconds suggested to shed clients
+
+# Cross-process fan-out bus; use "unix" when running several uvicorn workers
+BUS_BACKEND = os.getenv("PLACA_BUS_BACKEND", "local")  # local | unix
+BUS_SOCKET_PATH = os.getenv("PLACA_BUS_SOCKET_PATH", "/tmp/placa-bus.sock")
+
+# Chat history pagination
+HISTORY_PAGE_SIZE = _env_int("PLACA_HISTORY_PAGE_SIZE", 50)
+HISTORY_PAGE_MAX = _env_int("PLACA_HISTORY_PAGE_MAX", 200)
+
+# Bulk history import and export
+IMPORT_BATCH_SIZE = _env_int("PLACA_IMPORT_BATCH_SIZE", 1000)  # messages written, indexed and announced together
+IMPORT_MAX_ERRORS = _env_int("PLACA_IMPORT_MAX_ERRORS", 100)  # rejected lines listed in the import response
+EXPORT_BATCH_SIZE = _env_int("PLACA_EXPORT_BATCH_SIZE", 1000)  # messages read per step of an export stream
+
+# Full-text message search
+SEARCH_MAX_DOCS = _env_int("PLACA_SEARCH_MAX_DOCS", 1_000_000)  # oldest messages drop out of the index past this
+SEARCH_MAX_BYTES = _env_int("PLACA_SEARCH_MAX_BYTES", 512 * 1024 * 1024)  # or past this estimated size; 0 is unlimited
+SEARCH_SEGMENT_SIZE = _env_int("PLACA_SEARCH_SEGMENT_SIZE", 65536)  # eviction granularity
+SEARCH_PAGE_SIZE = _env_int("PLACA_SEARCH_PAGE_SIZE", 20)
+SEARCH_PAGE_MAX = _env_int("PLACA_SEARCH_PAGE_MAX", 100)
+
+# Storage
+STORAGE_BACKEND = os.getenv("PLACA_STORAGE_BACKEND", "memory")  # memory | sqlite
+SQLITE_PATH = os.getenv("PLACA_SQLITE_PATH", "placa.db")
+MEMORY_HOT_MESSAGES = _env_int("PLACA_MEMORY_HOT_MESSAGES", 10000)  # per chat in the memory backend; 0 keeps all
+MEMORY_SPILL_DIR = os.getenv("PLACA_MEMORY_SPILL_DIR") or None  # older messages' segment files; default is a temp dir
+SNAPSHOT_DIR = os.getenv("PLACA_SNAPSHOT_DIR") or None  # snapshot and journal of the memory backend; unset keeps it volatile
+SNAPSHOT_INTERVAL_MS = _env_float("PLACA_SNAPSHOT_INTERVAL_MS", 300_000.0)  # snapshot this often if anything changed
+SNAPSHOT_JOURNAL_MAX_BYTES = _env_int("PLACA_SNAPSHOT_JOURNAL_MAX_BYTES", 16 * 1024 * 1024)  # or once the journal is this big
+JOURNAL_FLUSH_INTERVAL_MS = _env_float("PLACA_JOURNAL_FLUSH_INTERVAL_MS", 50.0)  # journal records are written in groups
+JOURNAL_FSYNC = _env_bool("PLACA_JOURNAL_FSYNC", True)  # fsync every journal write, not just hand it to the OS
+SEED_EXTRA_CHATS = _env_int("PLACA_SEED_EXTRA_CHATS", 0)  # empty chats added to the demo data, for load tests
+
+# Write-behind group commits in front of durable backends
+WRITE_BEHIND_ENABLED = _env_bool("PLACA_WRITE_BEHIND", True)
+WRITE_BEHIND_BATCH_SIZE = _env_int("PLACA_WRITE_BEHIND_BATCH_SIZE", 256)  # flush after N messages
+WRITE_BEHIND_INTERVAL_MS = _env_float("PLACA_WRITE_BEHIND_INTERVAL_MS", 20.0)  # or after T ms
+WRITE_BEHIND_MAX_RETRIES = _env_int("PLACA_WRITE_BEHIND_MAX_RETRIES", 5)  # then the failing batch is dropped
+WRITE_BEHIND_RETRY_BACKOFF_MS = _env_float("PLACA_WRITE_BEHIND_RETRY_BACKOFF_MS", 100.0)  # doubles with every retry
+
+# Logging and metrics
+LOG_LEVEL = os.getenv("PLACA_LOG_LEVEL", "INFO")  # DEBUG logs every connect, disconnect and subscribe
+LOG_FORMAT = os.getenv("PLACA_LOG_FORMAT", "text")  # text | json
+METRICS_TOP_CHATS = _env_int("PLACA_METRICS_TOP_CHATS", 20)  # chats exported with their own subscriber gauge
+LOOP_LAG_INTERVAL_MS = _env_float("PLACA_LOOP_LAG_INTERVAL_MS", 500.0)  # event loop lag sampling period
+
+# Static SPA assets, indexed once at startup
+STATIC_DIR = os.getenv(
+    "PLACA_STATIC_DIR",
+    os.path.join(os.path.dirname(__file__), "../../../frontend/my-app/dist")
+)
+STATIC_MAX_INLINE_BYTES = _env_int("PLACA_STATIC_MAX_INLINE_BYTES", 1024 * 1024)  # larger files stream from disk
+STATIC_RELOAD = _env_bool("PLACA_STATIC_RELOAD", False)  # re-index when files in STATIC_DIR change
+STATIC_RELOAD_INTERVAL = _env_float("PLACA_STATIC_RELOAD_INTERVAL", 1.0)  # seconds between change checks
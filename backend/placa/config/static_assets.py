@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+# Vite emits assets/<name>-<8 char hash>.<ext>; those never change under the same name
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+GZIP_MIN_BYTES = 1024
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    media_type: str
+    etag: str
+    cache_control: str
+    body: Optional[bytes] = None  # None for files above the in-memory limit; those stream from disk
+    gzip_body: Optional[bytes] = None
+    file_stat: Optional[Tuple[int, int]] = None  # (mtime_ns, size) a streamed file's ETag was made from
+
+
+def _file_etag(file_stat: Tuple[int, int]) -> str:
+    return '"' + hashlib.md5("{}-{}".format(*file_stat).encode(), usedforsecurity=False).hexdigest() + '"'
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    # RFC 9110 content codings with q-values; "gzip;q=0" refuses gzip, and "*" covers codings not named
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return quality > 0
+
+
+class StaticAssetCache:
+
+    def __init__(self, root: str, max_inline_bytes: int, reload: bool = False, reload_interval: float = 1.0):
+        self.root = os.path.realpath(root)
+        self.max_inline_bytes = max_inline_bytes
+        self.reload = reload
+        self.reload_interval = reload_interval
+
+        self.assets: Dict[str, StaticAsset] = {}  # path relative to root, "/"-separated
+        self._signature: Tuple = ()
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await asyncio.to_thread(self._load)
+        if self.reload:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher:
+            self._watcher.cancel()
+            self._watcher = None
+
+    def _scan(self) -> Tuple:
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if not os.path.realpath(path).startswith(self.root + os.sep):
+                    continue  # symlink pointing out of the dist directory
+                stat = os.stat(path)
+                entries.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    def _load(self):
+        signature = self._scan()
+        assets = {}
+        for path, _, size in signature:
+            relative = os.path.relpath(path, self.root).replace(os.sep, "/")
+            assets[relative] = self._build(path, relative, size)
+
+        # Swapped in whole, so requests never see a half-built index
+        self.assets = assets
+        self._signature = signature
+        if assets:
+            logger.info("Indexed static assets", extra={"assets": len(assets), "root": self.root})
+
+    def _build(self, path: str, relative: str, size: int) -> StaticAsset:
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        cache_control = IMMUTABLE if HASHED_NAME.search(relative) else REVALIDATE
+
+        if size > self.max_inline_bytes:
+            stat = os.stat(path)
+            file_stat = (stat.st_mtime_ns, stat.st_size)
+            return StaticAsset(path, media_type, _file_etag(file_stat), cache_control, file_stat=file_stat)
+
+        with open(path, "rb") as file:
+            body = file.read()
+
+        gzip_body = None
+        if size >= GZIP_MIN_BYTES and media_type.startswith(COMPRESSIBLE):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < size:
+                gzip_body = compressed
+
+        etag = hashlib.md5(body, usedforsecurity=False).hexdigest()
+        return StaticAsset(path, media_type, f'"{etag}"', cache_control, body, gzip_body)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if await asyncio.to_thread(self._scan) != self._signature:
+                await asyncio.to_thread(self._load)
+
+    def lookup(self, full_path: str) -> Optional[StaticAsset]:
+        # Only indexed files can be served, so "..", absolute paths and symlinks out of root never resolve
+        return self.assets.get(full_path.strip("/"))
+
+    def respond(self, asset: StaticAsset, request: Request) -> Response:
+        if asset.body is None:
+            # A streamed file can be replaced between reloads, or with reload off; its ETag follows the disk
+            try:
+                stat = os.stat(asset.path)
+            except FileNotFoundError:
+                return Response(status_code=404)
+            if (stat.st_mtime_ns, stat.st_size) != asset.file_stat:
+                asset.file_stat = (stat.st_mtime_ns, stat.st_size)
+                asset.etag = _file_etag(asset.file_stat)
+
+        use_gzip = asset.gzip_body is not None and accepts_gzip(request.headers.get("accept-encoding", ""))
+        # Each encoding is its own representation, so it gets its own strong ETag
+        etag = f'{asset.etag[:-1]}-gz"' if use_gzip else asset.etag
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        if asset.body is None:
+            return FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(asset.gzip_body, media_type=asset.media_type, headers=headers)
+
+        return Response(asset.body, media_type=asset.media_type, headers=headers)
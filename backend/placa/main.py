@@ -1,32 +1,85 @@
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from .config import setup_cors
-from .api import auth_router, chats_router, messages_router, websocket_router
-import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from .config import setup_admission, setup_cors, setup_metrics
+from .config.log import setup_logging
+from .config.metrics import LoopLagMonitor
+from .config.rate_limit import admission
+from .config.settings import (
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOOP_LAG_INTERVAL_MS,
+    STATIC_DIR,
+    STATIC_MAX_INLINE_BYTES,
+    STATIC_RELOAD,
+    STATIC_RELOAD_INTERVAL
+)
+from .config.static_assets import StaticAssetCache
+from .api import (
+    auth_router,
+    chats_router,
+    history_router,
+    messages_router,
+    metrics_router,
+    presence_router,
+    search_router,
+    websocket_router
+)
+from .config.real_time.ws_manager import manager
+from .service.presence_service import presence_service
+from .storage import chat_index, search_index, store
+
+setup_logging(LOG_LEVEL, LOG_FORMAT)
+
+# Other workers' messages and reads reach this one over the bus
+manager.on_seq = store.observe_seq
+manager.on_read = chat_index.observe_read
+
+static_assets = StaticAssetCache(STATIC_DIR, STATIC_MAX_INLINE_BYTES, STATIC_RELOAD, STATIC_RELOAD_INTERVAL)
+loop_lag = LoopLagMonitor(LOOP_LAG_INTERVAL_MS / 1000, on_sample=admission.record_loop_lag)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await store.open()
+    await chat_index.load()
+    await search_index.load()
+    await manager.start()
+    presence_service.start()
+    await static_assets.start()
+    loop_lag.start()
+    yield
+    loop_lag.stop()
+    await static_assets.stop()
+    presence_service.stop()
+    await manager.stop()
+    await store.close()
+
 
 placa = FastAPI(
     title="Placa",
     description="Na pravemu mistu u pravo vrime (real-time).",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+setup_admission(placa)  # innermost, so shed responses still get CORS headers and are measured
 setup_cors(placa)
+setup_metrics(placa)
 
 placa.include_router(auth_router, prefix="/api", tags=["Authentication"])
 placa.include_router(chats_router, prefix="/api", tags=["Chats"])
 placa.include_router(messages_router, prefix="/api", tags=["Messages"])
+placa.include_router(history_router, prefix="/api", tags=["History"])
+placa.include_router(search_router, prefix="/api", tags=["Search"])
+placa.include_router(presence_router, prefix="/api", tags=["Presence"])
 placa.include_router(websocket_router, prefix="/api", tags=["WebSocket"])
+placa.include_router(metrics_router)  # before the SPA catch-all; Prometheus expects /metrics at the root
 
 @placa.get("/{full_path:path}")
-async def serve_spa(full_path: str):
-    frontend_dist = os.path.join(os.path.dirname(__file__), "../../frontend/my-app/dist")
-    file_path = os.path.join(frontend_dist, full_path)
-
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        return FileResponse(file_path)
-
-    index_path = os.path.join(frontend_dist, "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+async def serve_spa(full_path: str, request: Request):
+    # Client-side routes fall back to index.html
+    asset = static_assets.lookup(full_path) or static_assets.lookup("index.html")
+    if asset is not None:
+        return static_assets.respond(asset, request)
 
     return {"error": "Frontend not built. Run 'npm run build' in frontend/my-app"}
@@ -1,30 +1,62 @@
 from .user import LoginRequest, LoginResponse
-from .chat import Chat, ChatsResponse
+from .chat import Chat, ChatsResponse, MarkReadRequest, MarkReadResponse
 from .message import Message, SendMessageRequest, SendMessageResponse, ChatDetailsResponse
 from .notification import (
     WebSocketMessage,
+    ChatUpdate,
     NewMessageNotification,
     ChatUpdateNotification,
-    UserTypingNotification,
+    TypingUser,
+    TypingUsersNotification,
+    PresenceNotification,
     SubscriptionMessage,
+    BulkSubscriptionMessage,
+    SendMessageAction,
+    MarkReadAction,
+    MessageAck,
+    ResyncRequired,
     ConnectionAcknowledgment,
     ErrorMessage
 )
+from .history import ImportedMessage, ImportLineError, ImportResponse
+from .presence import PresenceUser, PresenceResponse
+from .search import SearchHit, SearchResponse
+from .serializers import Event, to_json, to_json_bytes
 
 __all__ = [
     "LoginRequest",
     "LoginResponse",
     "Chat",
     "ChatsResponse",
+    "MarkReadRequest",
+    "MarkReadResponse",
     "Message",
     "SendMessageRequest",
     "SendMessageResponse",
     "ChatDetailsResponse",
     "WebSocketMessage",
+    "ChatUpdate",
     "NewMessageNotification",
     "ChatUpdateNotification",
-    "UserTypingNotification",
+    "TypingUser",
+    "TypingUsersNotification",
+    "PresenceNotification",
     "SubscriptionMessage",
+    "BulkSubscriptionMessage",
+    "SendMessageAction",
+    "MarkReadAction",
+    "MessageAck",
+    "ResyncRequired",
     "ConnectionAcknowledgment",
     "ErrorMessage",
-]
\ No newline at end of file
+    "ImportedMessage",
+    "ImportLineError",
+    "ImportResponse",
+    "PresenceUser",
+    "PresenceResponse",
+    "SearchHit",
+    "SearchResponse",
+    "Event",
+    "to_json",
+    "to_json_bytes",
+]
@@ -13,4 +13,15 @@ class Chat(BaseModel):
 
 class ChatsResponse(BaseModel):
     success: bool
-    chats: List[Chat]
\ No newline at end of file
+    chats: List[Chat]
+
+
+class MarkReadRequest(BaseModel):
+    userId: str
+    seq: Optional[int] = None  # read up to this message; defaults to the latest
+
+
+class MarkReadResponse(BaseModel):
+    success: bool
+    chatId: str
+    unreadCount: int
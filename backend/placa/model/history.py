@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import datetime
+
+
+class ImportedMessage(BaseModel):
+    # One NDJSON line of an import; `seq` from an export is ignored and reassigned
+    chatId: Optional[str] = None  # the chat named in the import URL, if any, takes precedence
+    id: Optional[str] = None  # kept if no other chat has it; a line whose id the chat already has is skipped
+    text: str
+    senderId: str
+    sender: Optional[str] = None  # defaults to the sender's registered username
+    timestamp: Optional[datetime] = None  # defaults to the time of the import
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResponse(BaseModel):
+    success: bool
+    imported: int
+    rejected: int
+    duplicates: int  # lines skipped because the chat already has their message, e.g. from an earlier import
+    chats: Dict[str, int]  # chat id -> messages imported into it
+    errors: List[ImportLineError]  # the first rejected lines, up to PLACA_IMPORT_MAX_ERRORS
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from .chat import Chat
 
@@ -10,6 +10,7 @@ class Message(BaseModel):
     sender: str
     timestamp: datetime
     isOwnMessage: bool
+    seq: Optional[int] = None  # per-chat sequence number, usable as a replay cursor
 
 
 class SendMessageRequest(BaseModel):
@@ -25,4 +26,6 @@ class SendMessageResponse(BaseModel):
 class ChatDetailsResponse(BaseModel):
     success: bool
     chat: Chat
-    messages: List[Message]
\ No newline at end of file
+    messages: List[Message]
+    prevCursor: Optional[str] = None  # pass as `before` to load older messages
+    nextCursor: Optional[str] = None  # pass as `after` to load newer messages
\ No newline at end of file
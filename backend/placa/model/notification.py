@@ -1,43 +1,93 @@
-from pydantic import BaseModel
-from typing import Literal, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
+from .message import Message
+from .presence import PresenceUser
 
 
 class WebSocketMessage(BaseModel):
     type: str
-    timestamp: datetime = None
+    timestamp: datetime = Field(default_factory=datetime.now)
 
-    def __init__(self, **data):
-        if 'timestamp' not in data or data['timestamp'] is None:
-            data['timestamp'] = datetime.now()
-        super().__init__(**data)
+
+class ChatUpdate(BaseModel):
+    lastMessage: str
+    lastMessageTime: datetime
+    unreadCount: Optional[int] = None
 
 
 class NewMessageNotification(WebSocketMessage):
     type: Literal["new_message"] = "new_message"
     chatId: str
     message: dict
+    chatUpdate: Optional[ChatUpdate] = None  # chat list fields, so no separate chat_update frame follows
 
 
 class ChatUpdateNotification(WebSocketMessage):
     type: Literal["chat_update"] = "chat_update"
     chatId: str
-    lastMessage: str
-    lastMessageTime: datetime
+    lastMessage: Optional[str] = None
+    lastMessageTime: Optional[datetime] = None
     unreadCount: Optional[int] = None
 
 
-class UserTypingNotification(WebSocketMessage):
-    type: Literal["user_typing"] = "user_typing"
-    chatId: str
+class TypingUser(BaseModel):
     userId: str
     username: str
-    isTyping: bool
+
+
+class TypingUsersNotification(WebSocketMessage):
+    type: Literal["typing_users"] = "typing_users"
+    chatId: str
+    users: List[TypingUser]  # everyone typing in the chat right now; empty when nobody is
+
+
+class PresenceNotification(WebSocketMessage):
+    type: Literal["presence"] = "presence"
+    chatId: str
+    users: List[PresenceUser]  # members of the chat whose status changed since the last presence frame
 
 
 class SubscriptionMessage(BaseModel):
     action: Literal["subscribe", "unsubscribe"]
     chatId: str
+    sinceSeq: Optional[int] = None  # last seq the client saw; missed messages are replayed
+
+
+class BulkSubscriptionMessage(BaseModel):
+    action: Literal["subscribe_many"]
+    chatIds: List[str] = Field(min_length=1, max_length=1000)
+    sinceSeqs: Dict[str, int] = {}  # chat id -> last seq the client saw
+
+
+class SendMessageAction(BaseModel):
+    type: Literal["send_message"]
+    chatId: str
+    text: str
+    clientMsgId: Optional[str] = None  # echoed back in the ack so clients can pipeline sends
+    waitForCommit: bool = False
+
+
+class MarkReadAction(BaseModel):
+    type: Literal["mark_read"]
+    chatId: str
+    seq: Optional[int] = None  # read up to this message; defaults to the latest
+
+
+class MessageAck(WebSocketMessage):
+    type: Literal["message_ack"] = "message_ack"
+    clientMsgId: Optional[str] = None
+    chatId: str
+    success: bool
+    message: Optional[Message] = None
+    error: Optional[str] = None
+    retryAfter: Optional[float] = None  # seconds, when the send was refused by a rate limit or load shedding
+
+
+class ResyncRequired(WebSocketMessage):
+    type: Literal["resync_required"] = "resync_required"
+    chatId: str
+    latestSeq: int
 
 
 class ConnectionAcknowledgment(WebSocketMessage):
@@ -50,3 +100,4 @@ class ErrorMessage(WebSocketMessage):
     type: Literal["error"] = "error"
     error: str
     details: Optional[str] = None
+    retryAfter: Optional[float] = None  # seconds, when the frame was refused by a rate limit or load shedding
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from datetime import datetime
+
+
+class PresenceUser(BaseModel):
+    userId: str
+    status: Literal["online", "offline"]
+    lastSeen: Optional[datetime] = None  # last frame received from, or disconnect of, the user
+
+
+class PresenceResponse(BaseModel):
+    success: bool
+    users: List[PresenceUser]
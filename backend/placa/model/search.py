@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List
+from .message import Message
+
+
+class SearchHit(BaseModel):
+    chatId: str
+    message: Message
+    score: float
+
+
+class SearchResponse(BaseModel):
+    success: bool
+    query: str
+    total: int
+    offset: int
+    limit: int
+    hits: List[SearchHit]
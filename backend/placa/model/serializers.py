@@ -0,0 +1,29 @@
+from typing import Any, Dict, Union
+from pydantic import BaseModel, TypeAdapter
+
+Event = Union[BaseModel, Dict[str, Any]]
+
+# One compiled serializer per event class (plain dicts share one), built on first use
+_adapters: Dict[type, TypeAdapter] = {}
+
+
+def _adapter(event_type: type) -> TypeAdapter:
+    adapter = _adapters.get(event_type)
+    if adapter is None:
+        adapter = _adapters[event_type] = TypeAdapter(Dict[str, Any] if event_type is dict else event_type)
+    return adapter
+
+
+def to_json_bytes(event: Event) -> bytes:
+    # Straight to compact UTF-8 JSON, with no intermediate dict or json.dumps pass
+    return _adapter(type(event)).dump_json(event)
+
+
+def to_json(event: Event) -> str:
+    return to_json_bytes(event).decode()
+
+
+def event_field(event: Event, name: str) -> Any:
+    if isinstance(event, BaseModel):
+        return getattr(event, name, None)
+    return event.get(name)
@@ -3,17 +3,41 @@ from .ws_service import (
     send_error,
     handle_subscribe_action,
     handle_unsubscribe_action,
+    handle_bulk_subscribe_action,
     handle_subscription_message,
     handle_typing_indicator,
+    handle_send_message,
+    handle_mark_read,
+    limited_action,
+    admit_client_message,
+    handle_client_message,
     process_client_message
 )
+from .message_service import post_message
+from .chat_service import ensure_member, mark_chat_read
+from .presence_service import PresenceService, presence_service
+from .history_service import ImportNotify, import_messages, export_messages
 
 __all__ = [
     "send_connection_acknowledgment",
     "send_error",
     "handle_subscribe_action",
     "handle_unsubscribe_action",
+    "handle_bulk_subscribe_action",
     "handle_subscription_message",
     "handle_typing_indicator",
+    "handle_send_message",
+    "handle_mark_read",
+    "limited_action",
+    "admit_client_message",
+    "handle_client_message",
     "process_client_message",
+    "post_message",
+    "ensure_member",
+    "mark_chat_read",
+    "PresenceService",
+    "presence_service",
+    "ImportNotify",
+    "import_messages",
+    "export_messages",
 ]
\ No newline at end of file
@@ -0,0 +1,32 @@
+from fastapi import HTTPException
+from typing import Optional
+from ..model.notification import ChatUpdateNotification
+from ..storage import chat_index
+from ..config.real_time.ws_manager import manager
+
+
+async def ensure_member(user_id: str):
+    # Members are indexed on login; users seen first after a restart are indexed on first use
+    if user_id not in chat_index.members:
+        await chat_index.join(user_id)
+
+
+async def mark_chat_read(chat_id: str, user_id: str, seq: Optional[int] = None) -> int:
+    chat = chat_index.chats.get(chat_id)
+    if chat is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    await ensure_member(user_id)
+    unread_count = await chat_index.mark_read(user_id, chat_id, seq)
+    manager.publish_read(user_id, chat_id, chat_index.read_seq[user_id].get(chat_id, 0))
+
+    # Keeps the user's other tabs and devices in step
+    chat_update = ChatUpdateNotification(
+        chatId=chat_id,
+        lastMessage=chat["lastMessage"],
+        lastMessageTime=chat["lastMessageTime"],
+        unreadCount=unread_count
+    )
+    await manager.send_personal_message(chat_update, user_id)
+
+    return unread_count
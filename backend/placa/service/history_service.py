@@ -0,0 +1,228 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from ..config.real_time.ws_manager import manager
+from ..config.settings import EXPORT_BATCH_SIZE, IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS
+from ..model.history import ImportedMessage, ImportLineError, ImportResponse
+from ..model.notification import ChatUpdate, ChatUpdateNotification, NewMessageNotification
+from ..model.serializers import to_json_bytes
+from ..storage import chat_index, search_index, store
+from ..storage.ids import is_message_id, is_message_id_at, message_id_at
+
+
+class ImportNotify:
+    NONE = "none"        # no real-time frames; reconnecting clients resync
+    SUMMARY = "summary"  # one chat_update per chat per batch
+    EACH = "each"        # a new_message frame per imported message, as if each had been posted
+
+    ALL = (NONE, SUMMARY, EACH)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    # Splits a streamed body into numbered lines without holding more than one partial line
+    number = 0
+    partial = b""
+    async for chunk in chunks:
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if partial.strip():
+        yield number + 1, partial
+
+
+def _local_time(timestamp: Optional[datetime]) -> datetime:
+    if timestamp is None:
+        return datetime.now()
+    # Stored times are naive local time, like datetime.now() on the send path
+    return timestamp.astimezone().replace(tzinfo=None) if timestamp.tzinfo else timestamp
+
+
+class HistoryImport:
+
+    def __init__(self, default_chat_id: Optional[str], notify: str):
+        self.default_chat_id = default_chat_id
+        self.notify = notify
+        self.imported = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.chats: Dict[str, int] = {}
+        self.errors: List[ImportLineError] = []
+        self._usernames: Dict[str, str] = {}
+
+    def reject(self, number: int, error: str):
+        self.rejected += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(ImportLineError(line=number, error=error))
+
+    def parse(self, number: int, line: bytes) -> Optional[ImportedMessage]:
+        try:
+            imported = ImportedMessage.model_validate_json(line)
+        except ValidationError as e:
+            self.reject(number, e.errors()[0]["msg"] if e.errors() else "Invalid line")
+            return None
+
+        imported.chatId = self.default_chat_id or imported.chatId  # so an export can be loaded into another chat
+        if not imported.chatId:
+            self.reject(number, "chatId is required")
+        elif not imported.text.strip():
+            self.reject(number, "Message text is required")
+        elif len(imported.text) > 1000:
+            self.reject(number, "Message too long (max 1000 characters)")
+        else:
+            imported.timestamp = _local_time(imported.timestamp)
+            return imported
+        return None
+
+    async def _sender(self, imported: ImportedMessage) -> str:
+        if imported.sender:
+            return imported.sender
+        username = self._usernames.get(imported.senderId)
+        if username is None:
+            username = self._usernames[imported.senderId] = await store.get_username(imported.senderId) or "Unknown"
+        return username
+
+    def _candidate_ids(self, chat_id: str, imported: ImportedMessage) -> Tuple[Optional[str], Optional[str]]:
+        # The line's own id if it is one of ours, and the id it gets when that cannot be kept: derived from
+        # the chat and the original id, so importing an export into another chat twice still finds the first copy
+        if not imported.id:
+            return None, None
+        own = imported.id if is_message_id(imported.id) else None
+        return own, message_id_at(imported.timestamp, f"{chat_id}/{imported.id}")
+
+    async def ingest(self, batch: List[Tuple[int, ImportedMessage]]):
+        by_chat: Dict[str, List[Tuple[int, ImportedMessage]]] = {}
+        for number, imported in batch:
+            by_chat.setdefault(imported.chatId, []).append((number, imported))
+
+        candidates = {number: self._candidate_ids(imported.chatId, imported) for number, imported in batch}
+        stored = await store.find_message_ids([
+            message_id for pair in candidates.values() for message_id in pair if message_id is not None
+        ])
+
+        messages: List[Tuple[str, dict]] = []
+        chat_updates: Dict[str, Tuple[str, datetime]] = {}
+        seen = set()  # (chat id, line id) already imported from this batch
+        assigned = set()  # ids given to this batch's messages
+        for chat_id, lines in by_chat.items():
+            chat = chat_index.chats.get(chat_id)
+            if chat is None:
+                for number, _ in lines:
+                    self.reject(number, "Chat not found")
+                continue
+
+            # Older messages are stored in time order among the chat's history and take the next seqs,
+            # like any new message, so clients and unread counts pick them up as new
+            lines.sort(key=lambda item: item[1].timestamp)
+            newest = chat["lastMessageTime"]
+            for number, imported in lines:
+                own, derived = candidates[number]
+                if imported.id and (
+                    (chat_id, imported.id) in seen or chat_id in (stored.get(own), stored.get(derived))
+                ):
+                    self.duplicates += 1
+                    continue
+                # Every id carries the line's timestamp: the memory store orders history by id, SQLite by time
+                keep_own = own is not None and is_message_id_at(own, imported.timestamp)
+                if keep_own and own not in stored and own not in assigned:
+                    message_id = own
+                elif derived is not None and derived not in stored and derived not in assigned:
+                    message_id = derived
+                else:
+                    message_id = message_id_at(imported.timestamp)
+                seen.add((chat_id, imported.id))
+                assigned.add(message_id)
+
+                messages.append((chat_id, {
+                    "id": message_id,
+                    "text": imported.text,
+                    "sender": await self._sender(imported),
+                    "senderId": imported.senderId,
+                    "timestamp": imported.timestamp,
+                    "isOwnMessage": False
+                }))
+                if newest is None or imported.timestamp >= newest:
+                    newest = imported.timestamp
+                    chat_updates[chat_id] = (imported.text, imported.timestamp)
+
+        if not messages:
+            return
+
+        # One store call and one lastMessage update per chat for the whole batch
+        await store.append_batch(messages, chat_updates)
+        for chat_id, (text, timestamp) in chat_updates.items():
+            chat_index.record_message(chat_id, text, timestamp)
+        for chat_id, message in messages:
+            search_index.add(chat_id, message["id"], message["text"])
+            self.chats[chat_id] = self.chats.get(chat_id, 0) + 1
+        self.imported += len(messages)
+
+        await self.announce(messages, chat_updates)
+        await store.sync()  # backpressure: the next batch waits for this one's group commit
+
+    async def announce(self, messages: List[Tuple[str, dict]], chat_updates: Dict[str, Tuple[str, datetime]]):
+        if self.notify == ImportNotify.EACH:
+            for chat_id, message in messages:
+                chat = chat_index.chats[chat_id]  # a backfilled message is not the chat's last one
+                notification = NewMessageNotification(
+                    chatId=chat_id,
+                    message=message,
+                    chatUpdate=ChatUpdate(lastMessage=chat["lastMessage"], lastMessageTime=chat["lastMessageTime"])
+                )
+                await manager.broadcast_to_chat(notification, chat_id, seq=message["seq"])
+
+        elif self.notify == ImportNotify.SUMMARY:
+            for chat_id, (text, timestamp) in chat_updates.items():
+                notification = ChatUpdateNotification(chatId=chat_id, lastMessage=text, lastMessageTime=timestamp)
+                await manager.broadcast_to_chat(notification, chat_id)
+
+    def response(self) -> ImportResponse:
+        return ImportResponse(
+            success=self.rejected == 0,
+            imported=self.imported,
+            rejected=self.rejected,
+            duplicates=self.duplicates,
+            chats=self.chats,
+            errors=sorted(self.errors, key=lambda error: error.line)
+        )
+
+
+async def import_messages(
+    chunks: AsyncIterator[bytes],
+    default_chat_id: Optional[str] = None,
+    notify: str = ImportNotify.SUMMARY,
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportResponse:
+    history_import = HistoryImport(default_chat_id, notify)
+    batch: List[Tuple[int, ImportedMessage]] = []
+    async for number, line in iter_lines(chunks):
+        imported = history_import.parse(number, line)
+        if imported is not None:
+            batch.append((number, imported))
+        if len(batch) >= batch_size:
+            await history_import.ingest(batch)
+            batch = []
+            await asyncio.sleep(0)  # let fan-out and other requests run between batches
+    if batch:
+        await history_import.ingest(batch)
+    return history_import.response()
+
+
+async def export_messages(chat_id: str, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    # One chunk per store batch, so memory stays at one batch however long the history is
+    async for messages in store.iter_history(chat_id, batch_size):
+        yield b"".join(
+            to_json_bytes({
+                "chatId": chat_id,
+                "id": message["id"],
+                "text": message["text"],
+                "sender": message["sender"],
+                "senderId": message.get("senderId"),
+                "timestamp": message["timestamp"],
+                "seq": message.get("seq")
+            }) + b"\n"
+            for message in messages
+        )
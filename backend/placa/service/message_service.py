@@ -0,0 +1,65 @@
+from fastapi import HTTPException
+from datetime import datetime
+from ..model.notification import NewMessageNotification, ChatUpdate
+from ..storage import chat_index, search_index, store
+from ..storage.ids import message_ids
+from ..config.rate_limit import rate_limits
+from ..config.real_time.ws_manager import manager
+
+
+async def post_message(chat_id: str, text: str, sender_id: str, wait_for_commit: bool = False) -> dict:
+    # Shared by the HTTP endpoint and send_message frames, so both draw from the sender's one bucket
+    rate_limits.check("message", sender_id)
+
+    if await store.get_chat(chat_id) is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    if not text or len(text.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Message text is required")
+
+    if len(text) > 1000:
+        raise HTTPException(status_code=400, detail="Message too long (max 1000 characters)")
+
+    sender_username = await store.get_username(sender_id) or "Unknown"
+
+    new_message = {
+        "id": message_ids.new_id(),
+        "text": text,
+        "sender": sender_username,
+        "senderId": sender_id,
+        "timestamp": datetime.now(),
+        "isOwnMessage": False
+    }
+
+    await store.append_message(chat_id, new_message)
+    await store.update_chat_last_message(chat_id, text, new_message["timestamp"])
+    chat_index.record_message(chat_id, text, new_message["timestamp"])
+    search_index.add(chat_id, new_message["id"], text)
+    # Own messages are never unread, also in workers that loaded the sender and this one did not
+    if chat_index.is_member(sender_id, chat_id):
+        await chat_index.mark_read(sender_id, chat_id, new_message["seq"])
+    else:
+        await store.set_read_cursor(sender_id, chat_id, new_message["seq"])
+    manager.publish_read(sender_id, chat_id, new_message["seq"])
+
+    # One combined frame and one fan-out pass carry both the message and the chat list update
+    new_message_notification = NewMessageNotification(
+        chatId=chat_id,
+        message=new_message,
+        chatUpdate=ChatUpdate(lastMessage=text, lastMessageTime=new_message["timestamp"])
+    )
+    await manager.broadcast_to_chat(
+        new_message_notification,
+        chat_id,
+        exclude_user=sender_id,
+        seq=new_message["seq"]
+    )
+
+    # Acknowledge after the in-memory append by default; opt in to waiting for the durable commit
+    if wait_for_commit:
+        try:
+            await store.sync()
+        except Exception:
+            raise HTTPException(status_code=503, detail="Message accepted but not yet persisted")
+
+    return new_message
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Dict, List, Optional
+from ..config.real_time.bus import BusScope
+from ..config.real_time.fanout import encode_frame
+from ..config.real_time.ws_manager import manager
+from ..config.settings import PRESENCE_FLUSH_INTERVAL_MS, PRESENCE_SYNC_INTERVAL_MS
+from ..model.notification import PresenceNotification
+from ..storage import chat_index
+from .chat_service import ensure_member
+
+
+async def presence_changes_by_chat() -> Dict[str, List[dict]]:
+    # Users who logged in through another worker are indexed here when their status first changes
+    for user_id in manager.presence.pending_users():
+        await ensure_member(user_id)
+
+    subscribed = manager.chat_subscriptions
+    by_chat: Dict[str, List[dict]] = {}
+    for change in manager.presence.take_changes():
+        chats = chat_index.members.get(change["userId"], ())
+        # Walk whichever side is smaller; with every chat public a member's set is the whole chat list
+        if len(chats) > len(subscribed):
+            audience = [chat_id for chat_id in subscribed if chat_id in chats]
+        else:
+            audience = [chat_id for chat_id in chats if chat_id in subscribed]
+        for chat_id in audience:
+            by_chat.setdefault(chat_id, []).append(change)
+    return by_chat
+
+
+class PresenceService:
+
+    def __init__(self, interval_ms: float, sync_interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.sync_ticks = max(1, round(sync_interval_ms / interval_ms))
+        self._ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+            # Tell the other workers this one's users are gone, rather than have them wait out the expiry
+            manager.publish_presence([], True)
+
+    def publish(self):
+        # This worker's own changes go to its peers every tick, and its whole online set every
+        # sync interval. A peer silent for three sync intervals is dropped with all its users
+        self._ticks += 1
+        full = self._ticks % self.sync_ticks == 0
+        users = manager.presence.local_signal(full)
+        if users or full:
+            manager.publish_presence(users, full)
+        manager.presence.expire_remote(3 * self.sync_ticks * self.interval)
+
+    async def flush(self):
+        # One presence frame per chat per tick, listing every member whose status changed in it,
+        # on this worker or (from their presence signals) on another
+        self.publish()
+        for chat_id, users in (await presence_changes_by_chat()).items():
+            notification = PresenceNotification(chatId=chat_id, users=users)
+            manager.deliver_local(BusScope.CHAT, chat_id, None, encode_frame(notification))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+presence_service = PresenceService(PRESENCE_FLUSH_INTERVAL_MS, PRESENCE_SYNC_INTERVAL_MS)
@@ -1,26 +1,123 @@
-from fastapi import WebSocket
-from typing import Dict, Any
+from fastapi import WebSocket, HTTPException
+from typing import Dict, Any, Optional
+from ..config.rate_limit import ConnectionLimits, RateLimitExceeded, admission, rate_limits, shed
 from ..config.real_time.ws_manager import manager
+from ..config.settings import ADMISSION_RETRY_AFTER
+from ..model.message import Message
 from ..model.notification import (
     ConnectionAcknowledgment,
     ErrorMessage,
     SubscriptionMessage,
-    UserTypingNotification
+    BulkSubscriptionMessage,
+    SendMessageAction,
+    MarkReadAction,
+    MessageAck,
+    ResyncRequired
 )
-from ..storage import users_db
+from ..storage import store
+from .message_service import post_message
+from .chat_service import mark_chat_read
+
+_shed_actions = shed.labels("ws_action")
 
 
 async def send_connection_acknowledgment(websocket: WebSocket, user_id: str):
     ack = ConnectionAcknowledgment(userId=user_id)
-    await websocket.send_json(ack.model_dump(mode='json'))
-
-
-async def send_error(websocket: WebSocket, error_msg: str, details: str = None):
-    error = ErrorMessage(error=error_msg, details=details)
-    await websocket.send_json(error.model_dump(mode='json'))
+    await manager.send_to_socket(ack, websocket)
+
+
+async def send_error(websocket: WebSocket, error_msg: str, details: str = None, retry_after: float = None):
+    error = ErrorMessage(error=error_msg, details=details, retryAfter=retry_after)
+    await manager.send_to_socket(error, websocket)
+
+
+def limited_action(message_data: Dict[str, Any]) -> Optional[str]:
+    if message_data.get("type") == "send_message":
+        return "message"
+    if message_data.get("type") == "typing":
+        return "typing"
+    if message_data.get("action") in ("subscribe", "subscribe_many"):
+        return "subscribe"
+    return None
+
+
+async def send_throttled(
+    websocket: WebSocket,
+    message_data: Dict[str, Any],
+    limits: ConnectionLimits,
+    error_msg: str,
+    retry_after: float
+):
+    # Every refused send gets its ack so pipelining clients can match it; other frames get one error per window
+    if message_data.get("type") == "send_message":
+        ack = MessageAck(
+            clientMsgId=message_data.get("clientMsgId"),
+            chatId=str(message_data.get("chatId", "")),
+            success=False,
+            error=error_msg,
+            retryAfter=retry_after
+        )
+        await manager.send_to_socket(ack, websocket)
+    elif limits.should_notify(retry_after):
+        received = message_data.get("type") or message_data.get("action")
+        await send_error(websocket, error_msg, f"Received: {received}", retry_after)
+
+
+async def admit_client_message(
+    websocket: WebSocket,
+    user_id: str,
+    message_data: Dict[str, Any],
+    limits: ConnectionLimits
+) -> bool:
+    # Only bucket arithmetic and dict lookups, so refused frames cost next to nothing
+    action = limited_action(message_data)
+    try:
+        limits.check("frame")
+        if action is not None:
+            limits.check(action)
+            if action != "message":  # post_message checks the user's bucket, for HTTP sends too
+                rate_limits.check(action, user_id)
+    except RateLimitExceeded as e:
+        await send_throttled(websocket, message_data, limits, e.detail, e.retry_after)
+        return False
+
+    if not admission.enter():
+        _shed_actions.inc()
+        await send_throttled(websocket, message_data, limits, "Server busy", ADMISSION_RETRY_AFTER)
+        return False
+    return True
+
+
+async def handle_client_message(
+    websocket: WebSocket,
+    user_id: str,
+    message_data: Dict[str, Any],
+    limits: ConnectionLimits
+):
+    if message_data.get("type") == "pong":
+        return  # the receive loop has already recorded the activity
+
+    if not await admit_client_message(websocket, user_id, message_data, limits):
+        return
+    try:
+        await process_client_message(websocket, user_id, message_data)
+    finally:
+        admission.leave()
+
+
+async def replay_missed_messages(websocket: WebSocket, chat_id: str, since_seq: int):
+    # Runs in the same loop turn as the subscribe, so no live event can slip in between
+    latest_seq = store.latest_seq(chat_id)
+    missed = manager.replay.since(chat_id, since_seq, latest_seq)
+
+    if missed is None:
+        resync = ResyncRequired(chatId=chat_id, latestSeq=latest_seq)
+        await manager.send_to_socket(resync, websocket)
+    else:
+        manager.replay_to_socket(missed, websocket)
 
 
-async def handle_subscribe_action(websocket: WebSocket, user_id: str, chat_id: str):
+async def handle_subscribe_action(websocket: WebSocket, user_id: str, chat_id: str, since_seq: int = None):
     manager.subscribe_to_chat(user_id, chat_id)
     response = {
         "type": "subscription_confirmed",
@@ -28,7 +125,10 @@ async def handle_subscribe_action(websocket: WebSocket, user_id: str, chat_id: s
         "chatId": chat_id,
         "message": f"Subscribed to chat {chat_id}"
     }
-    await websocket.send_json(response)
+    await manager.send_to_socket(response, websocket)
+
+    if since_seq is not None:
+        await replay_missed_messages(websocket, chat_id, since_seq)
 
 
 async def handle_unsubscribe_action(websocket: WebSocket, user_id: str, chat_id: str):
@@ -39,42 +139,95 @@ async def handle_unsubscribe_action(websocket: WebSocket, user_id: str, chat_id:
         "chatId": chat_id,
         "message": f"Unsubscribed from chat {chat_id}"
     }
-    await websocket.send_json(response)
+    await manager.send_to_socket(response, websocket)
+
+
+async def handle_bulk_subscribe_action(websocket: WebSocket, user_id: str, message_data: Dict[str, Any]):
+    subscription = BulkSubscriptionMessage(**message_data)
+    chat_ids = list(dict.fromkeys(subscription.chatIds))
+
+    manager.subscribe_to_chats(user_id, chat_ids)
+    response = {
+        "type": "subscription_confirmed",
+        "action": "subscribe_many",
+        "chatIds": chat_ids,
+        "message": f"Subscribed to {len(chat_ids)} chats"
+    }
+    await manager.send_to_socket(response, websocket)
+
+    for chat_id in chat_ids:
+        if chat_id in subscription.sinceSeqs:
+            await replay_missed_messages(websocket, chat_id, subscription.sinceSeqs[chat_id])
 
 
 async def handle_subscription_message(websocket: WebSocket, user_id: str, message_data: Dict[str, Any]):
     subscription = SubscriptionMessage(**message_data)
 
     if subscription.action == "subscribe":
-        await handle_subscribe_action(websocket, user_id, subscription.chatId)
+        await handle_subscribe_action(websocket, user_id, subscription.chatId, subscription.sinceSeq)
     elif subscription.action == "unsubscribe":
         await handle_unsubscribe_action(websocket, user_id, subscription.chatId)
 
 
 async def handle_typing_indicator(user_id: str, message_data: Dict[str, Any]):
     chat_id = message_data.get("chatId")
-    is_typing = message_data.get("isTyping", True)
-    username = users_db.get(user_id, "Unknown")
-
-    if chat_id:
-        typing_notification = UserTypingNotification(
-            chatId=chat_id,
-            userId=user_id,
-            username=username,
-            isTyping=is_typing
-        )
+    is_typing = bool(message_data.get("isTyping", True))
 
-        await manager.broadcast_to_chat(
-            typing_notification.model_dump(mode='json'),
-            chat_id,
-            exclude_user=user_id
+    # Keystroke repeats inside the throttle window stop here, before the username lookup
+    if not chat_id or not manager.typing.should_publish(chat_id, user_id, is_typing):
+        return
+
+    username = await store.get_username(user_id) or "Unknown"
+    manager.publish_typing(chat_id, user_id, username, is_typing)
+
+
+async def handle_send_message(websocket: WebSocket, user_id: str, message_data: Dict[str, Any]):
+    action = SendMessageAction(**message_data)
+
+    try:
+        new_message = await post_message(action.chatId, action.text, user_id, wait_for_commit=action.waitForCommit)
+    except HTTPException as e:
+        ack = MessageAck(
+            clientMsgId=action.clientMsgId,
+            chatId=action.chatId,
+            success=False,
+            error=e.detail,
+            retryAfter=getattr(e, "retry_after", None)
         )
+    else:
+        ack = MessageAck(
+            clientMsgId=action.clientMsgId,
+            chatId=action.chatId,
+            success=True,
+            message=Message(**new_message)
+        )
+
+    await manager.send_to_socket(ack, websocket)
+
+
+async def handle_mark_read(websocket: WebSocket, user_id: str, message_data: Dict[str, Any]):
+    action = MarkReadAction(**message_data)
+
+    # Success is the chat_update with the new unreadCount, sent to all of the user's sockets
+    try:
+        await mark_chat_read(action.chatId, user_id, action.seq)
+    except HTTPException as e:
+        await send_error(websocket, e.detail, f"mark_read for chat {action.chatId}")
 
 
 async def process_client_message(websocket: WebSocket, user_id: str, message_data: Dict[str, Any]):
     if "action" in message_data and "chatId" in message_data:
         await handle_subscription_message(websocket, user_id, message_data)
 
+    elif message_data.get("action") == "subscribe_many":
+        await handle_bulk_subscribe_action(websocket, user_id, message_data)
+
+    elif message_data.get("type") == "send_message":
+        await handle_send_message(websocket, user_id, message_data)
+
+    elif message_data.get("type") == "mark_read":
+        await handle_mark_read(websocket, user_id, message_data)
+
     elif message_data.get("type") == "typing":
         await handle_typing_indicator(user_id, message_data)
 
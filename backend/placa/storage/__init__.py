@@ -0,0 +1,75 @@
+from .base import ChatStore, MessagePage
+from .chat_index import ChatListIndex
+from .search_index import SearchIndex, SearchMatch
+from .memory import MemoryChatStore
+from .snapshot import SnapshotStore
+from .sqlite import SqliteChatStore
+from .write_behind import WriteBehindStore
+from ..config.settings import (
+    BUS_BACKEND,
+    STORAGE_BACKEND,
+    SQLITE_PATH,
+    MEMORY_HOT_MESSAGES,
+    MEMORY_SPILL_DIR,
+    SNAPSHOT_DIR,
+    SNAPSHOT_INTERVAL_MS,
+    SNAPSHOT_JOURNAL_MAX_BYTES,
+    JOURNAL_FLUSH_INTERVAL_MS,
+    JOURNAL_FSYNC,
+    WRITE_BEHIND_ENABLED,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_INTERVAL_MS,
+    WRITE_BEHIND_MAX_RETRIES,
+    WRITE_BEHIND_RETRY_BACKOFF_MS,
+    SEARCH_MAX_BYTES,
+    SEARCH_MAX_DOCS,
+    SEARCH_SEGMENT_SIZE
+)
+
+
+def create_store(backend: str) -> ChatStore:
+    if backend == "memory":
+        memory_store = MemoryChatStore(MEMORY_HOT_MESSAGES, MEMORY_SPILL_DIR)
+        if SNAPSHOT_DIR:
+            return SnapshotStore(
+                memory_store,
+                SNAPSHOT_DIR,
+                SNAPSHOT_INTERVAL_MS,
+                SNAPSHOT_JOURNAL_MAX_BYTES,
+                JOURNAL_FLUSH_INTERVAL_MS,
+                JOURNAL_FSYNC
+            )
+        return memory_store
+    if backend == "sqlite":
+        sqlite_store = SqliteChatStore(SQLITE_PATH, shared=BUS_BACKEND == "unix")  # the unix bus means several workers
+        if WRITE_BEHIND_ENABLED:
+            return WriteBehindStore(
+                sqlite_store,
+                WRITE_BEHIND_BATCH_SIZE,
+                WRITE_BEHIND_INTERVAL_MS,
+                WRITE_BEHIND_MAX_RETRIES,
+                WRITE_BEHIND_RETRY_BACKOFF_MS
+            )
+        return sqlite_store
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+store = create_store(STORAGE_BACKEND)
+chat_index = ChatListIndex(store)
+search_index = SearchIndex(store, SEARCH_MAX_DOCS, SEARCH_SEGMENT_SIZE, SEARCH_MAX_BYTES)
+
+__all__ = [
+    "ChatStore",
+    "MessagePage",
+    "ChatListIndex",
+    "SearchIndex",
+    "SearchMatch",
+    "MemoryChatStore",
+    "SnapshotStore",
+    "SqliteChatStore",
+    "WriteBehindStore",
+    "create_store",
+    "store",
+    "chat_index",
+    "search_index",
+]
@@ -0,0 +1,127 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+
+class MessagePage(NamedTuple):
+    messages: List[dict]
+    has_older: bool
+    has_newer: bool
+
+
+class ChatStore(ABC):
+
+    def __init__(self):
+        self.chat_seq: Dict[str, int] = {}  # chat id -> last assigned message sequence number
+
+    def latest_seq(self, chat_id: str) -> int:
+        return self.chat_seq.get(chat_id, 0)
+
+    def next_seq(self, chat_id: str) -> int:
+        seq = self.chat_seq.get(chat_id, 0) + 1
+        self.chat_seq[chat_id] = seq
+        return seq
+
+    async def reserve_seq(self, chat_id: str) -> int:
+        # Stores shared between processes hand out seqs from the database instead
+        return self.next_seq(chat_id)
+
+    def observe_seq(self, chat_id: str, seq: int):
+        # A seq assigned elsewhere (another worker, via the bus); latest_seq never goes back
+        if seq > self.chat_seq.get(chat_id, 0):
+            self.chat_seq[chat_id] = seq
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def sync(self):
+        # Returns once every write issued so far is durable; plain stores write synchronously
+        pass
+
+    @abstractmethod
+    async def add_user(self, user_id: str, username: str):
+        ...
+
+    @abstractmethod
+    async def get_username(self, user_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def list_chats(self) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def get_chat(self, chat_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def update_chat_last_message(self, chat_id: str, text: str, timestamp: datetime):
+        ...
+
+    @abstractmethod
+    async def append_message(self, chat_id: str, message: dict):
+        # Assigns message["seq"], a per-chat number increasing by one with every message
+        ...
+
+    @abstractmethod
+    async def get_message(self, chat_id: str, message_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_message_ids(self, message_ids: List[str]) -> Dict[str, str]:
+        # message id -> chat id, for those of `message_ids` already stored in any chat
+        ...
+
+    @abstractmethod
+    async def get_message_page(
+        self,
+        chat_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> MessagePage:
+        # Raises KeyError for a cursor that does not belong to the chat
+        ...
+
+    @abstractmethod
+    def iter_history(self, chat_id: str, batch_size: int) -> AsyncIterator[List[dict]]:
+        # The chat's whole history oldest first, `batch_size` messages at a time
+        ...
+
+    @abstractmethod
+    async def list_recent_messages(self, limit: int) -> List[Tuple[str, dict]]:
+        # (chat id, message) pairs for the newest `limit` messages across all chats, oldest first
+        ...
+
+    @abstractmethod
+    async def get_read_cursors(self, user_id: str) -> Dict[str, int]:
+        # chat id -> seq of the last message the user has read
+        ...
+
+    @abstractmethod
+    async def set_read_cursor(self, user_id: str, chat_id: str, seq: int):
+        ...
+
+    async def write_batch(
+        self,
+        messages: List[Tuple[str, dict]],
+        chat_updates: Dict[str, Tuple[str, datetime]],
+        read_cursors: Optional[Dict[Tuple[str, str], int]] = None
+    ):
+        for chat_id, message in messages:
+            await self.append_message(chat_id, message)
+        for chat_id, (text, timestamp) in chat_updates.items():
+            await self.update_chat_last_message(chat_id, text, timestamp)
+        for (user_id, chat_id), seq in (read_cursors or {}).items():
+            await self.set_read_cursor(user_id, chat_id, seq)
+
+    async def append_batch(self, messages: List[Tuple[str, dict]], chat_updates: Dict[str, Tuple[str, datetime]]):
+        # Bulk import: assigns seqs like append_message, with one lastMessage update per chat. Messages
+        # older than the chat's newest still take the next seqs but are stored in time order
+        for chat_id, message in messages:
+            await self.append_message(chat_id, message)
+        for chat_id, (text, timestamp) in chat_updates.items():
+            await self.update_chat_last_message(chat_id, text, timestamp)
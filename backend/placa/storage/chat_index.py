@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from .base import ChatStore
+
+
+class ChatListIndex:
+
+    def __init__(self, store: ChatStore):
+        self.store = store
+        self.chats: "OrderedDict[str, dict]" = OrderedDict()  # chat id -> chat, least recently active first
+        self.members: Dict[str, set] = {}  # userId -> chat ids
+        self.read_seq: Dict[str, Dict[str, int]] = {}  # userId -> chatId -> seq of the last read message
+
+    async def load(self):
+        # The only full sort; afterwards every new message just moves its chat to the end
+        chats = sorted(await self.store.list_chats(), key=lambda chat: chat["lastMessageTime"] or datetime.min)
+        self.chats = OrderedDict((chat["id"], dict(chat)) for chat in chats)
+
+    def record_message(self, chat_id: str, text: str, timestamp: datetime):
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            return
+
+        chat["lastMessage"] = text
+        chat["lastMessageTime"] = timestamp
+        self.chats.move_to_end(chat_id)
+
+    async def join(self, user_id: str):
+        # Every chat is public for now, so a new member starts with the whole list, read up to now
+        cursors = await self.store.get_read_cursors(user_id)
+        for chat_id in self.chats:
+            if chat_id not in cursors:
+                cursors[chat_id] = self.store.latest_seq(chat_id)
+                await self.store.set_read_cursor(user_id, chat_id, cursors[chat_id])
+
+        self.members[user_id] = set(self.chats)
+        self.read_seq[user_id] = cursors
+
+    def is_member(self, user_id: str, chat_id: str) -> bool:
+        return chat_id in self.members.get(user_id, ())
+
+    def unread_count(self, user_id: str, chat_id: str) -> int:
+        return max(0, self.store.latest_seq(chat_id) - self.read_seq.get(user_id, {}).get(chat_id, 0))
+
+    def top_chats(self, user_id: str, limit: Optional[int] = None) -> List[dict]:
+        # Walks from the most recent chat and stops after `limit` hits, so no per-request sort
+        members = self.members.get(user_id, ())
+        chats = []
+        for chat_id in reversed(self.chats):
+            if chat_id not in members:
+                continue
+            chats.append({**self.chats[chat_id], "unreadCount": self.unread_count(user_id, chat_id)})
+            if limit is not None and len(chats) >= limit:
+                break
+        return chats
+
+    def observe_read(self, user_id: str, chat_id: str, seq: int):
+        # A read recorded by another worker; users this worker has not loaded read theirs from the store
+        cursors = self.read_seq.get(user_id)
+        if cursors is not None and seq > cursors.get(chat_id, 0):
+            cursors[chat_id] = seq
+
+    async def mark_read(self, user_id: str, chat_id: str, seq: Optional[int] = None) -> int:
+        latest = self.store.latest_seq(chat_id)
+        seq = latest if seq is None else min(seq, latest)
+
+        cursors = self.read_seq.setdefault(user_id, {})
+        if seq > cursors.get(chat_id, 0):
+            cursors[chat_id] = seq
+            await self.store.set_read_cursor(user_id, chat_id, seq)
+        return self.unread_count(user_id, chat_id)
@@ -0,0 +1,332 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from datetime import datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Cold record: timestamp (us), seq, then the byte lengths of id, sender, senderId and text, then those bytes
+_HEADER = struct.Struct("<qqHHHI")
+
+
+def to_micros(timestamp: datetime) -> int:
+    # Message times are naive wall-clock datetimes; integer arithmetic keeps them exact, unlike float timestamps
+    return (timestamp - EPOCH) // ONE_MICROSECOND
+
+
+def from_micros(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+def encode_record(message_id: str, text: str, sender: str, sender_id: str, micros: int, seq: int) -> bytes:
+    fields = [value.encode() for value in (message_id, sender, sender_id, text)]
+    return _HEADER.pack(micros, seq, *(len(field) for field in fields)) + b"".join(fields)
+
+
+def decode_record(view, offset: int):
+    # Returns the record's columns and the offset just past it
+    micros, seq, id_length, sender_length, sender_id_length, text_length = _HEADER.unpack_from(view, offset)
+    position = offset + _HEADER.size
+    fields = []
+    for length in (id_length, sender_length, sender_id_length, text_length):
+        fields.append(str(view[position:position + length], "utf-8"))
+        position += length
+    message_id, sender, sender_id, text = fields
+    return (message_id, text, sys.intern(sender), sys.intern(sender_id), micros, seq), position
+
+
+def record_end(view, offset: int) -> int:
+    _, _, *lengths = _HEADER.unpack_from(view, offset)
+    return offset + _HEADER.size + sum(lengths)
+
+
+def message_record(message: dict) -> tuple:
+    return (
+        message["id"], message["text"], sys.intern(message["sender"]), sys.intern(message["senderId"]),
+        to_micros(message["timestamp"]), message["seq"]
+    )
+
+
+def _record_id(record: tuple) -> str:
+    return record[0]
+
+
+def _message(message_id: str, text: str, sender: str, sender_id: str, micros: int, seq: int) -> dict:
+    return {
+        "id": message_id,
+        "text": text,
+        "sender": sender,
+        "senderId": sender_id,
+        "timestamp": from_micros(micros),
+        "isOwnMessage": False,
+        "seq": seq
+    }
+
+
+class SegmentFile:
+    # Append-only file of one chat's oldest messages. Only the record offsets stay in memory;
+    # reads go through a memory map that is re-created when the file has grown past it
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = array("Q")
+        self._file = open(path, "w+b")
+        self._size = 0
+        self._map: Optional[mmap.mmap] = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append_many(self, records) -> int:
+        chunks = []
+        offset = self._size
+        for record in records:
+            chunk = encode_record(*record)
+            self.offsets.append(offset)
+            chunks.append(chunk)
+            offset += len(chunk)
+        data = b"".join(chunks)
+        self._file.seek(self._size)
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        return len(chunks)
+
+    def append_encoded(self, data, starts) -> int:
+        # Records already in this layout, e.g. from a snapshot; `starts` are their offsets within `data`
+        self.offsets.extend(self._size + start for start in starts)
+        self._file.seek(self._size)
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        return len(starts)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _view(self) -> mmap.mmap:
+        if self._map is None or len(self._map) < self._size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _read(self, index: int):
+        return decode_record(self._view(), self.offsets[index])[0]
+
+    def id_at(self, index: int) -> str:
+        view = self._view()
+        offset = self.offsets[index]
+        id_length = _HEADER.unpack_from(view, offset)[2]
+        start = offset + _HEADER.size
+        return view[start:start + id_length].decode()
+
+    def message(self, index: int) -> dict:
+        return _message(*self._read(index))
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class _ColdIds:
+    # Sequence view over the ids in a segment file, so bisect can search it without loading them
+
+    def __init__(self, segment: SegmentFile):
+        self.segment = segment
+
+    def __len__(self):
+        return len(self.segment)
+
+    def __getitem__(self, index: int) -> str:
+        return self.segment.id_at(index)
+
+
+class HistoryCapture(NamedTuple):
+    cold_path: Optional[str]
+    cold_size: int
+    cold_count: int
+    hot_columns: tuple  # ids, texts, senders, sender ids, timestamps, seqs
+
+
+class ChatHistory:
+    # One chat's messages as parallel columns instead of a dict per message. The newest `hot_limit`
+    # messages stay in memory; older ones move to the chat's segment file in chunks.
+
+    def __init__(self, hot_limit: int, segment_path: Optional[str] = None):
+        self.hot_limit = hot_limit
+        self.segment_path = segment_path
+        self._rewrites = 0  # segment files replaced by a backfill, which names the next one
+
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.senders: List[str] = []
+        self.sender_ids: List[str] = []
+        self.timestamps = array("q")  # microseconds since the epoch
+        self.seqs = array("q")
+        self.cold: Optional[SegmentFile] = None
+
+    def __len__(self):
+        return self.cold_count + len(self.ids)
+
+    @property
+    def cold_count(self) -> int:
+        return len(self.cold) if self.cold is not None else 0
+
+    def append(self, message: dict):
+        if len(self) and message["id"] < self.id_at(len(self) - 1):
+            self.insert_records([message_record(message)])
+            return
+
+        self.ids.append(message["id"])
+        self.texts.append(message["text"])
+        # Interned, so every message from one sender shares the same two string objects
+        self.senders.append(sys.intern(message["sender"]))
+        self.sender_ids.append(sys.intern(message["senderId"]))
+        self.timestamps.append(to_micros(message["timestamp"]))
+        self.seqs.append(message["seq"])
+        self._maybe_spill()
+
+    def extend_records(self, records):
+        # Bulk load of (id, text, sender, senderId, micros, seq) rows, skipping the per-message dicts
+        for message_id, text, sender, sender_id, micros, seq in records:
+            self.ids.append(message_id)
+            self.texts.append(text)
+            self.senders.append(sender)
+            self.sender_ids.append(sender_id)
+            self.timestamps.append(micros)
+            self.seqs.append(seq)
+            self._maybe_spill()
+
+    def insert_records(self, records):
+        # Rows sorted by id that may belong anywhere in the history (a backfill, or its journal
+        # replay). Everything from the first one's position on is merged back in one pass
+        if not records:
+            return
+        start = self._bisect(records[0][0])
+        cold_count = self.cold_count
+        if start == len(self):
+            self.extend_records(records)
+            return
+
+        if start >= cold_count:
+            hot_start = start - cold_count
+            tail = list(zip(*(column[hot_start:] for column in self._columns())))
+            for column in self._columns():
+                del column[hot_start:]
+            self.extend_records(merge(tail, records, key=_record_id))
+            return
+
+        # The segment file is append-only, since snapshots copy it from another thread. Its records
+        # before `start` are copied byte for byte into a new file and the rest are merged back after
+        old = self.cold
+        self._rewrites += 1
+        self.cold = SegmentFile(f"{self.segment_path}.{self._rewrites}")
+        with memoryview(old._view()) as view:
+            self.cold.append_encoded(view[:old.offsets[start]], old.offsets[:start])
+        hot = list(zip(*self._columns()))
+        for column in self._columns():
+            del column[:]
+        cold_tail = (old._read(index) for index in range(start, cold_count))
+        self.extend_records(merge(cold_tail, hot, records, key=_record_id))
+        old.close()
+        os.remove(old.path)
+
+    def load_encoded(self, view, offset: int, count: int) -> int:
+        # Restores `count` encoded records starting at `offset` into an empty history. The oldest go to
+        # the segment file still encoded and only the hot tail is decoded; returns the offset past them
+        cold = count - self.hot_limit if self.hot_limit and self.segment_path else 0
+        if cold > 0:
+            starts = array("Q")
+            position = offset
+            for _ in range(cold):
+                starts.append(position - offset)
+                position = record_end(view, position)
+            if self.cold is None:
+                self.cold = SegmentFile(self.segment_path)
+            self.cold.append_encoded(view[offset:position], starts)
+            offset, count = position, count - cold
+
+        records = []
+        for _ in range(count):
+            record, offset = decode_record(view, offset)
+            records.append(record)
+        self.extend_records(records)
+        return offset
+
+    def _maybe_spill(self):
+        # Spill a quarter of the limit at a time, so the list heads are not shifted on every append
+        if self.hot_limit and self.segment_path and len(self.ids) >= self.hot_limit + max(1, self.hot_limit // 4):
+            self._spill(len(self.ids) - self.hot_limit)
+
+    def _spill(self, count: int):
+        if self.cold is None:
+            self.cold = SegmentFile(self.segment_path)
+        self.cold.append_many(zip(
+            self.ids[:count], self.texts[:count], self.senders[:count], self.sender_ids[:count],
+            self.timestamps[:count], self.seqs[:count]
+        ))
+        for column in self._columns():
+            del column[:count]
+
+    def _columns(self) -> tuple:
+        return self.ids, self.texts, self.senders, self.sender_ids, self.timestamps, self.seqs
+
+    def capture(self) -> "HistoryCapture":
+        # Cheap copies taken on the event loop; the segment file is only appended to, so its first
+        # `size` bytes stay valid for a reader on another thread
+        return HistoryCapture(
+            self.cold.path if self.cold is not None else None,
+            self.cold.size if self.cold is not None else 0,
+            self.cold_count,
+            tuple(column[:] for column in self._columns())
+        )
+
+    def message(self, index: int) -> dict:
+        cold_count = self.cold_count
+        if index < cold_count:
+            return self.cold.message(index)
+        index -= cold_count
+        return _message(
+            self.ids[index], self.texts[index], self.senders[index], self.sender_ids[index],
+            self.timestamps[index], self.seqs[index]
+        )
+
+    def slice(self, start: int, end: int) -> List[dict]:
+        return [self.message(index) for index in range(start, end)]
+
+    def id_at(self, index: int) -> str:
+        cold_count = self.cold_count
+        return self.cold.id_at(index) if index < cold_count else self.ids[index - cold_count]
+
+    def _bisect(self, message_id: str) -> int:
+        # Ids are time-ordered, so both the hot columns and the segment file are sorted by id
+        cold_count = self.cold_count
+        if self.ids and message_id >= self.ids[0] or not cold_count:
+            return cold_count + bisect_left(self.ids, message_id)
+        return bisect_left(_ColdIds(self.cold), message_id)
+
+    def position(self, message_id: str) -> int:
+        position = self._bisect(message_id)
+        if position < len(self) and self.id_at(position) == message_id:
+            return position
+        raise KeyError(message_id)
+
+    def newest_first(self) -> Iterator[dict]:
+        for index in range(len(self) - 1, -1, -1):
+            yield self.message(index)
+
+    def close(self):
+        if self.cold is not None:
+            self.cold.close()
+            os.remove(self.cold.path)
+            self.cold = None
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+# ULID layout: 48-bit millisecond timestamp + 80 random bits, as 26 Crockford base32 characters.
+# The fixed width means plain string order is time order.
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+PREFIX = "msg_"
+_PATTERN = re.compile(PREFIX + f"[{_ALPHABET}]{{26}}")
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(26):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def _decode(chars: str) -> int:
+    value = 0
+    for char in chars:
+        value = (value << 5) | _ALPHABET.index(char)
+    return value
+
+
+def _ms(timestamp: datetime) -> int:
+    return int(timestamp.timestamp() * 1000)
+
+
+class MessageIdGenerator:
+
+    def __init__(self):
+        self._last_ms = 0
+        self._last_random = 0
+        self._lock = threading.Lock()  # seeding runs on the SQLite thread
+
+    def new_id(self) -> str:
+        # Monotonic within the process: same (or earlier) millisecond bumps the random part instead
+        ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if ms <= self._last_ms:
+                ms = self._last_ms
+                random = self._last_random + 1
+            else:
+                random = int.from_bytes(os.urandom(_RANDOM_BITS // 8), "big")
+            self._last_ms, self._last_random = ms, random
+        return PREFIX + _encode((ms << _RANDOM_BITS) | random)
+
+
+def message_id_at(timestamp: datetime, key: Optional[str] = None) -> str:
+    # For backdated messages (seed data, imported history); does not affect the generator's monotonic
+    # state. With a key the random part is derived from it, so the same key and time give the same id
+    ms = _ms(timestamp)
+    if key is None:
+        random = os.urandom(_RANDOM_BITS // 8)
+    else:
+        random = hashlib.blake2b(key.encode(), digest_size=_RANDOM_BITS // 8).digest()
+    return PREFIX + _encode((ms << _RANDOM_BITS) | int.from_bytes(random, "big"))
+
+
+def is_message_id(value: str) -> bool:
+    # Shaped like the ids generated here, so it sorts in time order among them
+    return _PATTERN.fullmatch(value) is not None
+
+
+def is_message_id_at(value: str, timestamp: datetime) -> bool:
+    # Generated for this time, so ordering by id agrees with ordering by timestamp
+    return is_message_id(value) and _decode(value[len(PREFIX):]) >> _RANDOM_BITS == _ms(timestamp)
+
+
+message_ids = MessageIdGenerator()
@@ -0,0 +1,190 @@
+import heapq
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from .base import ChatStore, MessagePage
+from .history import ChatHistory, message_record
+from .seed import seed_chats, seed_messages
+
+
+def _tagged(chat_id: str, history: ChatHistory):
+    # A function rather than a nested generator expression, which would see only the last chat_id
+    for message in history.newest_first():
+        yield chat_id, message
+
+
+class MemoryChatStore(ChatStore):
+
+    def __init__(self, hot_messages: int = 0, spill_dir: Optional[str] = None):
+        super().__init__()
+        self.users_db: Dict[str, str] = {}  # userId -> username
+        self.chats_db: Dict[str, dict] = seed_chats()
+        self.read_cursors: Dict[str, Dict[str, int]] = {}  # userId -> chatId -> last read seq
+
+        # Messages past the per-chat hot limit go to segment files; with no directory given
+        # they go to a temporary one that is removed on close, like the rest of this store
+        self.hot_messages = hot_messages
+        self.spill_dir = spill_dir
+        self._owns_spill_dir = False
+        self.messages_db: Dict[str, ChatHistory] = {}
+
+        for chat_id, messages in seed_messages().items():
+            for message in messages:
+                message["seq"] = self.next_seq(chat_id)
+                self._history(chat_id).append(message)
+
+    def _history(self, chat_id: str) -> ChatHistory:
+        history = self.messages_db.get(chat_id)
+        if history is None:
+            history = self.messages_db[chat_id] = ChatHistory(self.hot_messages, self._segment_path(chat_id))
+        return history
+
+    def _segment_path(self, chat_id: str) -> Optional[str]:
+        if not self.hot_messages:
+            return None
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="placa-history-")
+            self._owns_spill_dir = True
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # Numbered rather than named after the chat, so any chat id is a safe file name
+        return os.path.join(self.spill_dir, f"chat-{len(self.messages_db)}.seg")
+
+    def clear(self):
+        # Drops everything, seed data included, before a snapshot is loaded in its place
+        for history in self.messages_db.values():
+            history.close()
+        self.users_db, self.chats_db, self.read_cursors, self.messages_db = {}, {}, {}, {}
+        self.chat_seq = {}
+
+    def restore_messages(self, chat_id: str, records):
+        # Bulk load of encoded rows that already carry their seqs, as written by a snapshot or journal
+        records = sorted(records)
+        self._history(chat_id).insert_records(records)
+        if records:
+            self.chat_seq[chat_id] = max(self.chat_seq.get(chat_id, 0), *(record[5] for record in records))
+
+    def restore_history(self, chat_id: str, view, offset: int, count: int, seq: int) -> int:
+        # A chat's whole history from a snapshot, in segment record layout; returns the offset past it
+        offset = self._history(chat_id).load_encoded(view, offset, count)
+        self.chat_seq[chat_id] = seq
+        return offset
+
+    async def close(self):
+        for history in self.messages_db.values():
+            history.close()
+        if self._owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    async def add_user(self, user_id: str, username: str):
+        self.users_db[user_id] = username
+
+    async def get_username(self, user_id: str) -> Optional[str]:
+        return self.users_db.get(user_id)
+
+    async def list_chats(self) -> List[dict]:
+        return list(self.chats_db.values())
+
+    async def get_chat(self, chat_id: str) -> Optional[dict]:
+        return self.chats_db.get(chat_id)
+
+    async def update_chat_last_message(self, chat_id: str, text: str, timestamp: datetime):
+        chat = self.chats_db[chat_id]
+        chat["lastMessage"] = text
+        chat["lastMessageTime"] = timestamp
+
+    async def append_message(self, chat_id: str, message: dict):
+        message["seq"] = self.next_seq(chat_id)
+        self._history(chat_id).append(message)
+
+    async def append_batch(self, messages: List[Tuple[str, dict]], chat_updates: Dict[str, Tuple[str, datetime]]):
+        # One merge per chat, so a backfill rewrites the chat's segment file once rather than per message
+        by_chat: Dict[str, List[tuple]] = {}
+        for chat_id, message in messages:
+            message["seq"] = self.next_seq(chat_id)
+            by_chat.setdefault(chat_id, []).append(message_record(message))
+        for chat_id, records in by_chat.items():
+            self._history(chat_id).insert_records(sorted(records))
+        for chat_id, (text, timestamp) in chat_updates.items():
+            await self.update_chat_last_message(chat_id, text, timestamp)
+
+    async def find_message_ids(self, message_ids: List[str]) -> Dict[str, str]:
+        found = {}
+        if not message_ids:
+            return found
+        lowest, highest = min(message_ids), max(message_ids)
+        for chat_id, history in self.messages_db.items():
+            # Histories are sorted by id, so most chats are ruled out by their first and last ids
+            if not len(history) or history.id_at(0) > highest or history.id_at(len(history) - 1) < lowest:
+                continue
+            for message_id in message_ids:
+                try:
+                    history.position(message_id)
+                except KeyError:
+                    continue
+                found[message_id] = chat_id
+        return found
+
+    def _position(self, chat_id: str, message_id: str) -> int:
+        history = self.messages_db.get(chat_id)
+        if history is None:
+            raise KeyError(message_id)
+        return history.position(message_id)
+
+    async def get_message(self, chat_id: str, message_id: str) -> Optional[dict]:
+        try:
+            return self.messages_db[chat_id].message(self._position(chat_id, message_id))
+        except KeyError:
+            return None
+
+    async def get_message_page(
+        self,
+        chat_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> MessagePage:
+        history = self.messages_db.get(chat_id)
+        total = len(history) if history is not None else 0
+
+        if before is not None:
+            end = self._position(chat_id, before)
+            start = max(0, end - limit)
+        elif after is not None:
+            start = self._position(chat_id, after) + 1
+            end = min(total, start + limit)
+        else:
+            end = total
+            start = max(0, end - limit)
+
+        messages = history.slice(start, end) if history is not None else []
+        # A flag is set when a message lies beyond that edge, even if the page itself is empty
+        return MessagePage(messages, start > 0, end < total)
+
+    async def iter_history(self, chat_id: str, batch_size: int) -> AsyncIterator[List[dict]]:
+        history = self.messages_db.get(chat_id)
+        if history is None:
+            return
+        # Positions are stable while messages spill to disk, so appends during the export just extend it
+        start = 0
+        while start < len(history):
+            end = min(len(history), start + batch_size)
+            yield history.slice(start, end)
+            start = end
+
+    async def list_recent_messages(self, limit: int) -> List[Tuple[str, dict]]:
+        newest = heapq.merge(
+            *(_tagged(chat_id, history) for chat_id, history in self.messages_db.items()),
+            key=lambda item: item[1]["timestamp"],
+            reverse=True
+        )
+        recent = [item for _, item in zip(range(limit), newest)]
+        recent.reverse()
+        return recent
+
+    async def get_read_cursors(self, user_id: str) -> Dict[str, int]:
+        return dict(self.read_cursors.get(user_id, {}))
+
+    async def set_read_cursor(self, user_id: str, chat_id: str, seq: int):
+        self.read_cursors.setdefault(user_id, {})[chat_id] = seq
@@ -0,0 +1,257 @@
+import heapq
+import logging
+import math
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from itertools import chain, islice
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+from .base import ChatStore
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+MIN_TOKEN_LENGTH = 2
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 64
+PREFIX_WEIGHT = 0.5  # a prefix hit counts for less than the whole word
+MIN_SEGMENTS = 4  # segments are sized so one eviction drops at most about 1/MIN_SEGMENTS of the index
+
+# Estimated bytes, so the size cap costs nothing per message: a document's chat number and message id
+# pointer, a doc id in a postings array, and a new term's array, dict slot and key
+_DOC_BYTES = 4 + 8
+_POSTING_BYTES = 4
+_POSTINGS_BYTES = sys.getsizeof(array("I")) + 48
+_VOCABULARY_SLOT_BYTES = 8 + 48  # a term's block pointer and its slot in the known set
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN.findall(text.casefold()) if len(token) >= MIN_TOKEN_LENGTH]
+
+
+class SearchMatch(NamedTuple):
+    chat_id: str
+    message_id: str
+    score: float
+
+
+class _Segment:
+    # A run of consecutive documents; the oldest segment is dropped whole when the index is full
+
+    def __init__(self, base: int):
+        self.base = base
+        self.chats = array("I")  # doc - base -> chat number
+        self.message_ids: List[str] = []
+        self.postings: Dict[str, array] = {}  # token -> doc ids
+        self.estimated_bytes = 0
+
+    def add(self, doc: int, chat: int, message_id: str, tokens: set):
+        self.chats.append(chat)
+        self.message_ids.append(message_id)
+        added = _DOC_BYTES + sys.getsizeof(message_id) + len(tokens) * _POSTING_BYTES
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = array("I")
+                added += _POSTINGS_BYTES + sys.getsizeof(token)
+            postings.append(doc)
+        self.estimated_bytes += added
+
+    def in_chat(self, doc_ids: array, chat: int) -> List[int]:
+        chats, base = self.chats, self.base
+        return [doc for doc in doc_ids if chats[doc - base] == chat]
+
+    def nbytes(self) -> int:
+        size = sys.getsizeof(self.chats) + sys.getsizeof(self.message_ids) + sys.getsizeof(self.postings)
+        size += sum(sys.getsizeof(message_id) for message_id in self.message_ids)
+        size += sum(sys.getsizeof(doc_ids) for doc_ids in self.postings.values())
+        return size
+
+
+class _Vocabulary:
+    # Sorted terms for prefix expansion, in blocks of up to 2 * BLOCK_SIZE: an insert shifts one block,
+    # not the whole list, and a prefix scan bisects the block maxima and then one block
+
+    BLOCK_SIZE = 1024
+
+    def __init__(self, terms=()):
+        ordered = sorted(terms)
+        self.blocks: List[List[str]] = [
+            ordered[start:start + self.BLOCK_SIZE] for start in range(0, len(ordered), self.BLOCK_SIZE)
+        ]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.size = len(ordered)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, term: str):
+        self.size += 1
+        if not self.blocks:
+            self.blocks.append([term])
+            self.maxes.append(term)
+            return
+
+        position = min(bisect_left(self.maxes, term), len(self.blocks) - 1)
+        block = self.blocks[position]
+        insort(block, term)
+        self.maxes[position] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self.blocks[position:position + 1] = [block[:self.BLOCK_SIZE], block[self.BLOCK_SIZE:]]
+            self.maxes.insert(position, block[self.BLOCK_SIZE - 1])
+
+    def prefixed(self, prefix: str, limit: int) -> List[str]:
+        found: List[str] = []
+        end_key = prefix + "\U0010ffff"
+        for block in islice(self.blocks, bisect_left(self.maxes, prefix), None):
+            start = bisect_left(block, prefix)
+            end = bisect_right(block, end_key, start)
+            found += block[start:min(end, start + limit - len(found))]
+            if end < len(block) or len(found) == limit:
+                break
+        return found
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.blocks) + sum(
+            sys.getsizeof(block) + sum(sys.getsizeof(term) for term in block) for block in self.blocks
+        )
+
+
+class SearchIndex:
+
+    def __init__(self, store: ChatStore, max_docs: int, segment_size: int, max_bytes: int = 0):
+        self.store = store
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes  # estimated; 0 is unlimited
+        self.segment_size = max(1, min(segment_size, max_docs // MIN_SEGMENTS))
+        self.segment_bytes = max_bytes // MIN_SEGMENTS
+
+        self.segments: Deque[_Segment] = deque()
+        self.doc_count = 0
+        self._next_doc = 0
+        self._vocabulary = _Vocabulary()
+        self._vocabulary_bytes = 0
+        self._known: set = set()
+        self._chat_numbers: Dict[str, int] = {}
+        self._chat_ids: List[str] = []
+
+    async def load(self):
+        for chat_id, message in await self.store.list_recent_messages(self.max_docs):
+            self.add(chat_id, message["id"], message["text"])
+        logger.info("Search index loaded", extra=self.stats())
+
+    @property
+    def estimated_bytes(self) -> int:
+        return sum(segment.estimated_bytes for segment in self.segments) + self._vocabulary_bytes
+
+    def _segment_full(self, segment: _Segment) -> bool:
+        return len(segment.chats) >= self.segment_size or (
+            self.segment_bytes > 0 and segment.estimated_bytes >= self.segment_bytes
+        )
+
+    def add(self, chat_id: str, message_id: str, text: str):
+        tokens = set(tokenize(text))
+        if not self.segments or self._segment_full(self.segments[-1]):
+            self.segments.append(_Segment(self._next_doc))
+
+        chat = self._chat_numbers.get(chat_id)
+        if chat is None:
+            chat = self._chat_numbers[chat_id] = len(self._chat_ids)
+            self._chat_ids.append(chat_id)
+
+        self.segments[-1].add(self._next_doc, chat, message_id, tokens)
+        self._next_doc += 1
+        self.doc_count += 1
+
+        for token in tokens:
+            if token not in self._known:
+                self._known.add(token)
+                self._vocabulary.add(token)
+                self._vocabulary_bytes += sys.getsizeof(token) + _VOCABULARY_SLOT_BYTES
+
+        # The segment being filled is never evicted, however small the caps
+        while len(self.segments) > 1 and self._over_capacity():
+            self._evict_oldest()
+
+    def _over_capacity(self) -> bool:
+        return self.doc_count > self.max_docs or (self.max_bytes > 0 and self.estimated_bytes > self.max_bytes)
+
+    def _evict_oldest(self):
+        evicted = self.segments.popleft()
+        self.doc_count -= len(evicted.chats)
+        self._known = set().union(*(segment.postings for segment in self.segments))
+        self._vocabulary = _Vocabulary(self._known)
+        self._vocabulary_bytes = sum(sys.getsizeof(token) + _VOCABULARY_SLOT_BYTES for token in self._known)
+
+    def _expand(self, term: str) -> List[str]:
+        if len(term) < MIN_PREFIX_LENGTH:
+            return []
+        return [token for token in self._vocabulary.prefixed(term, MAX_PREFIX_EXPANSIONS + 1) if token != term]
+
+    def _postings(self, token: str, chat: Optional[int]) -> list:
+        # Chat-scoped queries filter the global lists by each document's chat rather than keeping
+        # a second set of postings per chat, which would cost several times the memory
+        return [
+            segment.postings[token] if chat is None else segment.in_chat(segment.postings[token], chat)
+            for segment in self.segments
+            if token in segment.postings
+        ]
+
+    def _document(self, doc: int) -> Tuple[str, str]:
+        # Segments are contiguous, so the owning segment is found by bisecting their base ids
+        position = bisect_right([segment.base for segment in self.segments], doc) - 1
+        segment = self.segments[position]
+        return self._chat_ids[segment.chats[doc - segment.base]], segment.message_ids[doc - segment.base]
+
+    def search(
+        self,
+        query: str,
+        chat_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[int, List[SearchMatch]]:
+        # Any term may match; the last term also matches as a prefix (search as you type).
+        # Score is the summed idf of the matched terms, ties broken by recency.
+        terms = list(dict.fromkeys(tokenize(query)))
+        chat = None if chat_id is None else self._chat_numbers.get(chat_id)
+        if not terms or (chat_id is not None and chat is None):
+            return 0, []
+
+        scores: Dict[int, float] = {}
+        total_docs = max(self.doc_count, 1)
+        for position, term in enumerate(terms):
+            candidates = [(term, 1.0)]
+            if position == len(terms) - 1:
+                candidates += [(token, PREFIX_WEIGHT) for token in self._expand(term)]
+
+            for token, weight in candidates:
+                postings = self._postings(token, chat)
+                matched = sum(len(doc_ids) for doc_ids in postings)
+                if not matched:
+                    continue
+                idf = math.log(1 + total_docs / matched) * weight
+                if not scores:
+                    # Usually the longest list in the query; seeding the dict in one call skips the loop
+                    scores = dict.fromkeys(chain.from_iterable(postings), idf)
+                    continue
+                for doc_ids in postings:
+                    for doc in doc_ids:
+                        scores[doc] = scores.get(doc, 0.0) + idf
+
+        # Newest first: docs were inserted mostly in ascending order, so older ties rarely displace the heap top
+        top = heapq.nlargest(offset + limit, reversed(scores.items()), key=lambda item: (item[1], item[0]))[offset:]
+        return len(scores), [SearchMatch(*self._document(doc), round(score, 4)) for doc, score in top]
+
+    def stats(self) -> dict:
+        return {
+            "documents": self.doc_count,
+            "maxDocuments": self.max_docs,
+            "segments": len(self.segments),
+            "vocabulary": len(self._vocabulary),
+            "estimatedBytes": self.estimated_bytes,
+            "maxBytes": self.max_bytes,
+            "bytes": sum(segment.nbytes() for segment in self.segments) + self._vocabulary.nbytes()
+            + sys.getsizeof(self._known) + sys.getsizeof(self._chat_numbers) + sys.getsizeof(self._chat_ids)
+        }
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from typing import Dict, List
+from .ids import message_id_at
+from ..config.settings import SEED_EXTRA_CHATS
+
+
+# Dummy data every backend starts from when it is empty
+def seed_chats() -> Dict[str, dict]:
+    chats = {
+        "chat_1": {
+            "id": "chat_1",
+            "name": "General",
+            "lastMessage": "Welcome to the general chat!",
+            "lastMessageTime": datetime.now() - timedelta(minutes=5),
+            "unreadCount": 0
+        },
+        "chat_2": {
+            "id": "chat_2",
+            "name": "Tech Talk",
+            "lastMessage": "Anyone working on React projects?",
+            "lastMessageTime": datetime.now() - timedelta(minutes=30),
+            "unreadCount": 0
+        },
+        "chat_3": {
+            "id": "chat_3",
+            "name": "Random",
+            "lastMessage": "Happy coding!",
+            "lastMessageTime": datetime.now() - timedelta(hours=2),
+            "unreadCount": 0
+        }
+    }
+    for number in range(4, 4 + SEED_EXTRA_CHATS):
+        chats[f"chat_{number}"] = {
+            "id": f"chat_{number}",
+            "name": f"Chat {number}",
+            "lastMessage": None,
+            "lastMessageTime": None,
+            "unreadCount": 0
+        }
+    return chats
+
+
+def seed_messages() -> Dict[str, List[dict]]:
+    messages = {
+        "chat_1": [
+            {
+                "text": "Welcome to the general chat!",
+                "sender": "admin",
+                "senderId": "admin_id",
+                "timestamp": datetime.now() - timedelta(hours=1),
+                "isOwnMessage": False
+            },
+            {
+                "text": "Thanks! Happy to be here.",
+                "sender": "alice",
+                "senderId": "alice_id",
+                "timestamp": datetime.now() - timedelta(minutes=50),
+                "isOwnMessage": False
+            },
+            {
+                "text": "Hello everyone!",
+                "sender": "bob",
+                "senderId": "bob_id",
+                "timestamp": datetime.now() - timedelta(minutes=5),
+                "isOwnMessage": False
+            }
+        ],
+        "chat_2": [
+            {
+                "text": "Anyone working on React projects?",
+                "sender": "charlie",
+                "senderId": "charlie_id",
+                "timestamp": datetime.now() - timedelta(minutes=30),
+                "isOwnMessage": False
+            },
+            {
+                "text": "I am! Building a chat app.",
+                "sender": "dave",
+                "senderId": "dave_id",
+                "timestamp": datetime.now() - timedelta(minutes=25),
+                "isOwnMessage": False
+            }
+        ],
+        "chat_3": [
+            {
+                "text": "Happy coding!",
+                "sender": "eve",
+                "senderId": "eve_id",
+                "timestamp": datetime.now() - timedelta(hours=2),
+                "isOwnMessage": False
+            }
+        ]
+    }
+    for chat_messages in messages.values():
+        for message in chat_messages:
+            message["id"] = message_id_at(message["timestamp"])
+    return messages
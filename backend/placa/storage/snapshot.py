@@ -0,0 +1,552 @@
+import asyncio
+import logging
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+from .base import ChatStore, MessagePage
+from .history import HistoryCapture, decode_record, encode_record, from_micros, to_micros
+from .memory import MemoryChatStore
+from ..config.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+snapshot_duration = registry.histogram("placa_snapshot_write_seconds", "Time to write one snapshot, on a worker thread")
+snapshot_capture = registry.histogram("placa_snapshot_capture_seconds", "Event loop time spent copying state for a snapshot")
+snapshot_failures = registry.counter("placa_snapshot_failures_total", "Snapshots that failed to write")
+snapshot_size = registry.gauge("placa_snapshot_bytes", "Size of the latest snapshot file")
+journal_size = registry.gauge("placa_journal_bytes", "Journal bytes written since the latest snapshot")
+restore_duration = registry.gauge("placa_restore_seconds", "Time taken at startup to load the snapshot and replay the journal")
+
+# Snapshot file: preamble, users, chats, read cursors, then each chat's messages as segment records
+# (the layout of history.py's cold files, so those are copied in verbatim), and a CRC32 of it all
+MAGIC = b"PLACASNP"
+VERSION = 1
+_PREAMBLE = struct.Struct("<8sHq")  # magic, version, generation
+_COUNT = struct.Struct("<I")
+_INT = struct.Struct("<q")
+_FRAME = struct.Struct("<II")  # journal record: payload length, CRC32 of the payload
+NO_TIME = -(2 ** 63)
+COPY_CHUNK = 1024 * 1024
+HOT_CHUNK = 4096  # hot messages encoded per write
+
+SNAPSHOT_FILE = "snapshot.bin"
+_JOURNAL_NAME = re.compile(r"^journal\.(\d+)$")
+
+# Journal record kinds
+ADD_USER = b"U"
+CHAT_UPDATE = b"C"
+MESSAGE = b"M"
+MESSAGES = b"B"  # one chat's messages from one import batch, replayed in one merge
+READ_CURSOR = b"R"
+
+
+def _str(value: str) -> bytes:
+    data = value.encode()
+    return _COUNT.pack(len(data)) + data
+
+
+def _optional_str(value: Optional[str]) -> bytes:
+    return b"\x00" if value is None else b"\x01" + _str(value)
+
+
+def _time(value: Optional[datetime]) -> bytes:
+    return _INT.pack(NO_TIME if value is None else to_micros(value))
+
+
+def _encode_message(message: dict) -> bytes:
+    return encode_record(
+        message["id"], message["text"], message["sender"], message["senderId"],
+        to_micros(message["timestamp"]), message["seq"]
+    )
+
+
+def _message_record(chat_id: str, message: dict) -> bytes:
+    return MESSAGE + _str(chat_id) + _encode_message(message)
+
+
+class _Reader:
+
+    def __init__(self, view, offset: int = 0):
+        self.view = view
+        self.offset = offset
+
+    def read_count(self) -> int:
+        value = _COUNT.unpack_from(self.view, self.offset)[0]
+        self.offset += _COUNT.size
+        return value
+
+    def read_int(self) -> int:
+        value = _INT.unpack_from(self.view, self.offset)[0]
+        self.offset += _INT.size
+        return value
+
+    def read_str(self) -> str:
+        length = self.read_count()
+        start, self.offset = self.offset, self.offset + length
+        return str(self.view[start:self.offset], "utf-8")
+
+    def read_optional_str(self) -> Optional[str]:
+        present = self.view[self.offset]
+        self.offset += 1
+        return self.read_str() if present else None
+
+    def read_time(self) -> Optional[datetime]:
+        micros = self.read_int()
+        return None if micros == NO_TIME else from_micros(micros)
+
+    def read_records(self, count: int):
+        for _ in range(count):
+            record, self.offset = decode_record(self.view, self.offset)
+            yield record
+
+
+class MemoryCapture(NamedTuple):
+    generation: int
+    users: Dict[str, str]
+    chats: List[tuple]  # id, name, lastMessage, lastMessageTime
+    read_cursors: Dict[str, Dict[str, int]]
+    histories: Dict[str, Tuple[int, HistoryCapture]]  # chat id -> (latest seq, messages)
+
+
+def capture(store: MemoryChatStore, generation: int) -> MemoryCapture:
+    # The only part that runs on the event loop: shallow copies, no encoding
+    return MemoryCapture(
+        generation,
+        dict(store.users_db),
+        [(chat["id"], chat["name"], chat["lastMessage"], chat["lastMessageTime"]) for chat in store.chats_db.values()],
+        {user_id: dict(cursors) for user_id, cursors in store.read_cursors.items()},
+        {chat_id: (store.latest_seq(chat_id), history.capture()) for chat_id, history in store.messages_db.items()}
+    )
+
+
+class _ChecksumWriter:
+
+    def __init__(self, file):
+        self.file = file
+        self.crc = 0
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.file.write(data)
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+
+
+def _fsync_directory(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(path: str, state: MemoryCapture) -> int:
+    # Runs on a worker thread. Written beside the old snapshot and renamed over it, so a crash
+    # at any point leaves either the old file or the new one, never a torn one
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        out = _ChecksumWriter(file)
+        out.write(_PREAMBLE.pack(MAGIC, VERSION, state.generation))
+
+        out.write(_COUNT.pack(len(state.users)))
+        for user_id, username in state.users.items():
+            out.write(_str(user_id) + _str(username))
+
+        out.write(_COUNT.pack(len(state.chats)))
+        for chat_id, name, last_message, last_message_time in state.chats:
+            out.write(_str(chat_id) + _str(name) + _optional_str(last_message) + _time(last_message_time))
+
+        out.write(_COUNT.pack(len(state.read_cursors)))
+        for user_id, cursors in state.read_cursors.items():
+            out.write(_str(user_id) + _COUNT.pack(len(cursors)))
+            out.write(b"".join(_str(chat_id) + _INT.pack(seq) for chat_id, seq in cursors.items()))
+
+        out.write(_COUNT.pack(len(state.histories)))
+        for chat_id, (seq, history) in state.histories.items():
+            hot = list(zip(*history.hot_columns))
+            out.write(_str(chat_id) + _INT.pack(seq) + _COUNT.pack(history.cold_count + len(hot)))
+            if history.cold_path is not None:
+                with open(history.cold_path, "rb") as cold:
+                    remaining = history.cold_size
+                    while remaining:
+                        chunk = cold.read(min(COPY_CHUNK, remaining))
+                        out.write(chunk)
+                        remaining -= len(chunk)
+            for start in range(0, len(hot), HOT_CHUNK):
+                out.write(b"".join(encode_record(*record) for record in hot[start:start + HOT_CHUNK]))
+
+        file.write(_COUNT.pack(out.crc))
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temporary, path)
+    _fsync_directory(os.path.dirname(path))
+    return out.size + _COUNT.size
+
+
+def load_snapshot(path: str, store: MemoryChatStore) -> Tuple[int, int]:
+    # Replaces the store's contents; returns the snapshot's generation and its message count
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            if zlib.crc32(view[:-_COUNT.size]) != _COUNT.unpack_from(view, len(view) - _COUNT.size)[0]:
+                raise ValueError(f"Snapshot {path} is corrupt (checksum mismatch)")
+            magic, version, generation = _PREAMBLE.unpack_from(view, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Snapshot {path} has an unknown format")
+
+            store.clear()
+            reader = _Reader(view, _PREAMBLE.size)
+            for _ in range(reader.read_count()):
+                user_id = reader.read_str()
+                store.users_db[user_id] = reader.read_str()
+
+            for _ in range(reader.read_count()):
+                chat_id, name = reader.read_str(), reader.read_str()
+                store.chats_db[chat_id] = {
+                    "id": chat_id,
+                    "name": name,
+                    "lastMessage": reader.read_optional_str(),
+                    "lastMessageTime": reader.read_time(),
+                    "unreadCount": 0
+                }
+
+            for _ in range(reader.read_count()):
+                cursors = store.read_cursors[reader.read_str()] = {}
+                for _ in range(reader.read_count()):
+                    chat_id = reader.read_str()
+                    cursors[chat_id] = reader.read_int()
+
+            messages = 0
+            for _ in range(reader.read_count()):
+                chat_id, seq, count = reader.read_str(), reader.read_int(), reader.read_count()
+                reader.offset = store.restore_history(chat_id, view, reader.offset, count, seq)
+                messages += count
+            del reader
+    return generation, messages
+
+
+class Journal:
+    # Append-only log of changes since the last snapshot, one file per generation. Records are
+    # buffered on the event loop and written (and fsynced) by a worker thread every flush interval
+
+    def __init__(self, directory: str, fsync: bool):
+        self.directory = directory
+        self.fsync = fsync
+        self.generation = 0
+        self.size = 0  # bytes logged to the current generation
+        self._file = None
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+
+    def path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"journal.{generation:08d}")
+
+    def generations(self) -> List[int]:
+        names = (_JOURNAL_NAME.match(name) for name in os.listdir(self.directory))
+        return sorted(int(match.group(1)) for match in names if match)
+
+    def open(self, generation: int):
+        self.generation = generation
+        self.size = 0
+        self._file = open(self.path(generation), "ab")
+
+    def append(self, payload: bytes):
+        self._buffer += _FRAME.pack(len(payload), zlib.crc32(payload))
+        self._buffer += payload
+        self.size += _FRAME.size + len(payload)
+
+    def _write(self, file, data: bytes):
+        file.write(data)
+        file.flush()
+        if self.fsync:
+            os.fsync(file.fileno())
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            file, data, self._buffer = self._file, bytes(self._buffer), bytearray()
+            await asyncio.to_thread(self._write, file, data)
+
+    def rotate(self, generation: int):
+        # Synchronous, so nothing is logged between the state capture and the switch to the new file
+        previous = (self._file, bytes(self._buffer))
+        self._buffer = bytearray()
+        self.open(generation)
+        return previous
+
+    async def retire(self, previous):
+        file, data = previous
+        async with self._lock:
+            await asyncio.to_thread(self._write, file, data)
+            file.close()
+
+    async def close(self):
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove_before(self, generation: int):
+        for older in self.generations():
+            if older < generation:
+                os.remove(self.path(older))
+
+    def replay(self, generation: int) -> List[Tuple[bytes, memoryview]]:
+        # Complete records of one journal file. A crash can leave a torn record at the end;
+        # the file is cut back to the last good record so later appends stay readable
+        path = self.path(generation)
+        with open(path, "rb") as file:
+            data = file.read()
+
+        records = []
+        offset = 0
+        view = memoryview(data)
+        while offset + _FRAME.size <= len(data):
+            length, crc = _FRAME.unpack_from(data, offset)
+            start, end = offset + _FRAME.size, offset + _FRAME.size + length
+            if end > len(data) or zlib.crc32(view[start:end]) != crc:
+                break
+            records.append((bytes(view[start:start + 1]), view[start + 1:end]))
+            offset = end
+
+        if offset < len(data):
+            logger.warning("Truncating torn journal record", extra={"journal": path, "bytes": len(data) - offset})
+            os.truncate(path, offset)
+        return records
+
+
+class SnapshotStore(ChatStore):
+    # Makes the memory backend survive restarts: a periodic snapshot of its whole state plus a
+    # journal of every change since. Startup loads the snapshot and replays the journal on top.
+
+    def __init__(
+        self,
+        backend: MemoryChatStore,
+        directory: str,
+        interval_ms: float,
+        journal_max_bytes: int,
+        flush_interval_ms: float,
+        fsync: bool
+    ):
+        super().__init__()
+        self.backend = backend
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.journal_max_bytes = journal_max_bytes
+        self.flush_interval = flush_interval_ms / 1000
+        self.journal = Journal(directory, fsync)
+
+        self._snapshot_due = asyncio.Event()
+        self._snapshot_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    def latest_seq(self, chat_id: str) -> int:
+        return self.backend.latest_seq(chat_id)
+
+    def next_seq(self, chat_id: str) -> int:
+        return self.backend.next_seq(chat_id)
+
+    def observe_seq(self, chat_id: str, seq: int):
+        self.backend.observe_seq(chat_id, seq)
+
+    async def open(self):
+        await self.backend.open()
+        os.makedirs(self.directory, exist_ok=True)
+        await self.restore()
+        self._tasks = [asyncio.create_task(self._flush_loop()), asyncio.create_task(self._snapshot_loop())]
+
+    async def restore(self):
+        started = time.perf_counter()
+        generation = messages = 0
+        if os.path.exists(self.snapshot_path):
+            generation, messages = await asyncio.to_thread(load_snapshot, self.snapshot_path, self.backend)
+
+        replayed = 0
+        journals = [older for older in self.journal.generations() if older >= generation]
+        for older in journals:
+            for kind, payload in await asyncio.to_thread(self.journal.replay, older):
+                await self._apply(kind, payload)
+                replayed += 1
+
+        elapsed = time.perf_counter() - started
+        restore_duration.set(elapsed)
+        logger.info(
+            "Restored memory store",
+            extra={
+                "duration_ms": round(elapsed * 1000, 1),
+                "generation": generation,
+                "messages": messages,
+                "journal_records": replayed
+            }
+        )
+
+        # New changes go to a fresh journal generation, after any that were just replayed
+        self.journal.open(max([generation, *journals]) + 1)
+        if not generation:
+            # First start: snapshot the seed data, so the journal always has a base to replay onto
+            await self.snapshot()
+        elif replayed:
+            self._snapshot_due.set()  # fold the replayed journals into a snapshot soon, not at the next interval
+        else:
+            self.journal.remove_before(self.journal.generation)  # all empty
+
+    def _stale(self) -> bool:
+        # Changes not in the snapshot yet: logged in this run, or replayed from older journals at startup
+        return self.journal.size > 0 or self.journal.generations() != [self.journal.generation]
+
+    async def _apply(self, kind: bytes, payload: memoryview):
+        reader = _Reader(payload)
+        if kind == MESSAGE:
+            chat_id = reader.read_str()
+            self.backend.restore_messages(chat_id, reader.read_records(1))
+        elif kind == MESSAGES:
+            chat_id = reader.read_str()
+            self.backend.restore_messages(chat_id, reader.read_records(reader.read_count()))
+        elif kind == CHAT_UPDATE:
+            chat_id, timestamp = reader.read_str(), reader.read_time()
+            await self.backend.update_chat_last_message(chat_id, reader.read_str(), timestamp)
+        elif kind == READ_CURSOR:
+            user_id, chat_id = reader.read_str(), reader.read_str()
+            await self.backend.set_read_cursor(user_id, chat_id, reader.read_int())
+        elif kind == ADD_USER:
+            user_id = reader.read_str()
+            await self.backend.add_user(user_id, reader.read_str())
+
+    async def snapshot(self):
+        async with self._snapshot_lock:
+            started = time.perf_counter()
+            generation = self.journal.generation + 1
+            state = capture(self.backend, generation)
+            previous = self.journal.rotate(generation)
+            snapshot_capture.observe(time.perf_counter() - started)
+
+            await self.journal.retire(previous)
+            started = time.perf_counter()
+            try:
+                size = await asyncio.to_thread(write_snapshot, self.snapshot_path, state)
+            except Exception as e:
+                # The older journals stay until a snapshot covering them is written, so nothing is lost
+                snapshot_failures.inc()
+                logger.error("Snapshot failed", extra={"generation": generation, "error": repr(e)})
+                return
+            elapsed = time.perf_counter() - started
+
+            self.journal.remove_before(generation)
+            snapshot_duration.observe(elapsed)
+            snapshot_size.set(size)
+            journal_size.set(self.journal.size)
+            logger.info(
+                "Snapshot written",
+                extra={"generation": generation, "bytes": size, "duration_ms": round(elapsed * 1000, 1)}
+            )
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # A final snapshot on shutdown, so the next start has no journal to replay
+        if self._stale():
+            await self.snapshot()
+        await self.journal.close()
+        await self.backend.close()
+
+    async def sync(self):
+        await self.journal.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.journal.flush()
+            except Exception as e:
+                logger.error("Journal flush failed", extra={"error": repr(e)})
+            journal_size.set(self.journal.size)
+            if self.journal_max_bytes and self.journal.size >= self.journal_max_bytes:
+                self._snapshot_due.set()
+
+    async def _snapshot_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._snapshot_due.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._snapshot_due.clear()
+            if self._stale():
+                await self.snapshot()
+
+    async def add_user(self, user_id: str, username: str):
+        if await self.backend.get_username(user_id) == username:
+            return
+        await self.backend.add_user(user_id, username)
+        self.journal.append(ADD_USER + _str(user_id) + _str(username))
+
+    async def get_username(self, user_id: str) -> Optional[str]:
+        return await self.backend.get_username(user_id)
+
+    async def list_chats(self) -> List[dict]:
+        return await self.backend.list_chats()
+
+    async def get_chat(self, chat_id: str) -> Optional[dict]:
+        return await self.backend.get_chat(chat_id)
+
+    async def update_chat_last_message(self, chat_id: str, text: str, timestamp: datetime):
+        await self.backend.update_chat_last_message(chat_id, text, timestamp)
+        self.journal.append(CHAT_UPDATE + _str(chat_id) + _time(timestamp) + _str(text))
+
+    async def append_message(self, chat_id: str, message: dict):
+        await self.backend.append_message(chat_id, message)
+        self.journal.append(_message_record(chat_id, message))
+
+    async def append_batch(self, messages: List[Tuple[str, dict]], chat_updates: Dict[str, Tuple[str, datetime]]):
+        await self.backend.append_batch(messages, chat_updates)
+        by_chat: Dict[str, List[dict]] = {}
+        for chat_id, message in messages:
+            by_chat.setdefault(chat_id, []).append(message)
+        for chat_id, chat_messages in by_chat.items():
+            self.journal.append(
+                MESSAGES + _str(chat_id) + _COUNT.pack(len(chat_messages))
+                + b"".join(_encode_message(message) for message in chat_messages)
+            )
+        for chat_id, (text, timestamp) in chat_updates.items():
+            self.journal.append(CHAT_UPDATE + _str(chat_id) + _time(timestamp) + _str(text))
+
+    async def find_message_ids(self, message_ids: List[str]) -> Dict[str, str]:
+        return await self.backend.find_message_ids(message_ids)
+
+    async def get_message(self, chat_id: str, message_id: str) -> Optional[dict]:
+        return await self.backend.get_message(chat_id, message_id)
+
+    async def get_message_page(
+        self,
+        chat_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> MessagePage:
+        return await self.backend.get_message_page(chat_id, limit, before=before, after=after)
+
+    async def iter_history(self, chat_id: str, batch_size: int) -> AsyncIterator[List[dict]]:
+        async for batch in self.backend.iter_history(chat_id, batch_size):
+            yield batch
+
+    async def list_recent_messages(self, limit: int) -> List[Tuple[str, dict]]:
+        return await self.backend.list_recent_messages(limit)
+
+    async def get_read_cursors(self, user_id: str) -> Dict[str, int]:
+        return await self.backend.get_read_cursors(user_id)
+
+    async def set_read_cursor(self, user_id: str, chat_id: str, seq: int):
+        await self.backend.set_read_cursor(user_id, chat_id, seq)
+        self.journal.append(READ_CURSOR + _str(user_id) + _str(chat_id) + _INT.pack(seq))
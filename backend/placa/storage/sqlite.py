@@ -0,0 +1,372 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from .base import ChatStore, MessagePage
+from .seed import seed_chats, seed_messages
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chats (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    last_message TEXT,
+    last_message_time TEXT,
+    unread_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    row_id INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    chat_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    sender_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    seq INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_messages_chat_time ON messages (chat_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS chat_seqs (
+    chat_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS read_cursors (
+    user_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (user_id, chat_id)
+);
+"""
+
+INSERT_MESSAGE = "INSERT INTO messages (id, chat_id, text, sender, sender_id, timestamp, seq) VALUES (?, ?, ?, ?, ?, ?, ?)"
+# One statement under SQLite's write lock, so workers sharing the file never hand out the same seq
+RESERVE_SEQ = (
+    "INSERT INTO chat_seqs (chat_id, seq) VALUES (?, 1) "
+    "ON CONFLICT (chat_id) DO UPDATE SET seq = seq + 1 RETURNING seq"
+)
+
+
+def _to_text(value: Optional[datetime]) -> Optional[str]:
+    # Fixed-width ISO text keeps lexical order equal to time order
+    return value.isoformat(timespec="microseconds") if value else None
+
+
+def _from_text(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _message_params(chat_id: str, message: dict) -> tuple:
+    return (
+        message["id"],
+        chat_id,
+        message["text"],
+        message["sender"],
+        message["senderId"],
+        _to_text(message["timestamp"]),
+        message["seq"]
+    )
+
+
+def _chat_from_row(row) -> dict:
+    return {
+        "id": row[0],
+        "name": row[1],
+        "lastMessage": row[2],
+        "lastMessageTime": _from_text(row[3]),
+        "unreadCount": row[4]
+    }
+
+
+def _message_from_row(row) -> dict:
+    return {
+        "id": row[0],
+        "text": row[1],
+        "sender": row[2],
+        "senderId": row[3],
+        "timestamp": _from_text(row[4]),
+        "isOwnMessage": False,
+        "seq": row[5]
+    }
+
+
+class SqliteChatStore(ChatStore):
+
+    def __init__(self, path: str, shared: bool = False):
+        super().__init__()
+        self.path = path
+        # Shared with other worker processes: seqs then come from the database, at one small write each;
+        # otherwise they are handed out in memory so appends (and write-behind) never wait on a query
+        self.shared = shared
+        # One thread owns the connection; every query runs there, never on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="placa-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self):
+        await self._run(self._open)
+
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if "seq" not in columns:
+            with conn:
+                conn.execute("ALTER TABLE messages ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+                conn.execute(
+                    "UPDATE messages SET seq = (SELECT COUNT(*) FROM messages AS earlier "
+                    "WHERE earlier.chat_id = messages.chat_id AND earlier.row_id <= messages.row_id)"
+                )
+
+        if conn.execute("SELECT COUNT(*) FROM chats").fetchone()[0] == 0:
+            self._seed(conn)
+
+        # chat_seqs is the authority for seqs; it is caught up with databases written before it existed
+        with conn:
+            conn.execute(
+                "INSERT INTO chat_seqs (chat_id, seq) SELECT chat_id, MAX(seq) FROM messages WHERE true GROUP BY chat_id "
+                "ON CONFLICT (chat_id) DO UPDATE SET seq = MAX(seq, excluded.seq)"
+            )
+        self.chat_seq = dict(conn.execute("SELECT chat_id, seq FROM chat_seqs"))
+        self._conn = conn
+
+    def _close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def _seed(self, conn: sqlite3.Connection):
+        with conn:
+            conn.executemany(
+                "INSERT INTO chats (id, name, last_message, last_message_time, unread_count) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (chat["id"], chat["name"], chat["lastMessage"], _to_text(chat["lastMessageTime"]), chat["unreadCount"])
+                    for chat in seed_chats().values()
+                ]
+            )
+            conn.executemany(
+                INSERT_MESSAGE,
+                [
+                    _message_params(chat_id, {**message, "seq": seq})
+                    for chat_id, messages in seed_messages().items()
+                    for seq, message in enumerate(messages, start=1)
+                ]
+            )
+
+    async def add_user(self, user_id: str, username: str):
+        await self._run(self._execute, "INSERT OR REPLACE INTO users (id, username) VALUES (?, ?)", (user_id, username))
+
+    async def get_username(self, user_id: str) -> Optional[str]:
+        row = await self._run(self._fetchone, "SELECT username FROM users WHERE id = ?", (user_id,))
+        return row[0] if row else None
+
+    async def list_chats(self) -> List[dict]:
+        rows = await self._run(
+            self._fetchall,
+            "SELECT id, name, last_message, last_message_time, unread_count FROM chats",
+            ()
+        )
+        return [_chat_from_row(row) for row in rows]
+
+    async def get_chat(self, chat_id: str) -> Optional[dict]:
+        row = await self._run(
+            self._fetchone,
+            "SELECT id, name, last_message, last_message_time, unread_count FROM chats WHERE id = ?",
+            (chat_id,)
+        )
+        return _chat_from_row(row) if row else None
+
+    async def update_chat_last_message(self, chat_id: str, text: str, timestamp: datetime):
+        await self._run(
+            self._execute,
+            "UPDATE chats SET last_message = ?, last_message_time = ? WHERE id = ?",
+            (text, _to_text(timestamp), chat_id)
+        )
+
+    async def append_message(self, chat_id: str, message: dict):
+        await self.append_batch([(chat_id, message)], {})
+
+    async def reserve_seq(self, chat_id: str) -> int:
+        if not self.shared:
+            return self.next_seq(chat_id)
+        seq = await self._run(self._reserve_seq, chat_id)
+        self.observe_seq(chat_id, seq)
+        return seq
+
+    def _reserve_seq(self, chat_id: str) -> int:
+        with self._conn:
+            return self._conn.execute(RESERVE_SEQ, (chat_id,)).fetchall()[0][0]
+
+    async def list_recent_messages(self, limit: int) -> List[Tuple[str, dict]]:
+        # Time order, as history pages use; imported history is inserted after newer messages.
+        # Only read at startup, so a top-N sort over the table is cheaper than another index on every write
+        rows = await self._run(
+            self._fetchall,
+            "SELECT chat_id, id, text, sender, sender_id, timestamp, seq FROM messages "
+            "ORDER BY timestamp DESC, row_id DESC LIMIT ?",
+            (limit,)
+        )
+        rows.reverse()
+        return [(row[0], _message_from_row(row[1:])) for row in rows]
+
+    async def iter_history(self, chat_id: str, batch_size: int) -> AsyncIterator[List[dict]]:
+        # Keyset pagination in page order, so each batch is one indexed range scan
+        anchor = ("", 0)
+        while True:
+            rows = await self._run(
+                self._fetchall,
+                "SELECT id, text, sender, sender_id, timestamp, seq, row_id FROM messages "
+                "WHERE chat_id = ? AND (timestamp, row_id) > (?, ?) ORDER BY timestamp, row_id LIMIT ?",
+                (chat_id, anchor[0], anchor[1], batch_size)
+            )
+            if not rows:
+                return
+            yield [_message_from_row(row[:6]) for row in rows]
+            anchor = (rows[-1][4], rows[-1][6])
+
+    async def get_read_cursors(self, user_id: str) -> Dict[str, int]:
+        rows = await self._run(self._fetchall, "SELECT chat_id, seq FROM read_cursors WHERE user_id = ?", (user_id,))
+        return dict(rows)
+
+    async def set_read_cursor(self, user_id: str, chat_id: str, seq: int):
+        await self._run(
+            self._execute,
+            "INSERT OR REPLACE INTO read_cursors (user_id, chat_id, seq) VALUES (?, ?, ?)",
+            (user_id, chat_id, seq)
+        )
+
+    async def write_batch(
+        self,
+        messages: List[Tuple[str, dict]],
+        chat_updates: Dict[str, Tuple[str, datetime]],
+        read_cursors: Optional[Dict[Tuple[str, str], int]] = None
+    ):
+        await self._run(self._write_batch, messages, chat_updates, read_cursors or {})
+
+    async def append_batch(self, messages: List[Tuple[str, dict]], chat_updates: Dict[str, Tuple[str, datetime]]):
+        if not self.shared:
+            for chat_id, message in messages:
+                message["seq"] = self.next_seq(chat_id)
+            await self.write_batch(messages, chat_updates)
+            return
+
+        # Seqs are taken in the same transaction that inserts the messages
+        await self._run(self._write_batch, messages, chat_updates, {}, True)
+        for chat_id, message in messages:
+            self.observe_seq(chat_id, message["seq"])
+
+    async def find_message_ids(self, message_ids: List[str]) -> Dict[str, str]:
+        return await self._run(self._find_message_ids, message_ids)
+
+    def _find_message_ids(self, message_ids: List[str]) -> Dict[str, str]:
+        found = {}
+        for start in range(0, len(message_ids), 500):  # under SQLite's limit on bound parameters
+            chunk = message_ids[start:start + 500]
+            found.update(self._conn.execute(
+                f"SELECT id, chat_id FROM messages WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return found
+
+    async def get_message(self, chat_id: str, message_id: str) -> Optional[dict]:
+        row = await self._run(
+            self._fetchone,
+            "SELECT id, text, sender, sender_id, timestamp, seq FROM messages WHERE id = ? AND chat_id = ?",
+            (message_id, chat_id)
+        )
+        return _message_from_row(row) if row else None
+
+    async def get_message_page(
+        self,
+        chat_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> MessagePage:
+        return await self._run(self._message_page, chat_id, limit, before, after)
+
+    def _execute(self, sql: str, params: tuple):
+        with self._conn:
+            self._conn.execute(sql, params)
+
+    def _write_batch(
+        self,
+        messages: List[Tuple[str, dict]],
+        chat_updates: Dict[str, Tuple[str, datetime]],
+        read_cursors: Dict[Tuple[str, str], int],
+        assign_seqs: bool = False
+    ):
+        # One transaction (and one fsync) per batch: a group commit
+        with self._conn:
+            if assign_seqs:
+                for chat_id, message in messages:
+                    message["seq"] = self._conn.execute(RESERVE_SEQ, (chat_id,)).fetchall()[0][0]
+            self._conn.executemany(INSERT_MESSAGE, [_message_params(chat_id, message) for chat_id, message in messages])
+            self._conn.executemany(
+                "UPDATE chats SET last_message = ?, last_message_time = ? WHERE id = ?",
+                [(text, _to_text(timestamp), chat_id) for chat_id, (text, timestamp) in chat_updates.items()]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO read_cursors (user_id, chat_id, seq) VALUES (?, ?, ?)",
+                [(user_id, chat_id, seq) for (user_id, chat_id), seq in read_cursors.items()]
+            )
+
+    def _fetchone(self, sql: str, params: tuple):
+        return self._conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: tuple):
+        return self._conn.execute(sql, params).fetchall()
+
+    def _message_page(self, chat_id: str, limit: int, before: Optional[str], after: Optional[str]) -> MessagePage:
+        columns = "SELECT id, text, sender, sender_id, timestamp, seq FROM messages"
+
+        cursor = before or after
+        if cursor is not None:
+            anchor = self._fetchone("SELECT timestamp, row_id FROM messages WHERE id = ? AND chat_id = ?", (cursor, chat_id))
+            if anchor is None:
+                raise KeyError(cursor)
+
+        # Fetch one extra row to learn whether another page exists in the scan direction
+        if after is not None:
+            rows = self._fetchall(
+                f"{columns} WHERE chat_id = ? AND (timestamp, row_id) > (?, ?) "
+                "ORDER BY timestamp, row_id LIMIT ?",
+                (chat_id, anchor[0], anchor[1], limit + 1)
+            )
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            # The anchor itself is older than the page, even when the page is empty
+            return MessagePage([_message_from_row(row) for row in rows], True, has_more)
+
+        if before is not None:
+            rows = self._fetchall(
+                f"{columns} WHERE chat_id = ? AND (timestamp, row_id) < (?, ?) "
+                "ORDER BY timestamp DESC, row_id DESC LIMIT ?",
+                (chat_id, anchor[0], anchor[1], limit + 1)
+            )
+        else:
+            rows = self._fetchall(
+                f"{columns} WHERE chat_id = ? ORDER BY timestamp DESC, row_id DESC LIMIT ?",
+                (chat_id, limit + 1)
+            )
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
+        # Likewise the anchor of a "before" page is newer than it
+        return MessagePage([_message_from_row(row) for row in rows], has_more, before is not None)
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from .base import ChatStore, MessagePage
+from ..config.metrics import SIZE_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+
+flush_duration = registry.histogram("placa_write_behind_flush_seconds", "Duration of one group commit")
+flush_messages = registry.histogram(
+    "placa_write_behind_flush_messages",
+    "Messages written per group commit",
+    buckets=SIZE_BUCKETS
+)
+flush_failures = registry.counter("placa_write_behind_flush_failures_total", "Group commits that failed")
+dropped_batches = registry.counter(
+    "placa_write_behind_dropped_batches_total",
+    "Batches dropped after every retry of their group commit failed"
+)
+
+
+class WriteBehindStore(ChatStore):
+
+    def __init__(
+        self,
+        backend: ChatStore,
+        batch_size: int,
+        interval_ms: float,
+        max_retries: int = 5,
+        retry_backoff_ms: float = 100.0
+    ):
+        super().__init__()
+        self.backend = backend
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+
+        self._messages: List[Tuple[str, dict]] = []
+        self._chat_updates: Dict[str, Tuple[str, datetime]] = {}
+        self._read_cursors: Dict[Tuple[str, str], int] = {}  # (userId, chatId) -> seq; only the newest survives
+        self._pending_chats: set = set()  # chats with messages not yet handed to the backend
+        self._committed: Optional[asyncio.Future] = None  # resolves when the current batch is durable
+        self._inflight_chats: set = set()
+        self._inflight_updates: Dict[str, Tuple[str, datetime]] = {}
+        self._inflight_cursors: Dict[Tuple[str, str], int] = {}
+        self._failed: Optional[tuple] = None  # (messages, chat updates, read cursors, committed) of a batch to retry
+        self._attempts = 0
+        self._retry_at = 0.0
+
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def latest_seq(self, chat_id: str) -> int:
+        return self.backend.latest_seq(chat_id)
+
+    def next_seq(self, chat_id: str) -> int:
+        return self.backend.next_seq(chat_id)
+
+    async def reserve_seq(self, chat_id: str) -> int:
+        return await self.backend.reserve_seq(chat_id)
+
+    def observe_seq(self, chat_id: str, seq: int):
+        self.backend.observe_seq(chat_id, seq)
+
+    async def open(self):
+        await self.backend.open()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flusher:
+            self._closing = True
+            self._batch_full.set()
+            await self._flusher
+            self._flusher = None
+
+        # Shutdown hook: drain whatever is still buffered before the backend goes away
+        while self._failed is not None or self._committed is not None:
+            await self.flush()
+        await self.backend.close()
+
+    async def sync(self):
+        # Writes issued before a batch that is being retried fail with it if it is dropped
+        pending = [self._failed[3]] if self._failed is not None else []
+        if self._committed is not None:
+            pending.append(self._committed)
+        for committed in pending:
+            await asyncio.shield(committed)
+
+    async def add_user(self, user_id: str, username: str):
+        await self.backend.add_user(user_id, username)
+
+    async def get_username(self, user_id: str) -> Optional[str]:
+        return await self.backend.get_username(user_id)
+
+    async def list_recent_messages(self, limit: int) -> List[Tuple[str, dict]]:
+        await self.flush()
+        return await self.backend.list_recent_messages(limit)
+
+    async def iter_history(self, chat_id: str, batch_size: int) -> AsyncIterator[List[dict]]:
+        if chat_id in self._pending_chats or chat_id in self._inflight_chats:
+            await self.flush()
+        async for batch in self.backend.iter_history(chat_id, batch_size):
+            yield batch
+
+    async def get_read_cursors(self, user_id: str) -> Dict[str, int]:
+        cursors = await self.backend.get_read_cursors(user_id)
+        for (cursor_user, chat_id), seq in {**self._inflight_cursors, **self._read_cursors}.items():
+            if cursor_user == user_id:
+                cursors[chat_id] = seq
+        return cursors
+
+    async def set_read_cursor(self, user_id: str, chat_id: str, seq: int):
+        self._read_cursors[(user_id, chat_id)] = seq
+        self._pending_batch()
+
+    def _overlay(self, chat: Optional[dict]) -> Optional[dict]:
+        if chat is None:
+            return None
+
+        update = self._chat_updates.get(chat["id"]) or self._inflight_updates.get(chat["id"])
+        if update:
+            chat["lastMessage"], chat["lastMessageTime"] = update
+        return chat
+
+    async def list_chats(self) -> List[dict]:
+        return [self._overlay(chat) for chat in await self.backend.list_chats()]
+
+    async def get_chat(self, chat_id: str) -> Optional[dict]:
+        return self._overlay(await self.backend.get_chat(chat_id))
+
+    async def update_chat_last_message(self, chat_id: str, text: str, timestamp: datetime):
+        self._chat_updates[chat_id] = (text, timestamp)
+        self._pending_batch()
+
+    async def append_message(self, chat_id: str, message: dict):
+        # A shared backend reserves the seq in the database right away (a small write, not a group
+        # commit), so every worker numbers the chat's messages from one counter
+        message["seq"] = await self.reserve_seq(chat_id)
+        self._messages.append((chat_id, message))
+        self._pending_chats.add(chat_id)
+        self._pending_batch()
+
+        if len(self._messages) >= self.batch_size:
+            self._batch_full.set()
+
+    async def find_message_ids(self, message_ids: List[str]) -> Dict[str, str]:
+        await self.flush()
+        return await self.backend.find_message_ids(message_ids)
+
+    async def get_message(self, chat_id: str, message_id: str) -> Optional[dict]:
+        if chat_id in self._pending_chats or chat_id in self._inflight_chats:
+            await self.flush()
+        return await self.backend.get_message(chat_id, message_id)
+
+    async def get_message_page(
+        self,
+        chat_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> MessagePage:
+        # History reads must see buffered messages, so push this chat's backlog out first
+        if chat_id in self._pending_chats or chat_id in self._inflight_chats:
+            await self.flush()
+        return await self.backend.get_message_page(chat_id, limit, before=before, after=after)
+
+    def _pending_batch(self):
+        if self._committed is None:
+            self._committed = asyncio.get_running_loop().create_future()
+            # A dropped batch fails its future; keep unobserved futures from logging noise
+            self._committed.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+    async def flush(self):
+        async with self._flush_lock:
+            if self._failed is not None:
+                # Retry the failed batch on its own and ahead of anything buffered since, so later
+                # lastMessage updates and read cursors still win
+                messages, chat_updates, read_cursors, committed = self._failed
+                delay = self._retry_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self._committed is None:
+                return
+            else:
+                messages, self._messages = self._messages, []
+                chat_updates, self._chat_updates = self._chat_updates, {}
+                read_cursors, self._read_cursors = self._read_cursors, {}
+                pending_chats, self._pending_chats = self._pending_chats, set()
+                committed, self._committed = self._committed, None
+                self._inflight_chats, self._inflight_updates = pending_chats, chat_updates
+                self._inflight_cursors = read_cursors
+                self._batch_full.clear()
+                self._attempts = 0
+
+            started = time.perf_counter()
+            try:
+                await self.backend.write_batch(messages, chat_updates, read_cursors)
+            except Exception as e:
+                flush_failures.inc()
+                self._attempts += 1
+                if self._attempts <= self.max_retries:
+                    delay = self.retry_backoff * 2 ** (self._attempts - 1)
+                    logger.warning(
+                        "Write-behind flush failed, will retry",
+                        extra={
+                            "messages": len(messages),
+                            "attempt": self._attempts,
+                            "retry_in_ms": round(delay * 1000),
+                            "error": repr(e)
+                        }
+                    )
+                    self._failed = (messages, chat_updates, read_cursors, committed)
+                    self._retry_at = time.monotonic() + delay
+                    return
+
+                dropped_batches.inc()
+                logger.error(
+                    "Write-behind batch dropped after failed retries",
+                    extra={
+                        "messages": len(messages),
+                        "chats": sorted({chat_id for chat_id, _ in messages}),
+                        "read_cursors": len(read_cursors),
+                        "attempts": self._attempts,
+                        "error": repr(e)
+                    }
+                )
+                self._end_batch()
+                committed.set_exception(e)
+                return
+            except BaseException:
+                self._end_batch()
+                raise
+
+            self._end_batch()
+            flush_duration.observe(time.perf_counter() - started)
+            flush_messages.observe(len(messages))
+            committed.set_result(len(messages))
+
+    def _end_batch(self):
+        self._failed = None
+        self._inflight_chats, self._inflight_updates, self._inflight_cursors = set(), {}, {}
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
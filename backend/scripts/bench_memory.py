@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Bytes per message held by the in-memory store, before and after the compact history.
+
+Before: one dict per message (with a datetime) plus each chat's sorted id list.
+After: placa.storage.history.ChatHistory columns, all in memory and with a hot limit that
+moves older messages to segment files. Sender ids arrive as fresh strings for every message,
+as they do when parsed from a request, so interning shows up in the numbers. Message text is
+included in every figure.
+
+    cd backend && python scripts/bench_memory.py --messages 200000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from placa.storage.history import ChatHistory  # noqa: E402
+from placa.storage.ids import message_ids  # noqa: E402
+
+WORDS = ["vidimo", "se", "na", "placi", "kava", "u", "osan", "donesi", "kruh", "sutra", "lipo", "more", "bura"]
+
+
+def make_messages(count: int, chats: int, users: int, seed: int):
+    rng = random.Random(seed)
+    started = datetime(2026, 1, 1)
+    for number in range(count):
+        user = rng.randrange(users)
+        yield f"chat_{number % chats}", {
+            "id": message_ids.new_id(),
+            "text": " ".join(rng.choices(WORDS, k=rng.randint(3, 12))),
+            "sender": f"user {user}",
+            "senderId": f"user_{user}",
+            "timestamp": started + timedelta(milliseconds=number * 37),
+            "isOwnMessage": False,
+            "seq": number // chats + 1
+        }
+
+
+def build_dicts(messages):
+    store, ids = {}, {}
+    for chat_id, message in messages:
+        store.setdefault(chat_id, []).append(message)
+        ids.setdefault(chat_id, []).append(message["id"])
+    return store, ids
+
+
+def build_histories(messages, hot_limit: int, spill_dir: str):
+    histories = {}
+    for chat_id, message in messages:
+        history = histories.get(chat_id)
+        if history is None:
+            path = os.path.join(spill_dir, f"chat-{len(histories)}.seg") if hot_limit else None
+            history = histories[chat_id] = ChatHistory(hot_limit, path)
+        history.append(message)
+    return histories
+
+
+def measure(label: str, build, count: int):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - started
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:<34}{size / count:>10.1f}{size / 2 ** 20:>10.1f}{seconds:>9.2f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--hot-limit", type=int, default=1000, help="per-chat in-memory messages for the spilling run")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    messages = list(make_messages(args.messages, args.chats, args.users, args.seed))
+    text_bytes = sum(len(message["text"]) for _, message in messages) / len(messages)
+    print(f"{args.messages} messages in {args.chats} chats, average text {text_bytes:.0f} characters")
+    print(f"{'representation':<34}{'B/msg':>10}{'MiB':>10}{'build s':>9}")
+
+    def fresh():
+        # New objects for every field on each run, as parsing a request would create them,
+        # so no representation is credited with strings another one already holds
+        return (
+            (chat_id, {
+                **message,
+                "id": message["id"].encode().decode(),
+                "text": message["text"].encode().decode(),
+                "sender": message["sender"].encode().decode(),
+                "senderId": message["senderId"].encode().decode(),
+                "timestamp": message["timestamp"] + timedelta(0)
+            })
+            for chat_id, message in messages
+        )
+
+    measure("dict per message (before)", lambda: build_dicts(fresh()), args.messages)
+    measure("columns, all in memory", lambda: build_histories(fresh(), 0, ""), args.messages)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        histories = measure(
+            f"columns, {args.hot_limit} hot per chat", lambda: build_histories(fresh(), args.hot_limit, spill_dir),
+            args.messages
+        )
+        on_disk = sum(os.path.getsize(os.path.join(spill_dir, name)) for name in os.listdir(spill_dir))
+        print(f"segment files: {on_disk / 2 ** 20:.1f} MiB on disk")
+
+        history = histories["chat_0"]
+        started = time.perf_counter()
+        for index in range(0, history.cold_count, 50):
+            history.slice(index, min(index + 50, history.cold_count))
+        print(f"paging chat_0's cold history 50 at a time: {(time.perf_counter() - started) * 1000:.1f} ms "
+              f"for {history.cold_count} messages")
+        for history in histories.values():
+            history.close()
+
+
+if __name__ == "__main__":
+    main()
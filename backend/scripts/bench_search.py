@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Build the message search index over a synthetic history and time queries against it.
+
+Messages are drawn from a Zipf-like vocabulary so common words have long posting lists,
+like real chat text. Reports build time, index size and per-query latency percentiles.
+
+    cd backend && python scripts/bench_search.py --messages 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from placa.storage.search_index import SearchIndex  # noqa: E402
+
+SYLLABLES = ["ka", "va", "pla", "ci", "mo", "ne", "sto", "ri", "ju", "tra", "di", "po", "se", "lu", "gra", "do"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def percentile(samples: list, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--segment-size", type=int, default=65536)
+    parser.add_argument("--max-bytes", type=int, default=0, help="estimated index size cap; 0 is unlimited")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    rng.shuffle(vocabulary)
+
+    index = SearchIndex(None, args.messages, args.segment_size, args.max_bytes)
+    started = time.perf_counter()
+    for doc in range(args.messages):
+        text = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(3, 15)))
+        index.add(f"chat_{doc % args.chats}", f"msg_{doc}", text)
+    build = time.perf_counter() - started
+    print(f"built {args.messages} messages in {build:.1f}s ({args.messages / build:.0f} msg/s)")
+    print(f"stats: {index.stats()}")
+
+    # Mid-frequency words are the realistic case; the head of the distribution is also measured
+    rare = vocabulary[len(vocabulary) // 10:]
+    common = vocabulary[:100]
+    cases = {
+        "single word": lambda: rng.choice(rare),
+        "common word": lambda: rng.choice(common),
+        "two words": lambda: f"{rng.choice(rare)} {rng.choice(rare)}",
+        "prefix": lambda: rng.choice(rare)[:3],
+        "in one chat": lambda: rng.choice(common),
+    }
+
+    print(f"{'query':<16}{'p50 ms':>10}{'p99 ms':>10}{'avg hits':>12}")
+    for name, make_query in cases.items():
+        samples, hits = [], 0
+        for _ in range(args.queries):
+            query = make_query()
+            chat_id = f"chat_{rng.randrange(args.chats)}" if name == "in one chat" else None
+            started = time.perf_counter()
+            total, _ = index.search(query, chat_id=chat_id)
+            samples.append((time.perf_counter() - started) * 1000)
+            hits += total
+        samples.sort()
+        print(f"{name:<16}{percentile(samples, 0.5):>10.2f}{percentile(samples, 0.99):>10.2f}{hits / args.queries:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
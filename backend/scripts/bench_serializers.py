@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Compare the old and new encode paths for each outbound event type.
+
+Old path: model_dump(mode='json') into a dict, then json.dumps as Starlette's send_json does.
+New path: the cached TypeAdapter in placa.model.serializers, straight to JSON text.
+
+    cd backend && python scripts/bench_serializers.py --number 20000
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from placa.model import (  # noqa: E402
+    ChatUpdate,
+    ConnectionAcknowledgment,
+    ErrorMessage,
+    Message,
+    MessageAck,
+    NewMessageNotification,
+    ResyncRequired,
+    TypingUsersNotification,
+    to_json
+)
+
+
+def sample_events() -> dict:
+    now = datetime.now()
+    message = {
+        "id": "msg_1a2b3c4d",
+        "text": "Vidimo se na placi u osan, donesi kavu",
+        "sender": "ana",
+        "senderId": "user_1a2b3c4d",
+        "timestamp": now,
+        "isOwnMessage": False,
+        "seq": 42
+    }
+    return {
+        "new_message": NewMessageNotification(
+            chatId="chat_1",
+            message=message,
+            chatUpdate=ChatUpdate(lastMessage=message["text"], lastMessageTime=now)
+        ),
+        "typing_users": TypingUsersNotification(
+            chatId="chat_1",
+            users=[{"userId": f"user_{i}", "username": f"user {i}"} for i in range(3)]
+        ),
+        "message_ack": MessageAck(clientMsgId="c1", chatId="chat_1", success=True, message=Message(**message)),
+        "resync_required": ResyncRequired(chatId="chat_1", latestSeq=530),
+        "connected": ConnectionAcknowledgment(userId="user_1a2b3c4d"),
+        "error": ErrorMessage(error="Invalid JSON", details="Could not parse message as JSON"),
+        "subscription_confirmed": {
+            "type": "subscription_confirmed",
+            "action": "subscribe",
+            "chatId": "chat_1",
+            "message": "Subscribed to chat chat_1"
+        }
+    }
+
+
+def old_path(event) -> str:
+    data = event if isinstance(event, dict) else event.model_dump(mode="json")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'event':<24}{'old us':>10}{'new us':>10}{'speedup':>10}")
+    for name, event in sample_events().items():
+        assert json.loads(old_path(event)) == json.loads(to_json(event)), name
+
+        old = min(timeit.repeat(lambda: old_path(event), number=args.number, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: to_json(event), number=args.number, repeat=args.repeat))
+        old_us = old / args.number * 1e6
+        new_us = new / args.number * 1e6
+        print(f"{name:<24}{old_us:>10.2f}{new_us:>10.2f}{old_us / new_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
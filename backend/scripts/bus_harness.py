@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Start several Placa workers sharing a Unix socket bus and check cross-worker delivery.
+
+Each worker runs in its own uvicorn process on its own port. One WebSocket client
+subscribes to the same chat on every worker, then a message is posted through each
+worker in turn and every other worker's client must receive it.
+
+    cd backend && python scripts/bus_harness.py --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import urllib.request
+
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAT_ID = "chat_1"
+
+
+def start_worker(port: int, socket_path: str) -> subprocess.Popen:
+    env = dict(os.environ, PLACA_BUS_BACKEND="unix", PLACA_BUS_SOCKET_PATH=socket_path)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "placa.main:placa", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL
+    )
+
+
+def post_message(port: int, text: str):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/chats/{CHAT_ID}/messages",
+        data=json.dumps({"text": text, "senderId": f"harness_{port}"}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        response.read()
+
+
+async def connect_client(port: int, attempts: int = 50):
+    for _ in range(attempts):
+        try:
+            ws = await websockets.connect(f"ws://127.0.0.1:{port}/api/ws?userId=listener_{port}")
+            break
+        except OSError:
+            await asyncio.sleep(0.2)
+    else:
+        raise RuntimeError(f"Worker on port {port} did not come up")
+
+    await ws.recv()  # connected
+    await ws.send(json.dumps({"action": "subscribe", "chatId": CHAT_ID}))
+    await ws.recv()  # subscription_confirmed
+    return ws
+
+
+async def wait_for_text(ws, text: str, timeout: float) -> bool:
+    try:
+        async with asyncio.timeout(timeout):
+            while True:
+                event = json.loads(await ws.recv())
+                if event.get("type") == "new_message" and event["message"]["text"] == text:
+                    return True
+    except TimeoutError:
+        return False
+
+
+async def run(workers: int, base_port: int, timeout: float) -> int:
+    ports = [base_port + index for index in range(workers)]
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "bus.sock")
+        processes = [start_worker(port, socket_path) for port in ports]
+        try:
+            clients = [await connect_client(port) for port in ports]
+
+            for sender_port in ports:
+                text = f"hello from worker {sender_port}"
+                await asyncio.to_thread(post_message, sender_port, text)
+
+                received = await asyncio.gather(*(wait_for_text(ws, text, timeout) for ws in clients))
+                for port, ok in zip(ports, received):
+                    print(f"{sender_port} -> {port}: {'ok' if ok else 'MISSING'}")
+                    failures += not ok
+
+            for ws in clients:
+                await ws.close()
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+    print(f"{workers} workers, {workers * workers - failures}/{workers * workers} deliveries")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--timeout", type=float, default=3.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.workers, args.base_port, args.timeout)))
+
+
+if __name__ == "__main__":
+    main()
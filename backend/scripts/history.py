@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Import NDJSON chat history into a running Placa server, or export a chat's history from it.
+
+Both directions stream: the import file is sent as a chunked request body and the export is
+written to disk as it arrives, so neither side holds the whole history. Going through the
+server keeps the chat list, search index and connected clients in step with the import.
+
+    cd backend && python scripts/history.py export chat_1 -o chat_1.ndjson
+    cd backend && python scripts/history.py import chat_1.ndjson --chat chat_4 --notify none
+"""
+import argparse
+import http.client
+import json
+import sys
+from urllib.parse import urlencode, urlsplit
+
+CHUNK_SIZE = 64 * 1024
+
+
+def connect(url: str) -> http.client.HTTPConnection:
+    parts = urlsplit(url)
+    if parts.scheme == "https":
+        return http.client.HTTPSConnection(parts.netloc)
+    return http.client.HTTPConnection(parts.netloc)
+
+
+def read_chunks(path: str):
+    with (sys.stdin.buffer if path == "-" else open(path, "rb")) as source:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def import_history(args) -> int:
+    query = {"notify": args.notify}
+    if args.chat:
+        query["chatId"] = args.chat
+
+    conn = connect(args.url)
+    conn.request(
+        "POST",
+        f"/api/import?{urlencode(query)}",
+        body=read_chunks(args.file),
+        headers={"Content-Type": "application/x-ndjson"},
+        encode_chunked=True
+    )
+    response = conn.getresponse()
+    result = json.loads(response.read())
+    if response.status != 200:
+        print(f"Import failed ({response.status}): {result.get('detail', result)}", file=sys.stderr)
+        return 1
+
+    print(f"imported {result['imported']}, rejected {result['rejected']}, duplicates {result['duplicates']}")
+    for chat_id, count in result["chats"].items():
+        print(f"  {chat_id}: {count}")
+    for error in result["errors"]:
+        print(f"  line {error['line']}: {error['error']}", file=sys.stderr)
+    return 0 if result["success"] else 2
+
+
+def export_history(args) -> int:
+    conn = connect(args.url)
+    conn.request("GET", f"/api/chats/{args.chat_id}/export")
+    response = conn.getresponse()
+    if response.status != 200:
+        print(f"Export failed ({response.status}): {response.read().decode()}", file=sys.stderr)
+        return 1
+
+    lines = 0
+    with (sys.stdout.buffer if args.output == "-" else open(args.output, "wb")) as target:
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            target.write(chunk)
+            lines += chunk.count(b"\n")
+    print(f"exported {lines} messages", file=sys.stderr)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="stream an NDJSON file into the server")
+    importer.add_argument("file", help="NDJSON file, or - for stdin")
+    importer.add_argument("--chat", help="put every message in this chat, whatever the lines say")
+    importer.add_argument("--notify", choices=("none", "summary", "each"), default="summary")
+    importer.set_defaults(run=import_history)
+
+    exporter = commands.add_parser("export", help="stream one chat's history to an NDJSON file")
+    exporter.add_argument("chat_id")
+    exporter.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    exporter.set_defaults(run=export_history)
+
+    args = parser.parse_args()
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
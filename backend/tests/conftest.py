@@ -0,0 +1,18 @@
+import asyncio
+import pytest
+from placa.storage import MemoryChatStore, SqliteChatStore
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        chat_store = MemoryChatStore()
+    else:
+        chat_store = SqliteChatStore(str(tmp_path / "placa.db"))
+    run(chat_store.open())
+    yield chat_store
+    run(chat_store.close())
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from placa.config.real_time.codec import CODECS, JSON_CODEC, select_codec
+from placa.config.real_time.outbound import OutboundFrame, OutboundQueue, OverflowPolicy
+from placa.main import placa
+from .conftest import run
+
+msgpack = pytest.importorskip("msgpack")
+MSGPACK_CODEC = CODECS["msgpack"]
+
+
+class RecordingSocket:
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data: str):
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+
+
+def frame(seq: int) -> OutboundFrame:
+    return OutboundFrame(type="new_message", chat_id="chat_1", data=json.dumps({"type": "new_message", "seq": seq}))
+
+
+def test_frames_are_encoded_once_per_codec():
+    event = frame(1)
+    packed = MSGPACK_CODEC.encode(event)
+    assert msgpack.unpackb(packed) == {"type": "new_message", "seq": 1}
+    assert MSGPACK_CODEC.encode(event) is packed
+    assert JSON_CODEC.encode(event) is event.data
+    assert set(event.encoded) == {"json", "msgpack"}
+
+
+@pytest.mark.parametrize("count", [1, 15, 16, 65535, 65536])
+def test_msgpack_join_is_an_array_of_the_packed_frames(count):
+    payloads = [msgpack.packb({"seq": seq}) for seq in range(count)]
+    assert msgpack.unpackb(MSGPACK_CODEC.join(payloads)) == [{"seq": seq} for seq in range(count)]
+
+
+def test_codec_selection():
+    assert select_codec(None, []) is JSON_CODEC
+    assert select_codec(None, ["unknown", "msgpack"]) is MSGPACK_CODEC
+    assert select_codec("json", ["msgpack"]) is JSON_CODEC  # ?codec= wins over the subprotocols
+    assert select_codec("xml", []) is None
+
+
+@pytest.mark.parametrize("codec", [JSON_CODEC, MSGPACK_CODEC], ids=lambda codec: codec.name)
+def test_a_burst_goes_out_as_one_batch(codec):
+    socket = RecordingSocket()
+
+    async def scenario():
+        queue = OutboundQueue(socket, "user_ann", lambda _: None, 16, OverflowPolicy.DROP_TYPING, 5.0, 1013, codec, 0.02)
+        queue.start()
+        for seq in range(3):
+            queue.put(frame(seq))
+        await asyncio.sleep(0.1)
+        queue.put(frame(3))  # alone in its window: sent as a bare frame
+        await asyncio.sleep(0.1)
+        queue.stop()
+
+    run(scenario())
+    decode = msgpack.unpackb if codec is MSGPACK_CODEC else json.loads
+    assert [decode(payload) for payload in socket.sent] == [
+        [{"type": "new_message", "seq": seq} for seq in range(3)],
+        {"type": "new_message", "seq": 3}
+    ]
+
+
+def test_msgpack_socket_round_trip():
+    with TestClient(placa) as client:
+        user_id = client.post("/api/login", json={"username": "ann"}).json()["userId"]
+        with client.websocket_connect(f"/api/ws?userId={user_id}&codec=msgpack") as websocket:
+            assert msgpack.unpackb(websocket.receive_bytes())["type"] == "connected"
+            websocket.send_bytes(msgpack.packb({"action": "subscribe", "chatId": "chat_1"}))
+            assert msgpack.unpackb(websocket.receive_bytes())["chatId"] == "chat_1"
+            websocket.send_bytes(msgpack.packb({"type": "send_message", "chatId": "chat_1", "text": "packed"}))
+            ack = msgpack.unpackb(websocket.receive_bytes())
+            while ack["type"] != "message_ack":  # a presence frame may come first
+                ack = msgpack.unpackb(websocket.receive_bytes())
+            assert ack["success"] and ack["message"]["text"] == "packed"
@@ -0,0 +1,78 @@
+from placa.config.real_time import heartbeat as heartbeat_module
+from placa.config.real_time.heartbeat import HeartbeatWheel
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class Wheel:
+    # A 3 s interval and 2 s timeout on 1 s ticks, driven by hand
+
+    def __init__(self, monkeypatch):
+        self.clock = Clock()
+        monkeypatch.setattr(heartbeat_module, "time", self.clock)
+        self.pinged, self.dead = [], []
+        self.wheel = HeartbeatWheel(
+            3, 2, 1,
+            on_ping=lambda entry: self.pinged.append((entry.user_id, self.clock.now)),
+            on_dead=lambda entry: self.dead.append((entry.user_id, self.clock.now))
+        )
+
+    def run(self, seconds: int, touch: tuple = ()):
+        for _ in range(seconds):
+            self.clock.now += 1
+            for websocket in touch:
+                self.wheel.touch(websocket)
+            self.wheel.advance()
+
+
+def test_silent_socket_is_pinged_then_reaped(monkeypatch):
+    wheel = Wheel(monkeypatch)
+    wheel.wheel.track("socket_ann", "user_ann")
+
+    wheel.run(3)
+    assert wheel.pinged == [("user_ann", 1003.0)]
+    wheel.run(2)
+    assert wheel.dead == [("user_ann", 1005.0)]
+    assert wheel.wheel.entries == {}
+
+    wheel.run(10)
+    assert len(wheel.pinged) == 1 and len(wheel.dead) == 1
+
+
+def test_busy_sockets_are_never_pinged(monkeypatch):
+    wheel = Wheel(monkeypatch)
+    wheel.wheel.track("socket_ann", "user_ann")
+    wheel.run(20, touch=("socket_ann",))
+    assert wheel.pinged == [] and wheel.dead == []
+
+
+def test_any_reply_to_a_ping_keeps_the_socket(monkeypatch):
+    wheel = Wheel(monkeypatch)
+    wheel.wheel.track("socket_ann", "user_ann")
+    wheel.run(3)
+    assert len(wheel.pinged) == 1
+
+    wheel.run(1, touch=("socket_ann",))
+    wheel.run(2)
+    assert wheel.dead == []
+    assert wheel.wheel.entries["socket_ann"].pinged_at is None
+    # Silent again for a whole interval after the reply: pinged again
+    wheel.run(1)
+    assert [at for _, at in wheel.pinged] == [1003.0, 1007.0]
+
+
+def test_forgotten_sockets_are_skipped(monkeypatch):
+    wheel = Wheel(monkeypatch)
+    wheel.wheel.track("socket_ann", "user_ann")
+    wheel.wheel.track("socket_bob", "user_bob")
+    wheel.wheel.forget("socket_ann")
+    wheel.run(6)
+    assert [user_id for user_id, _ in wheel.pinged] == ["user_bob"]
+    assert [user_id for user_id, _ in wheel.dead] == ["user_bob"]
@@ -0,0 +1,160 @@
+import json
+from datetime import datetime, timedelta
+from placa.config.real_time.bus import LocalBus
+from placa.config.real_time.ws_manager import ConnectionManager
+from placa.service import history_service, message_service, ws_service
+from placa.service.history_service import ImportNotify, export_messages, import_messages
+from placa.storage import ChatListIndex, MemoryChatStore, SearchIndex
+from placa.storage.ids import is_message_id_at, message_id_at
+from .conftest import run
+
+
+def use_store(store, monkeypatch):
+    chat_index = ChatListIndex(store)
+    run(chat_index.load())
+    monkeypatch.setattr(history_service, "store", store)
+    monkeypatch.setattr(history_service, "chat_index", chat_index)
+    monkeypatch.setattr(history_service, "search_index", SearchIndex(store, 1000, 64))
+
+
+async def export(chat_id: str) -> bytes:
+    return b"".join([chunk async for chunk in export_messages(chat_id, batch_size=2)])
+
+
+async def _chunks(data: bytes):
+    yield data
+
+
+async def load(data: bytes, chat_id: str):
+    return await import_messages(_chunks(data), default_chat_id=chat_id, notify=ImportNotify.NONE)
+
+
+async def history(store, chat_id: str):
+    return [message async for page in store.iter_history(chat_id, 100) for message in page]
+
+
+def round_trip(store):
+    async def scenario():
+        exported = await export("chat_1")
+        before = await history(store, "chat_2")
+        latest = store.latest_seq("chat_2")
+        first = await load(exported, "chat_2")
+        second = await load(exported, "chat_2")
+        same_chat = await load(exported, "chat_1")
+        return exported, before, latest, first, second, same_chat, await history(store, "chat_2")
+
+    exported, before, latest, first, second, same_chat, after = run(scenario())
+    lines = [json.loads(line) for line in exported.splitlines()]
+
+    # chat_1's messages are older than chat_2's newest, and still all go in, in time order
+    assert (first.imported, first.rejected, first.duplicates) == (len(lines), 0, 0)
+    assert len(after) == len(before) + len(lines)
+    assert [message["timestamp"] for message in after] == sorted(message["timestamp"] for message in after)
+    assert {line["text"] for line in lines} <= {message["text"] for message in after}
+    assert store.latest_seq("chat_2") == latest + len(lines)
+    assert sorted(message["seq"] for message in after) == list(range(1, latest + len(lines) + 1))
+
+    # Importing the same export again adds nothing, into that chat or back into the original one
+    assert (second.imported, second.duplicates) == (0, len(lines))
+    assert (same_chat.imported, same_chat.duplicates) == (0, len(lines))
+
+
+def test_export_imports_into_a_non_empty_chat(store, monkeypatch):
+    use_store(store, monkeypatch)
+    round_trip(store)
+
+
+def test_backfill_reaches_messages_spilled_to_disk(tmp_path, monkeypatch):
+    # chat_2's history spans chat_1's, and all but its newest four messages are in its segment file
+    store = MemoryChatStore(hot_messages=4, spill_dir=str(tmp_path))
+    base = datetime.now() - timedelta(hours=3)
+    for number in range(20):
+        run(store.append_message("chat_2", {
+            "id": message_id_at(base + timedelta(minutes=9 * number)),
+            "text": f"m{number}",
+            "sender": "ann",
+            "senderId": "user_ann",
+            "timestamp": base + timedelta(minutes=9 * number),
+            "isOwnMessage": False
+        }))
+    use_store(store, monkeypatch)
+    round_trip(store)
+    run(store.close())
+
+
+def test_import_keeps_line_ids(store, monkeypatch):
+    use_store(store, monkeypatch)
+    timestamp = datetime.now() - timedelta(days=2)
+    message_id = message_id_at(timestamp)
+    line = {"id": message_id, "text": "from the archive", "senderId": "user_ann", "timestamp": timestamp.isoformat()}
+
+    result = run(load(json.dumps(line).encode(), "chat_3"))
+    assert result.imported == 1
+    assert run(store.get_message("chat_3", message_id))["text"] == "from the archive"
+    assert run(history(store, "chat_3"))[0]["id"] == message_id
+
+
+def test_import_ids_carry_the_line_timestamp(store, monkeypatch):
+    use_store(store, monkeypatch)
+    now = datetime.now()
+    lines = [
+        # Shaped like one of ours but generated a day after the message's time
+        {"id": message_id_at(now), "text": "mislabelled", "senderId": "user_ann", "timestamp": now - timedelta(days=1)},
+        {"text": "newer than the chat", "senderId": "user_ann", "timestamp": now + timedelta(hours=1)},
+        {"id": "legacy-7", "text": "foreign id", "senderId": "user_ann", "timestamp": now - timedelta(hours=2)}
+    ]
+    data = "\n".join(json.dumps(line, default=datetime.isoformat) for line in lines).encode()
+
+    assert run(load(data, "chat_3")).imported == 3
+    after = run(history(store, "chat_3"))
+    assert all(is_message_id_at(message["id"], message["timestamp"]) for message in after)
+    # So the memory store's id order and SQLite's time order agree
+    assert [message["id"] for message in after] == sorted(message["id"] for message in after)
+    assert [message["timestamp"] for message in after] == sorted(message["timestamp"] for message in after)
+
+    # The original ids still find the first copies; the line without one cannot be matched
+    again = run(load(data, "chat_3"))
+    assert (again.imported, again.duplicates) == (1, 2)
+
+
+class RecordingSocket:
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data: str):
+        self.sent.append(json.loads(data))
+
+
+def test_quiet_import_makes_reconnects_resync(store, monkeypatch):
+    use_store(store, monkeypatch)
+    manager = ConnectionManager(LocalBus())
+    run(manager.bus.start(manager.deliver_local))
+    for module in (history_service, message_service, ws_service):
+        monkeypatch.setattr(module, "manager", manager)
+    for name in ("store", "chat_index", "search_index"):
+        monkeypatch.setattr(message_service, name, getattr(history_service, name))
+    monkeypatch.setattr(ws_service, "store", store)
+    socket = RecordingSocket()
+    monkeypatch.setattr(manager, "replay_to_socket", lambda frames, websocket: socket.sent.extend(
+        {"type": "replayed", "seq": frame.seq} for frame in frames
+    ))
+
+    async def scenario():
+        seen = store.latest_seq("chat_1")
+        posted = await message_service.post_message("chat_1", "before", "user_ann")
+        await ws_service.replay_missed_messages(socket, "chat_1", seen)
+
+        line = {"text": "imported", "senderId": "user_ann"}
+        result = await history_service.import_messages(_chunks(json.dumps(line).encode()), default_chat_id="chat_1")
+        await message_service.post_message("chat_1", "after", "user_ann")
+        await ws_service.replay_missed_messages(socket, "chat_1", posted["seq"])
+        return posted, result
+
+    posted, result = run(scenario())
+    assert result.imported == 1
+    # The imported message was never in the replay ring, so the second reconnect cannot be served from it
+    assert socket.sent[0] == {"type": "replayed", "seq": posted["seq"]}
+    assert len(socket.sent) == 2
+    assert socket.sent[1]["type"] == "resync_required"
+    assert socket.sent[1]["latestSeq"] == store.latest_seq("chat_1")
@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+from placa.api import chats_controller
+from placa.main import placa
+from .conftest import run
+
+
+def history(store, chat_id="chat_1"):
+    return run(store.get_message_page(chat_id, 100)).messages
+
+
+def test_empty_page_after_newest(store):
+    newest = history(store)[-1]["id"]
+    page = run(store.get_message_page("chat_1", 10, after=newest))
+    assert page.messages == []
+    assert page.has_older and not page.has_newer
+
+
+def test_empty_page_before_oldest(store):
+    oldest = history(store)[0]["id"]
+    page = run(store.get_message_page("chat_1", 10, before=oldest))
+    assert page.messages == []
+    assert not page.has_older and page.has_newer
+
+
+def test_unknown_cursor(store):
+    with pytest.raises(KeyError):
+        run(store.get_message_page("chat_1", 10, after="msg_missing"))
+
+
+def test_endpoint_cursors_for_empty_pages(store, monkeypatch):
+    monkeypatch.setattr(chats_controller, "store", store)
+    messages = history(store)
+    client = TestClient(placa)
+
+    response = client.get("/api/chats/chat_1", params={"after": messages[-1]["id"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["messages"] == []
+    assert body["prevCursor"] == messages[-1]["id"] and body["nextCursor"] is None
+
+    response = client.get("/api/chats/chat_1", params={"before": messages[0]["id"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["messages"] == []
+    assert body["prevCursor"] is None and body["nextCursor"] == messages[0]["id"]
+
+    # Following the cursor back from the empty page returns everything before the anchor
+    response = client.get("/api/chats/chat_1", params={"before": messages[-1]["id"]})
+    assert [m["id"] for m in response.json()["messages"]] == [m["id"] for m in messages[:-1]]
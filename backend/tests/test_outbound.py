@@ -0,0 +1,139 @@
+import asyncio
+import json
+from placa.config.real_time.codec import JsonCodec
+from placa.config.real_time.outbound import OutboundFrame, OutboundQueue, OverflowPolicy, send_failures
+from .conftest import run
+
+
+class StalledSocket:
+    # Never finishes a send, like a client that stopped reading
+
+    def __init__(self):
+        self.closed_with = None
+
+    async def send_text(self, data: str):
+        await asyncio.Event().wait()
+
+    async def close(self, code: int, reason: str):
+        self.closed_with = code
+
+
+class RecordingSocket(StalledSocket):
+
+    def __init__(self, fail_after: int = None):
+        super().__init__()
+        self.sent = []
+        self.fail_after = fail_after
+
+    async def send_text(self, data: str):
+        if self.fail_after is not None and len(self.sent) >= self.fail_after:
+            raise ConnectionResetError("gone")
+        self.sent.append(json.loads(data))
+
+
+def frame(frame_type: str, chat_id: str, **fields) -> OutboundFrame:
+    return OutboundFrame(type=frame_type, chat_id=chat_id, data=json.dumps({"type": frame_type, "chatId": chat_id, **fields}))
+
+
+def overflow(policy: str, queued: list, incoming: OutboundFrame):
+    # Fills a 4-frame queue that is not being drained, then puts one more
+    async def scenario():
+        socket, evicted = StalledSocket(), []
+        queue = OutboundQueue(socket, "user_ann", evicted.append, 4, policy, 5.0, 1013, JsonCodec())
+        for queued_frame in queued:
+            assert queue.put(queued_frame)
+        accepted = queue.put(incoming)
+        await asyncio.sleep(0)
+        return accepted, list(queue._frames), evicted, socket.closed_with
+
+    return run(scenario())
+
+
+def test_drop_typing_evicts_the_oldest_typing_frame():
+    typing = frame("typing_users", "chat_1", users=[])
+    queued = [frame("new_message", "chat_1"), typing, frame("typing_users", "chat_2", users=[]), frame("presence", "chat_1")]
+    incoming = frame("new_message", "chat_1")
+
+    accepted, frames, evicted, closed_with = overflow(OverflowPolicy.DROP_TYPING, queued, incoming)
+    assert accepted and not evicted and closed_with is None
+    assert frames == [queued[0], queued[2], queued[3], incoming]
+
+    # Nothing to drop: the client is disconnected
+    queued = [frame("new_message", "chat_1") for _ in range(4)]
+    accepted, frames, evicted, closed_with = overflow(OverflowPolicy.DROP_TYPING, queued, incoming)
+    assert not accepted and len(evicted) == 1 and closed_with == 1013
+    assert frames == []
+
+
+def test_coalesce_drops_chat_state_a_newer_frame_supersedes():
+    read_elsewhere = frame("chat_update", "chat_1", unreadCount=0)
+    imported = frame("chat_update", "chat_2", lastMessage="imported")
+    queued = [read_elsewhere, imported, frame("typing_users", "chat_1", users=[]), frame("presence", "chat_1")]
+
+    # A new_message carries chat_2's chat list fields, so the summary-only chat_update goes
+    incoming = frame("new_message", "chat_2")
+    accepted, frames, evicted, _ = overflow(OverflowPolicy.COALESCE, queued, incoming)
+    assert accepted and not evicted
+    assert frames == [read_elsewhere, queued[2], queued[3], incoming]
+
+    # chat_1's chat_update has an unread count, which only a later chat_update replaces
+    incoming = frame("new_message", "chat_1")
+    queued = [read_elsewhere, frame("new_message", "chat_1"), frame("new_message", "chat_1"), frame("presence", "chat_1")]
+    accepted, frames, evicted, closed_with = overflow(OverflowPolicy.COALESCE, queued, incoming)
+    assert not accepted and len(evicted) == 1 and closed_with == 1013
+
+    incoming = frame("chat_update", "chat_1", unreadCount=2)
+    accepted, frames, evicted, _ = overflow(OverflowPolicy.COALESCE, queued, incoming)
+    assert accepted and not evicted
+    assert frames == [*queued[1:], incoming]
+
+    # Typing lists are replaced by the chat's next one
+    typing = [frame("typing_users", "chat_1", users=["user_bob"]), frame("typing_users", "chat_1", users=[])]
+    queued = [frame("new_message", "chat_1"), typing[0], frame("new_message", "chat_1"), typing[1]]
+    accepted, frames, evicted, _ = overflow(OverflowPolicy.COALESCE, queued, frame("new_message", "chat_1"))
+    assert accepted and typing[0] not in frames and typing[1] in frames
+
+
+def test_disconnect_closes_on_the_first_overflow():
+    queued = [frame("typing_users", "chat_1", users=[]) for _ in range(4)]
+    accepted, frames, evicted, closed_with = overflow(OverflowPolicy.DISCONNECT, queued, frame("new_message", "chat_1"))
+    assert not accepted and len(evicted) == 1 and closed_with == 1013
+    assert frames == []
+
+
+def writer(socket, frames: list, send_timeout: float = 5.0):
+    # Queues the frames on a started queue and lets its writer run
+    async def scenario():
+        evicted = []
+        queue = OutboundQueue(socket, "user_ann", evicted.append, 16, OverflowPolicy.DROP_TYPING, send_timeout, 1013, JsonCodec())
+        queue.start()
+        for queued_frame in frames:
+            queue.put(queued_frame)
+        await asyncio.sleep(0.1)
+        queue.stop()
+        return queue, evicted
+
+    return run(scenario())
+
+
+def test_writer_sends_in_order_without_blocking_the_producer():
+    socket = RecordingSocket()
+    queue, evicted = writer(socket, [frame("new_message", "chat_1", seq=seq) for seq in range(5)])
+    assert [sent["seq"] for sent in socket.sent] == list(range(5))
+    assert not evicted and socket.closed_with is None
+
+
+def test_failed_or_stalled_send_evicts_the_socket():
+    failed = send_failures.labels("send_failed")
+    before = failed.value
+
+    socket = RecordingSocket(fail_after=2)
+    queue, evicted = writer(socket, [frame("new_message", "chat_1", seq=seq) for seq in range(4)])
+    assert len(socket.sent) == 2
+    assert evicted == [queue] and socket.closed_with == 1013
+    assert queue.put(frame("new_message", "chat_1")) is False  # closed queues refuse frames
+
+    socket = StalledSocket()
+    queue, evicted = writer(socket, [frame("new_message", "chat_1")], send_timeout=0.05)
+    assert evicted == [queue] and socket.closed_with == 1013
+    assert failed.value == before + 2
@@ -0,0 +1,83 @@
+from placa.config.real_time.bus import MessageBus
+from placa.config.real_time.ws_manager import ConnectionManager
+from .conftest import run
+
+
+class SharedBus(MessageBus):
+    # Delivers every event to each worker attached to it, like the unix bus joining worker processes
+
+    def __init__(self, workers: list):
+        super().__init__()
+        self.workers = workers
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        self.workers.append(deliver)
+
+    def publish(self, scope, key, exclude_user, frame):
+        for deliver in self.workers:
+            if deliver is not self._deliver:
+                deliver(scope, key, exclude_user, frame)
+        return super().publish(scope, key, exclude_user, frame)
+
+
+def two_workers():
+    delivers = []
+    first, second = ConnectionManager(SharedBus(delivers)), ConnectionManager(SharedBus(delivers))
+    for worker in (first, second):
+        run(worker.bus.start(worker.deliver_local))
+    return first, second
+
+
+def publish(worker, full: bool = False):
+    worker.publish_presence(worker.presence.local_signal(full), full)
+
+
+def status(worker, user_id: str) -> str:
+    return worker.presence.lookup([user_id])[0]["status"]
+
+
+def test_presence_is_shared_between_workers():
+    first, second = two_workers()
+
+    first.presence.connected("ann")
+    publish(first)
+    assert status(second, "ann") == "online"
+    assert [change["userId"] for change in second.presence.take_changes()] == ["ann"]
+
+    # Online on both, then gone from one: still online
+    second.presence.connected("ann")
+    first.presence.disconnected("ann")
+    publish(first)
+    assert status(second, "ann") == "online"
+    assert second.presence.take_changes() == []
+
+    second.presence.disconnected("ann")
+    publish(second)
+    assert status(first, "ann") == "offline"
+    assert first.presence.lookup(["ann"])[0]["lastSeen"] is not None
+
+
+def test_full_sync_corrects_missed_changes():
+    first, second = two_workers()
+    first.presence.connected("bob")
+    first.presence.local_signal(False)  # this change never reaches the other worker
+    assert status(second, "bob") == "offline"
+
+    publish(first, full=True)
+    assert status(second, "bob") == "online"
+
+    first.presence.online.discard("bob")  # a disconnect the other worker never hears of
+    publish(first, full=True)
+    assert status(second, "bob") == "offline"
+
+
+def test_silent_worker_is_forgotten():
+    first, second = two_workers()
+    first.presence.connected("cat")
+    publish(first)
+    second.presence.take_changes()
+
+    second.presence.expire_remote(-1)
+    assert status(second, "cat") == "offline"
+    assert [change["status"] for change in second.presence.take_changes()] == ["offline"]
@@ -0,0 +1,111 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from placa.config.rate_limit import (
+    AdmissionController,
+    ConnectionLimits,
+    KeyedLimiter,
+    RateLimitExceeded,
+    RateLimits,
+    TokenBucket,
+    admission
+)
+from placa.main import placa
+from placa.service import ws_service
+from .conftest import run
+
+
+class RecordingSocket:
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data: str):
+        self.sent.append(json.loads(data))
+
+
+def test_token_bucket_spends_its_burst_then_refills():
+    bucket = TokenBucket(2, 3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(3)] == [0, 0, 0]
+    assert bucket.take(now) == pytest.approx(0.5)  # one token at 2 per second
+    assert bucket.take(now + 0.5) == 0
+    # Idle time refills up to the burst, not beyond it
+    assert [bucket.take(now + 60) for _ in range(4)] == [0, 0, 0, pytest.approx(0.5)]
+
+
+def test_keyed_limiter_drops_the_least_recently_used_bucket():
+    limiter = KeyedLimiter(1, 1, max_keys=2)
+    limiter.take("ann")
+    limiter.take("bob")
+    limiter.take("ann")
+    limiter.take("cid")
+    assert list(limiter.buckets) == ["ann", "cid"]
+    assert limiter.take("ann") > 0
+    assert limiter.take("bob") == 0  # a fresh bucket
+
+    assert KeyedLimiter(0, 0, max_keys=2).take("ann") == 0  # a rate of 0 disables the limit
+
+
+def test_user_limit_reports_retry_after():
+    limits = RateLimits({"message": (0.5, 2)}, max_keys=10)
+    limits.check("message", "user_ann")
+    limits.check("message", "user_ann")
+    with pytest.raises(RateLimitExceeded) as refused:
+        limits.check("message", "user_ann")
+    assert refused.value.status_code == 429
+    assert refused.value.retry_after == pytest.approx(2, abs=0.01)
+    assert refused.value.headers["Retry-After"] == "2"
+    limits.check("message", "user_bob")  # buckets are per user
+
+    disabled = RateLimits({"message": (0.5, 1)}, max_keys=10, enabled=False)
+    for _ in range(5):
+        disabled.check("message", "user_ann")
+
+
+def test_throttled_frames_are_answered_with_retry_after():
+    limits = ConnectionLimits({"frame": (100, 100), "message": (1, 1), "typing": (1, 1)})
+    socket = RecordingSocket()
+
+    async def scenario():
+        sends = [{"type": "send_message", "chatId": "chat_1", "text": "hi", "clientMsgId": str(n)} for n in range(3)]
+        admitted = [await ws_service.admit_client_message(socket, "user_ann", frame, limits) for frame in sends]
+        admission.leave()
+        typing = {"type": "typing", "chatId": "chat_1", "isTyping": True}
+        admitted += [await ws_service.admit_client_message(socket, "user_ann", typing, limits) for _ in range(3)]
+        admission.leave()
+        return admitted
+
+    assert run(scenario()) == [True, False, False, True, False, False]
+    # Every refused send gets its ack; other refused frames get one error per retry window
+    acks, errors = socket.sent[:2], socket.sent[2:]
+    assert [(ack["type"], ack["clientMsgId"], ack["success"]) for ack in acks] == [
+        ("message_ack", "1", False), ("message_ack", "2", False)
+    ]
+    assert all(0 < ack["retryAfter"] <= 1 for ack in acks)
+    assert len(errors) == 1 and errors[0]["type"] == "error" and 0 < errors[0]["retryAfter"] <= 1
+
+
+def test_admission_sheds_while_saturated():
+    controller = AdmissionController(max_inflight=2, max_loop_lag=0.25)
+    assert controller.enter() and controller.enter()
+    assert not controller.enter()
+    controller.leave()
+    assert controller.enter()
+    controller.leave()
+    controller.record_loop_lag(0.5)
+    assert not controller.enter()
+    controller.record_loop_lag(0.01)
+    assert controller.enter()
+
+
+def test_saturated_api_answers_503_with_retry_after(monkeypatch):
+    monkeypatch.setattr(admission, "inflight", admission.max_inflight)
+    client = TestClient(placa)
+
+    response = client.get("/api/chats")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == {"detail": "Server busy, retry later"}
+    # Scrapes are never shed
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,117 @@
+import random
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from placa.api import search_controller
+from placa.main import placa
+from placa.storage import SearchIndex
+from placa.storage.search_index import _Vocabulary
+from placa.storage.ids import message_id_at
+from .conftest import run
+
+WORDS = {"chat_1": "apple", "chat_2": "banana", "chat_3": "cherry"}
+
+
+def add_messages(store):
+    for number, (chat_id, word) in enumerate(WORDS.items()):
+        run(store.append_message(chat_id, {
+            "id": f"msg_search_{number}",
+            "text": f"{word} pie",
+            "sender": "ann",
+            "senderId": "user_ann",
+            "timestamp": datetime.now(),
+            "isOwnMessage": False
+        }))
+
+
+def test_loaded_index_keeps_each_message_in_its_chat(store):
+    add_messages(store)
+    index = SearchIndex(store, 1000, 64)
+    run(index.load())
+
+    for chat_id, word in WORDS.items():
+        total, matches = index.search(word)
+        assert total == 1
+        assert [match.chat_id for match in matches] == [chat_id]
+        assert index.search(word, chat_id=chat_id)[0] == 1
+
+    total, matches = index.search("pie")
+    assert total == 3
+    assert {match.chat_id for match in matches} == set(WORDS)
+
+
+def test_recent_messages_are_the_newest_by_time(store):
+    now = datetime.now() + timedelta(days=1)  # newer than the seed data
+
+    def message(age: int) -> dict:
+        timestamp = now - timedelta(minutes=age)
+        return {
+            "id": message_id_at(timestamp),
+            "text": f"minus {age}",
+            "sender": "ann",
+            "senderId": "user_ann",
+            "timestamp": timestamp,
+            "isOwnMessage": False
+        }
+
+    # Backdated history goes in after newer messages, as an import does
+    for age in (0, 60):
+        run(store.append_message("chat_1", message(age)))
+    run(store.append_batch([("chat_1", message(age)) for age in (5, 1, 30)], {}))
+
+    recent = run(store.list_recent_messages(3))
+    assert [message["text"] for _, message in recent] == ["minus 5", "minus 1", "minus 0"]
+
+
+def test_search_endpoint_hits_and_total(store, monkeypatch):
+    add_messages(store)
+    index = SearchIndex(store, 1000, 64)
+    run(index.load())
+    index.add("chat_2", "msg_gone", "banana split")  # indexed but never stored
+    monkeypatch.setattr(search_controller, "store", store)
+    monkeypatch.setattr(search_controller, "search_index", index)
+    client = TestClient(placa)
+
+    body = client.get("/api/chats/chat_2/search", params={"q": "banana"}).json()
+    assert [hit["chatId"] for hit in body["hits"]] == ["chat_2"]
+    assert body["total"] == len(body["hits"])
+
+    body = client.get("/api/search", params={"q": "pie"}).json()
+    assert sorted(hit["chatId"] for hit in body["hits"]) == sorted(WORDS)
+
+
+def test_vocabulary_blocks_keep_prefix_order(monkeypatch):
+    monkeypatch.setattr(_Vocabulary, "BLOCK_SIZE", 4)
+    rng = random.Random(3)
+    terms = list({"".join(rng.choice("abc") for _ in range(rng.randint(1, 5))) for _ in range(300)})
+    vocabulary = _Vocabulary(terms[:50])
+    for term in terms[50:]:
+        vocabulary.add(term)
+
+    assert len(vocabulary) == len(terms) and len(vocabulary.blocks) > 1
+    assert [term for block in vocabulary.blocks for term in block] == sorted(terms)
+    for prefix in ("a", "ab", "cab", "cc", "bbbbb", "d"):
+        expected = [term for term in sorted(terms) if term.startswith(prefix)]
+        assert vocabulary.prefixed(prefix, 1000) == expected
+        assert vocabulary.prefixed(prefix, 3) == expected[:3]
+
+
+def test_index_is_capped_by_estimated_bytes():
+    index = SearchIndex(None, 1_000_000, 64, max_bytes=64 * 1024)
+    for number in range(5000):
+        index.add(f"chat_{number % 3}", f"msg_{number:06}", f"word{number} shared text")
+
+    assert 0 < index.estimated_bytes <= 64 * 1024
+    assert index.doc_count < 5000
+    # The newest messages stay searchable, the oldest are gone with their words
+    assert index.search("word4999")[0] == 1
+    assert index.search("word0")[0] == 0
+    assert index.stats()["vocabulary"] < 5000
+
+
+def test_cap_below_one_segment_keeps_the_newest_messages():
+    index = SearchIndex(None, 10, 64)
+    for number in range(100):
+        index.add("chat_1", f"msg_{number:03}", f"word{number}")
+
+    assert 8 <= index.doc_count <= 10
+    assert all(index.search(f"word{number}")[0] == 1 for number in range(92, 100))
@@ -0,0 +1,71 @@
+from datetime import datetime
+from placa.config.real_time.outbound import OutboundFrame
+from placa.config.real_time.replay import ReplayLog
+from placa.storage import SqliteChatStore, WriteBehindStore
+from .conftest import run
+
+
+def message(number: int) -> dict:
+    return {
+        "id": f"msg_seq_{number}",
+        "text": f"m{number}",
+        "sender": "ann",
+        "senderId": "user_ann",
+        "timestamp": datetime.now(),
+        "isOwnMessage": False
+    }
+
+
+def test_workers_sharing_a_database_never_reuse_a_seq(tmp_path):
+    # Two stores on one file stand in for two uvicorn workers
+    path = str(tmp_path / "placa.db")
+    first, second = SqliteChatStore(path, shared=True), SqliteChatStore(path, shared=True)
+    buffered = WriteBehindStore(SqliteChatStore(path, shared=True), 100, 1000)
+
+    async def scenario():
+        for chat_store in (first, second, buffered):
+            await chat_store.open()
+        start = first.latest_seq("chat_1")
+        seqs = []
+        for number in range(0, 12, 3):
+            for offset, chat_store in enumerate((first, second, buffered)):
+                written = message(number + offset)
+                await chat_store.append_message("chat_1", written)
+                seqs.append(written["seq"])
+        batch = [("chat_1", message(100 + number)) for number in range(3)]
+        await second.append_batch(batch, {})
+        seqs += [written["seq"] for _, written in batch]
+        await buffered.sync()
+        stored = [written["seq"] async for page in first.iter_history("chat_1", 100) for written in page]
+        for chat_store in (first, second, buffered):
+            await chat_store.close()
+        return start, seqs, stored
+
+    start, seqs, stored = run(scenario())
+    assert seqs == list(range(start + 1, start + 16))
+    assert sorted(stored) == list(range(1, start + 16))
+
+
+def test_observed_seqs_only_move_forward(store):
+    latest = store.latest_seq("chat_1")
+    store.observe_seq("chat_1", latest + 5)
+    store.observe_seq("chat_1", latest + 2)
+    assert store.latest_seq("chat_1") == latest + 5
+
+
+def test_replay_log_keeps_seq_order():
+    log = ReplayLog(3)
+    frames = {seq: OutboundFrame(type="new_message", chat_id="chat_1", data=str(seq), seq=seq) for seq in range(1, 6)}
+    for seq in (1, 3, 2, 5, 4):
+        log.record("chat_1", seq, frames[seq])
+    assert [frame.seq for frame in log.since("chat_1", 2, 5)] == [3, 4, 5]
+    assert log.since("chat_1", 1, 5) is None
+
+
+def test_replay_log_refuses_a_gap():
+    log = ReplayLog(8)
+    for seq in (1, 2, 4, 5):
+        log.record("chat_1", seq, OutboundFrame(type="new_message", chat_id="chat_1", data=str(seq), seq=seq))
+    assert [frame.seq for frame in log.since("chat_1", 3, 5)] == [4, 5]
+    assert log.since("chat_1", 1, 5) is None
+    assert log.since("chat_1", 4, 6) is None  # seq 6 was never recorded
@@ -0,0 +1,98 @@
+import gzip
+import os
+import pytest
+from starlette.requests import Request
+from placa.config.static_assets import IMMUTABLE, REVALIDATE, StaticAssetCache, accepts_gzip
+from .conftest import run
+
+SCRIPT = b"console.log('placa');\n" * 200
+
+
+def cache(tmp_path, max_inline_bytes: int = 1024 * 1024) -> StaticAssetCache:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "index-Ab12Cd34.js").write_bytes(SCRIPT)
+    (tmp_path / "index.html").write_bytes(b"<!doctype html><div id=root></div>")
+    (tmp_path / "video.bin").write_bytes(os.urandom(4096))
+    assets = StaticAssetCache(str(tmp_path), max_inline_bytes)
+    run(assets.start())
+    return assets
+
+
+def request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+def test_hashed_assets_are_immutable_and_gzipped(tmp_path):
+    assets = cache(tmp_path)
+    script = assets.lookup("/assets/index-Ab12Cd34.js")
+    assert script.cache_control == IMMUTABLE
+    assert assets.lookup("index.html").cache_control == REVALIDATE
+
+    plain = assets.respond(script, request())
+    assert plain.body == SCRIPT and "content-encoding" not in plain.headers
+
+    compressed = assets.respond(script, request(accept_encoding="gzip, br"))
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(compressed.body) == SCRIPT
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    # Each encoding has its own ETag
+    assert compressed.headers["etag"] != plain.headers["etag"]
+
+    # Too small to be worth compressing
+    assert "content-encoding" not in assets.respond(assets.lookup("index.html"), request(accept_encoding="gzip")).headers
+
+
+@pytest.mark.parametrize("header, accepted", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("GZIP ; Q=1", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000, br", False),
+    ("br, *", True),
+    ("*;q=0.1, gzip;q=0", False),
+    ("x-gzip", True),
+    ("identity", False),
+    ("", False)
+])
+def test_gzip_negotiation_reads_q_values(header, accepted):
+    assert accepts_gzip(header) is accepted
+
+
+def test_matching_etag_is_not_modified(tmp_path):
+    assets = cache(tmp_path)
+    script = assets.lookup("assets/index-Ab12Cd34.js")
+    etag = assets.respond(script, request(accept_encoding="gzip")).headers["etag"]
+
+    assert assets.respond(script, request(accept_encoding="gzip", if_none_match=etag)).status_code == 304
+    assert assets.respond(script, request(accept_encoding="gzip", if_none_match=f'"other", W/{etag}')).status_code == 304
+    assert assets.respond(script, request(if_none_match=etag)).status_code == 200  # the identity representation
+
+
+def test_large_files_stream_from_disk(tmp_path):
+    assets = cache(tmp_path, max_inline_bytes=2048)
+    video = assets.lookup("video.bin")
+    assert video.body is None
+    response = assets.respond(video, request())
+    assert response.path == video.path
+    assert assets.respond(video, request(if_none_match=response.headers["etag"])).status_code == 304
+
+    # Replaced on disk without a reload: the old ETag no longer matches
+    (tmp_path / "video.bin").write_bytes(os.urandom(8192))
+    changed = assets.respond(video, request(if_none_match=response.headers["etag"]))
+    assert changed.status_code == 200 and changed.headers["etag"] != response.headers["etag"]
+
+    (tmp_path / "video.bin").unlink()
+    assert assets.respond(video, request()).status_code == 404
+
+
+def test_only_indexed_files_resolve(tmp_path):
+    assets = cache(tmp_path)
+    (tmp_path.parent / "secret.txt").write_text("no")
+    assert assets.lookup("../secret.txt") is None
+    assert assets.lookup("/etc/passwd") is None
+    assert assets.lookup("assets/missing.js") is None
@@ -0,0 +1,71 @@
+from typing import Tuple
+from placa.config.real_time import typing as typing_module
+from placa.config.real_time.typing import TypingTracker
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def tracker(monkeypatch) -> Tuple[TypingTracker, Clock]:
+    clock = Clock()
+    monkeypatch.setattr(typing_module, "time", clock)
+    return TypingTracker(throttle_ms=1000, ttl_ms=5000), clock
+
+
+def test_repeats_inside_the_throttle_window_are_not_published(monkeypatch):
+    typing, clock = tracker(monkeypatch)
+    assert typing.should_publish("chat_1", "user_ann", True)
+    clock.now += 0.5
+    assert not typing.should_publish("chat_1", "user_ann", True)
+    assert typing.should_publish("chat_2", "user_ann", True)  # per user and chat
+    assert typing.should_publish("chat_1", "user_bob", True)
+
+    # Stopping always goes out, and the next start is not held back by the window
+    assert typing.should_publish("chat_1", "user_ann", False)
+    assert typing.should_publish("chat_1", "user_ann", True)
+    clock.now += 1.0
+    assert typing.should_publish("chat_1", "user_ann", True)
+
+
+def test_changes_are_coalesced_into_one_list_per_chat(monkeypatch):
+    typing, _ = tracker(monkeypatch)
+    for user_id in ("user_ann", "user_bob", "user_ann"):
+        typing.apply("chat_1", user_id, user_id[5:], True)
+    typing.apply("chat_2", "user_cid", "cid", True)
+    typing.apply("chat_2", "user_cid", "cid", False)
+
+    changes = dict(typing.take_changes())
+    assert changes == {
+        "chat_1": [{"userId": "user_ann", "username": "ann"}, {"userId": "user_bob", "username": "bob"}],
+        "chat_2": []
+    }
+    assert typing.take_changes() == []
+
+    # A refresh of someone already typing is not a change
+    typing.apply("chat_1", "user_bob", "bob", True)
+    assert typing.take_changes() == []
+
+
+def test_typing_expires_without_a_fresh_update(monkeypatch):
+    typing, clock = tracker(monkeypatch)
+    typing.apply("chat_1", "user_ann", "ann", True)
+    typing.should_publish("chat_1", "user_ann", True)
+    clock.now += 3
+    typing.apply("chat_1", "user_bob", "bob", True)
+    typing.take_changes()
+
+    clock.now += 2.5
+    typing.expire()
+    assert typing.take_changes() == [("chat_1", [{"userId": "user_bob", "username": "bob"}])]
+
+    clock.now += 3
+    typing.expire()
+    assert typing.take_changes() == [("chat_1", [])]
+    assert typing.typing == {}
+    assert typing._last_published == {}
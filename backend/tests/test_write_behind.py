@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+import pytest
+from placa.storage import MemoryChatStore, WriteBehindStore
+from placa.storage.write_behind import dropped_batches
+from .conftest import run
+
+
+class PoisonedStore(MemoryChatStore):
+    # Fails every group commit that contains a message with the text "poison"
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    async def write_batch(self, messages, chat_updates, read_cursors=None):
+        if any(message["text"] == "poison" for _, message in messages):
+            self.attempts += 1
+            raise RuntimeError("poison row")
+        await super().write_batch(messages, chat_updates, read_cursors)
+
+
+def message(text: str) -> dict:
+    return {
+        "id": f"msg_wb_{text}",
+        "text": text,
+        "sender": "ann",
+        "senderId": "user_ann",
+        "timestamp": datetime.now(),
+        "isOwnMessage": False
+    }
+
+
+def test_failing_batch_is_dropped_after_its_retries():
+    backend = PoisonedStore()
+    buffered = WriteBehindStore(backend, 100, 5, max_retries=2, retry_backoff_ms=5)
+    dropped_before = dropped_batches.labels().value
+
+    async def scenario():
+        await buffered.open()
+        await buffered.append_message("chat_1", message("poison"))
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(buffered.sync(), timeout=5)
+
+        await buffered.append_message("chat_1", message("after"))
+        await asyncio.wait_for(buffered.sync(), timeout=5)
+        stored = await backend.get_message("chat_1", "msg_wb_after")
+        lost = await backend.get_message("chat_1", "msg_wb_poison")
+        await buffered.close()
+        return stored, lost
+
+    stored, lost = run(scenario())
+    assert stored is not None and lost is None
+    assert backend.attempts == 3
+    assert dropped_batches.labels().value == dropped_before + 1
+
+
+def test_writes_behind_a_failing_batch_wait_for_it():
+    backend = PoisonedStore()
+    buffered = WriteBehindStore(backend, 100, 5, max_retries=1, retry_backoff_ms=50)
+
+    async def scenario():
+        await buffered.open()
+        await buffered.append_message("chat_1", message("poison"))
+        await asyncio.sleep(0.02)  # the first commit has failed and the retry is waiting
+        await buffered.append_message("chat_1", message("later"))
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(buffered.sync(), timeout=5)
+        await asyncio.wait_for(buffered.sync(), timeout=5)
+        stored = await backend.get_message("chat_1", "msg_wb_later")
+        await buffered.close()
+        return stored
+
+    assert run(scenario()) is not None
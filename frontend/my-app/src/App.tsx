@@ -82,6 +82,7 @@ function App() {
       if (response.success) {
         setMessages(response.messages);
         websocketService.subscribeToChat(chatId);
+        websocketService.markRead(chatId);
       } else {
         setError('Failed to load messages');
       }
@@ -148,6 +149,7 @@ function App() {
           isOwnMessage: data.message.senderId === userId,
         };
         setMessages((prev) => [...prev, newMessage]);
+        websocketService.markRead(data.chatId, data.message.seq);
       }
     });
 
@@ -182,23 +184,10 @@ function App() {
     });
 
     const unsubscribeTyping = websocketService.onTyping((data) => {
-      if (data.chatId === selectedChatId && data.userId !== userId) {
-        if (data.isTyping) {
-          setTypingUsers((prev) => new Set(prev).add(data.username));
-          setTimeout(() => {
-            setTypingUsers((prev) => {
-              const newSet = new Set(prev);
-              newSet.delete(data.username);
-              return newSet;
-            });
-          }, 3000);
-        } else {
-          setTypingUsers((prev) => {
-            const newSet = new Set(prev);
-            newSet.delete(data.username);
-            return newSet;
-          });
-        }
+      if (data.chatId === selectedChatId) {
+        setTypingUsers(new Set(
+          data.users.filter((user) => user.userId !== userId).map((user) => user.username)
+        ));
       }
     });
 
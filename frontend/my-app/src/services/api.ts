@@ -21,6 +21,25 @@ export interface ChatDetailsResponse {
   messages: MessageType[];
 }
 
+export interface SearchHit {
+  chatId: string;
+  message: MessageType;
+  score: number;
+}
+
+export interface SearchResponse {
+  success: boolean;
+  query: string;
+  total: number;
+  hits: SearchHit[];
+}
+
+export interface PresenceStatus {
+  userId: string;
+  status: 'online' | 'offline';
+  lastSeen?: Date;
+}
+
 // Helper functions to convert API responses
 function convertToChat(rawChat: any): Chat {
   return {
@@ -124,6 +143,41 @@ class ApiService {
       message: convertToMessage(response.message),
     };
   }
+
+  // Search messages - GET /search, or GET /chats/:chatId/search within one chat
+  async searchMessages(
+    query: string,
+    userId: string,
+    chatId?: string,
+    offset = 0
+  ): Promise<SearchResponse> {
+    const params = `q=${encodeURIComponent(query)}&userId=${userId}&offset=${offset}`;
+    const url = chatId ? `/chats/${chatId}/search?${params}` : `/search?${params}`;
+    const response: any = await this.request(url);
+
+    return {
+      success: response.success,
+      query: response.query,
+      total: response.total,
+      hits: response.hits.map((hit: any) => ({
+        chatId: hit.chatId,
+        message: convertToMessage(hit.message),
+        score: hit.score,
+      })),
+    };
+  }
+
+  // Presence - GET /presence
+  async getPresence(userIds: string[]): Promise<PresenceStatus[]> {
+    const params = userIds.map(userId => `userIds=${encodeURIComponent(userId)}`).join('&');
+    const response: any = await this.request(`/presence?${params}`);
+
+    return response.users.map((user: any) => ({
+      userId: user.userId,
+      status: user.status,
+      lastSeen: user.lastSeen ? new Date(user.lastSeen) : undefined,
+    }));
+  }
 }
 
 // Export singleton instance
@@ -2,12 +2,14 @@ import type {
   WebSocketMessage,
   NewMessageNotification,
   ChatUpdateNotification,
-  UserTypingNotification,
+  TypingUsersNotification,
+  PresenceNotification,
 } from '../types/WebSocketMessage';
 
 export type MessageHandler = (data: NewMessageNotification) => void;
 export type ChatUpdateHandler = (data: ChatUpdateNotification) => void;
-export type TypingHandler = (data: UserTypingNotification) => void;
+export type TypingHandler = (data: TypingUsersNotification) => void;
+export type PresenceHandler = (data: PresenceNotification) => void;
 export type ErrorHandler = (error: string, details?: string) => void;
 export type ConnectionHandler = () => void;
 
@@ -22,6 +24,7 @@ class WebSocketService {
   private messageHandlers: Set<MessageHandler> = new Set();
   private chatUpdateHandlers: Set<ChatUpdateHandler> = new Set();
   private typingHandlers: Set<TypingHandler> = new Set();
+  private presenceHandlers: Set<PresenceHandler> = new Set();
   private errorHandlers: Set<ErrorHandler> = new Set();
   private connectHandlers: Set<ConnectionHandler> = new Set();
   private disconnectHandlers: Set<ConnectionHandler> = new Set();
@@ -37,7 +40,7 @@ class WebSocketService {
 
     const baseUrl = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
     const wsUrl = baseUrl.replace(/^http/, 'ws');
-    const url = `${wsUrl}/ws?userId=${userId}`;
+    const url = `${wsUrl}/ws?userId=${userId}&batch=true`;
 
     console.log('Connecting to WebSocket:', url);
 
@@ -51,8 +54,8 @@ class WebSocketService {
 
     this.ws.onmessage = (event) => {
       try {
-        const data: WebSocketMessage = JSON.parse(event.data);
-        this.handleMessage(data);
+        const data: WebSocketMessage | WebSocketMessage[] = JSON.parse(event.data);
+        (Array.isArray(data) ? data : [data]).forEach(message => this.handleMessage(message));
       } catch (error) {
         console.error('Failed to parse WebSocket message:', error);
       }
@@ -76,6 +79,12 @@ class WebSocketService {
   }
 
   private handleMessage(data: WebSocketMessage) {
+    if (data.type === 'ping') {
+      // Server heartbeat; a silent socket that does not answer is closed
+      this.send({ type: 'pong' });
+      return;
+    }
+
     console.log('WebSocket message received:', data);
 
     switch (data.type) {
@@ -85,16 +94,31 @@ class WebSocketService {
 
       case 'new_message':
         this.messageHandlers.forEach(handler => handler(data));
+        if (data.chatUpdate) {
+          const update: ChatUpdateNotification = {
+            type: 'chat_update',
+            chatId: data.chatId,
+            timestamp: data.timestamp,
+            lastMessage: data.chatUpdate.lastMessage,
+            lastMessageTime: data.chatUpdate.lastMessageTime,
+            unreadCount: data.chatUpdate.unreadCount ?? undefined,
+          };
+          this.chatUpdateHandlers.forEach(handler => handler(update));
+        }
         break;
 
       case 'chat_update':
         this.chatUpdateHandlers.forEach(handler => handler(data));
         break;
 
-      case 'user_typing':
+      case 'typing_users':
         this.typingHandlers.forEach(handler => handler(data));
         break;
 
+      case 'presence':
+        this.presenceHandlers.forEach(handler => handler(data));
+        break;
+
       case 'error':
         console.error('Server error:', data.error, data.details);
         this.errorHandlers.forEach(handler => handler(data.error, data.details));
@@ -138,6 +162,10 @@ class WebSocketService {
     this.send({ action: 'unsubscribe', chatId });
   }
 
+  markRead(chatId: string, seq?: number) {
+    this.send({ type: 'mark_read', chatId, seq });
+  }
+
   sendTypingIndicator(chatId: string, isTyping: boolean) {
     this.send({ type: 'typing', chatId, isTyping });
   }
@@ -181,6 +209,11 @@ class WebSocketService {
     return () => this.typingHandlers.delete(handler);
   }
 
+  onPresence(handler: PresenceHandler) {
+    this.presenceHandlers.add(handler);
+    return () => this.presenceHandlers.delete(handler);
+  }
+
   onError(handler: ErrorHandler) {
     this.errorHandlers.add(handler);
     return () => this.errorHandlers.delete(handler);
@@ -4,4 +4,5 @@ export interface MessageType {
   senderId: string;
   timestamp: Date;
   isOwnMessage: boolean;
+  seq?: number;
 }
\ No newline at end of file
@@ -11,10 +11,17 @@ export interface ConnectedMessage extends BaseWebSocketMessage {
   message: string;
 }
 
+export interface ChatUpdate {
+  lastMessage: string;
+  lastMessageTime: string;
+  unreadCount?: number;
+}
+
 export interface NewMessageNotification extends BaseWebSocketMessage {
   type: 'new_message';
   chatId: string;
   message: MessageType;
+  chatUpdate?: ChatUpdate;
 }
 
 export interface ChatUpdateNotification extends BaseWebSocketMessage {
@@ -25,18 +32,38 @@ export interface ChatUpdateNotification extends BaseWebSocketMessage {
   unreadCount?: number;
 }
 
-export interface UserTypingNotification extends BaseWebSocketMessage {
-  type: 'user_typing';
-  chatId: string;
+export interface TypingUser {
   userId: string;
   username: string;
-  isTyping: boolean;
+}
+
+export interface TypingUsersNotification extends BaseWebSocketMessage {
+  type: 'typing_users';
+  chatId: string;
+  users: TypingUser[];
+}
+
+export interface PresenceUser {
+  userId: string;
+  status: 'online' | 'offline';
+  lastSeen: string | null;
+}
+
+export interface PresenceNotification extends BaseWebSocketMessage {
+  type: 'presence';
+  chatId: string;
+  users: PresenceUser[];
+}
+
+export interface PingMessage {
+  type: 'ping';
 }
 
 export interface ErrorMessage extends BaseWebSocketMessage {
   type: 'error';
   error: string;
   details?: string;
+  retryAfter?: number | null;
 }
 
 export interface SubscriptionConfirmed extends BaseWebSocketMessage {
@@ -50,6 +77,8 @@ export type WebSocketMessage =
   | ConnectedMessage
   | NewMessageNotification
   | ChatUpdateNotification
-  | UserTypingNotification
+  | TypingUsersNotification
+  | PresenceNotification
+  | PingMessage
   | ErrorMessage
   | SubscriptionConfirmed;